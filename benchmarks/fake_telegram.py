@@ -0,0 +1,95 @@
+"""
+In-process stand-in for the Pyrogram client (`bot.tgclient.aio`).
+
+Uploads read the file from disk in Pyrogram-sized parts, invoke the progress
+callback from an executor thread the way Pyrogram does, and can optionally be
+throttled to a fixed bandwidth so upload-bound runs can be modelled.
+"""
+import os
+import asyncio
+import itertools
+
+from types import SimpleNamespace
+
+
+UPLOAD_PART_SIZE = 512 * 1024
+
+
+class FakeMessage:
+    _ids = itertools.count(1)
+
+    def __init__(self, chat_id, text=None, media_kind=None, media=None):
+        self.id = next(self._ids)
+        self.chat = SimpleNamespace(id=chat_id)
+        self.text = text
+        self.audio = media if media_kind == 'audio' else None
+        self.document = media if media_kind == 'document' else None
+        self.video = media if media_kind == 'video' else None
+        self.photo = media if media_kind == 'photo' else None
+
+    async def edit_text(self, text=None, **kwargs):
+        self.text = text
+        return self
+
+    async def delete(self):
+        return True
+
+
+class FakeTelegram:
+    def __init__(self, upload_mbps: float = 0):
+        self.bandwidth = upload_mbps * 1024 * 1024 / 8 if upload_mbps else 0
+        self.uploads = 0
+        self.bytes_uploaded = 0
+        self.messages = 0
+
+    async def _upload(self, chat_id, kind, path, caption=None, progress=None):
+        loop = asyncio.get_running_loop()
+        total = await asyncio.to_thread(os.path.getsize, path)
+
+        def _read_parts():
+            with open(path, 'rb') as f:
+                while f.read(UPLOAD_PART_SIZE):
+                    pass
+
+        sent = 0
+        if self.bandwidth:
+            while sent < total:
+                part = min(UPLOAD_PART_SIZE, total - sent)
+                await asyncio.sleep(part / self.bandwidth)
+                sent += part
+                if progress:
+                    await loop.run_in_executor(None, progress, sent, total)
+            await asyncio.to_thread(_read_parts)
+        else:
+            await asyncio.to_thread(_read_parts)
+            if progress:
+                await loop.run_in_executor(None, progress, total, total)
+
+        self.uploads += 1
+        self.bytes_uploaded += total
+        media = SimpleNamespace(file_id=f"bench-{kind}-{self.uploads}", file_size=total)
+        return FakeMessage(chat_id, caption, kind, media)
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.messages += 1
+        return FakeMessage(chat_id, text)
+
+    async def send_photo(self, chat_id, photo, caption=None, **kwargs):
+        self.messages += 1
+        return FakeMessage(chat_id, caption, 'photo', SimpleNamespace(file_id='bench-photo'))
+
+    async def send_document(self, chat_id, document, caption=None, progress=None, **kwargs):
+        return await self._upload(chat_id, 'document', document, caption, progress)
+
+    async def send_audio(self, chat_id, audio, caption=None, progress=None, **kwargs):
+        return await self._upload(chat_id, 'audio', audio, caption, progress)
+
+    async def send_video(self, chat_id, video, caption=None, progress=None, **kwargs):
+        return await self._upload(chat_id, 'video', video, caption, progress)
+
+    async def send_cached_media(self, chat_id, file_id, caption=None, **kwargs):
+        self.messages += 1
+        return FakeMessage(chat_id, caption, 'document', SimpleNamespace(file_id=file_id, file_size=0))
+
+    async def delete_messages(self, chat_id, message_ids):
+        return True
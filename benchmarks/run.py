@@ -0,0 +1,338 @@
+"""
+Offline end-to-end benchmark of the legacy provider pipeline.
+
+Spins up the local provider stand-ins (benchmarks/stand_ins.py) in a separate
+process, routes the bot's HTTP traffic for the real provider hosts to them,
+swaps the Telegram client for benchmarks/fake_telegram.py and then drives
+`start_album` / `start_playlist` of the Deezer, Qobuz or Tidal handler.
+
+Usage (from the repository root, with the bot's .env available because the
+settings are still read from the configured database):
+
+    python -m benchmarks.run --provider deezer --kind album --tracks 12 --track-mb 20
+    python -m benchmarks.run --provider qobuz --kind playlist --tracks 20
+    python -m benchmarks.run --provider tidal --kind album --runs 5 --json bench.json
+"""
+import os
+import sys
+import time
+import json
+import shutil
+import socket
+import asyncio
+import argparse
+import tempfile
+import threading
+import statistics
+import multiprocessing
+
+from types import ModuleType
+
+
+BF_SECRET = b'benchbenchbench!'
+REWRITE_HOSTS = {
+    'www.deezer.com', 'media.deezer.com', 'cdn-images.dzcdn.net',
+    'api.tidal.com', 'resources.tidal.com',
+    'www.qobuz.com', 'static.qobuz.com',
+}
+
+
+# --- Probes ---
+
+class LoopLagProbe:
+    """Measures how late asyncio wakes a sleeper up (event loop lag)"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples = []
+        self._task = None
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - start - self.interval))
+
+    def start(self):
+        self.samples = []
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    def summary(self) -> dict:
+        if not self.samples:
+            return {'lag_mean_ms': 0, 'lag_p95_ms': 0, 'lag_max_ms': 0}
+        ordered = sorted(self.samples)
+        return {
+            'lag_mean_ms': round(statistics.fmean(ordered) * 1000, 2),
+            'lag_p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+            'lag_max_ms': round(ordered[-1] * 1000, 2),
+        }
+
+
+class RssProbe(threading.Thread):
+    """Samples the resident set size of this process from a side thread"""
+
+    def __init__(self, interval: float = 0.05):
+        super().__init__(daemon=True)
+        import psutil
+        self._process = psutil.Process()
+        self.interval = interval
+        self.peak = self._process.memory_info().rss
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            self.peak = max(self.peak, self._process.memory_info().rss)
+
+    def stop(self) -> int:
+        self._done.set()
+        self.join()
+        self.peak = max(self.peak, self._process.memory_info().rss)
+        return self.peak
+
+
+# --- Environment wiring ---
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_stand_ins(args) -> tuple:
+    from benchmarks.stand_ins import serve
+
+    port = _free_port()
+    ctx = multiprocessing.get_context('spawn')
+    ready = ctx.Event()
+    options = {
+        'tracks': args.tracks,
+        'track_size': int(args.track_mb * 1024 * 1024),
+        'segment_size': int(args.segment_kb * 1024),
+        'bf_secret': BF_SECRET,
+        'latency': args.latency_ms / 1000,
+    }
+    process = ctx.Process(target=serve, args=(port, options, ready), daemon=True)
+    process.start()
+    if not ready.wait(60):
+        process.terminate()
+        raise RuntimeError('Provider stand-ins did not start')
+    return process, f"http://127.0.0.1:{port}"
+
+
+def install_url_rewrite(base_url: str):
+    """Send requests for the real provider hosts to the local stand-ins"""
+    import aiohttp
+    from yarl import URL
+
+    original = aiohttp.ClientSession._request
+
+    async def _request(self, method, str_or_url, **kwargs):
+        url = URL(str_or_url)
+        if url.host in REWRITE_HOSTS:
+            query = f"?{url.raw_query_string}" if url.raw_query_string else ''
+            str_or_url = URL(f"{base_url}/{url.host}{url.raw_path}{query}", encoded=True)
+        return await original(self, method, str_or_url, **kwargs)
+
+    aiohttp.ClientSession._request = _request
+
+
+def install_fake_telegram(upload_mbps: float):
+    from benchmarks.fake_telegram import FakeTelegram
+
+    fake = FakeTelegram(upload_mbps)
+    module = ModuleType('bot.tgclient')
+    module.aio = fake
+    sys.modules['bot.tgclient'] = module
+    return fake
+
+
+def configure_bot(args, workdir: str):
+    import aiohttp
+    import aiolimiter
+    from config import Config
+    from bot.settings import bot_set
+    from bot.helpers import metadata as base_meta
+
+    Config.LEGACY_DOWNLOAD_BASE_DIR = workdir
+    Config.MAX_WORKERS = args.workers or Config.MAX_WORKERS
+    base_meta.metadata['tempfolder'] = f"{workdir}/"
+
+    bot_set.upload_mode = 'Telegram'
+    bot_set.art_poster = True
+    bot_set.album_zip = args.zip
+    bot_set.playlist_zip = args.zip
+    bot_set.playlist_sort = False
+    bot_set.playlist_conc = args.playlist_conc
+
+    # The stand-ins are local, so the provider API limiters only add noise
+    limiter = aiolimiter.AsyncLimiter(30, 60) if args.keep_ratelimit else aiolimiter.AsyncLimiter(10 ** 6, 1)
+
+    if args.provider == 'deezer':
+        from bot.helpers.deezer.dzapi import deezerapi
+        deezerapi.session = aiohttp.ClientSession()
+        deezerapi.ratelimit = limiter
+        deezerapi.bf_secret = BF_SECRET
+        deezerapi.api_token = deezerapi.license_token = 'bench'
+        deezerapi.renew_timestamp = time.time()
+        deezerapi.language = 'en'
+        deezerapi.country = 'US'
+        deezerapi.available_formats = ['MP3_128', 'MP3_320', 'FLAC']
+        return deezerapi.session
+
+    if args.provider == 'qobuz':
+        from bot.helpers.qobuz.qopy import qobuz_api
+        qobuz_api.session = aiohttp.ClientSession()
+        qobuz_api.ratelimit = limiter
+        qobuz_api.id = qobuz_api.sec = qobuz_api.uat = 'bench'
+        qobuz_api.quality = 6
+        return qobuz_api.session
+
+    from bot.helpers.tidal.tidal_api import tidalapi
+
+    class _BenchTidalSession:
+        country_code = 'US'
+
+        def auth_headers(self):
+            return {}
+
+        async def refresh(self):
+            return None
+
+    bench_session = _BenchTidalSession()
+    tidalapi.session = aiohttp.ClientSession()
+    tidalapi.ratelimit = limiter
+    tidalapi.saved = [bench_session]
+    tidalapi.tv_session = bench_session
+    tidalapi.mobile_hires = tidalapi.mobile_atmos = None
+    tidalapi.quality = 'LOSSLESS'
+    tidalapi.spatial = 'OFF'
+    return tidalapi.session
+
+
+async def fetch_stats(base_url: str) -> dict:
+    import aiohttp
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"{base_url}/__stats") as r:
+            return await r.json()
+
+
+# --- Runner ---
+
+async def run_once(args, base_url: str, fake, run_index: int) -> dict:
+    from benchmarks import stand_ins
+
+    if args.provider == 'deezer':
+        from bot.helpers.deezer.handler import start_album, start_playlist
+        target = (start_album, stand_ins.DEEZER_ALBUM_ID) if args.kind == 'album' else (start_playlist, stand_ins.DEEZER_PLAYLIST_ID)
+    elif args.provider == 'qobuz':
+        from bot.helpers.qobuz.handler import start_album, start_qobuz
+        # Playlists only start from a link, the handler fetches the track list itself
+        playlist = f"https://www.qobuz.com/us-en/playlist/{stand_ins.QOBUZ_PLAYLIST_ID}"
+        target = (start_album, stand_ins.QOBUZ_ALBUM_ID) if args.kind == 'album' else (start_qobuz, playlist)
+    else:
+        from bot.helpers.tidal.handler import start_album
+        target = (start_album, stand_ins.TIDAL_ALBUM_ID)
+
+    user = {
+        'user_id': 0, 'name': 'bench', 'user_name': 'bench', 'r_id': 900000 + run_index,
+        'chat_id': 0, 'provider': None, 'link': None, 'override': None,
+        'bot_msg': await fake.send_message(0, 'bench'),
+    }
+
+    before = await fetch_stats(base_url)
+    uploaded_before = fake.bytes_uploaded
+    lag = LoopLagProbe()
+    rss = RssProbe()
+    rss.start()
+    lag.start()
+    start = time.perf_counter()
+    try:
+        await target[0](target[1], user)
+    finally:
+        elapsed = time.perf_counter() - start
+        await lag.stop()
+        peak = rss.stop()
+    after = await fetch_stats(base_url)
+
+    downloaded = after['bytes'] - before['bytes']
+    uploaded = fake.bytes_uploaded - uploaded_before
+    return {
+        'run': run_index + 1,
+        'seconds': round(elapsed, 3),
+        'tracks': args.tracks,
+        'tracks_per_s': round(args.tracks / elapsed, 3),
+        'download_mb': round(downloaded / 1048576, 2),
+        'download_mb_per_s': round(downloaded / 1048576 / elapsed, 2),
+        'upload_mb': round(uploaded / 1048576, 2),
+        'requests': after['requests'] - before['requests'],
+        'peak_rss_mb': round(peak / 1048576, 1),
+        **lag.summary(),
+    }
+
+
+def print_report(args, results: list):
+    columns = ['run', 'seconds', 'tracks_per_s', 'download_mb_per_s', 'upload_mb', 'requests', 'peak_rss_mb', 'lag_mean_ms', 'lag_p95_ms', 'lag_max_ms']
+    print(f"\n{args.provider} {args.kind}: {args.tracks} tracks x {args.track_mb} MB")
+    print('  '.join(f"{c:>17}" for c in columns))
+    for r in results:
+        print('  '.join(f"{r[c]:>17}" for c in columns))
+    if len(results) > 1:
+        median = {c: round(statistics.median(r[c] for r in results), 3) for c in columns if c != 'run'}
+        print('  '.join([f"{'median':>17}"] + [f"{median[c]:>17}" for c in columns if c != 'run']))
+
+
+async def main(args):
+    process, base_url = start_stand_ins(args)
+    workdir = tempfile.mkdtemp(prefix='bench-')
+    install_url_rewrite(base_url)
+    fake = install_fake_telegram(args.upload_mbps)
+    session = None
+    results = []
+    try:
+        session = configure_bot(args, workdir)
+        for i in range(args.runs):
+            results.append(await run_once(args, base_url, fake, i))
+            shutil.rmtree(workdir, ignore_errors=True)
+            os.makedirs(workdir, exist_ok=True)
+    finally:
+        if session:
+            await session.close()
+        process.terminate()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print_report(args, results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Offline pipeline benchmark with local provider stand-ins')
+    parser.add_argument('--provider', choices=['deezer', 'qobuz', 'tidal'], default='deezer')
+    parser.add_argument('--kind', choices=['album', 'playlist'], default='album', help='playlist is Deezer and Qobuz only')
+    parser.add_argument('--tracks', type=int, default=12)
+    parser.add_argument('--track-mb', type=float, default=10)
+    parser.add_argument('--segment-kb', type=int, default=512, help='Tidal DASH segment size')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Added latency per stand-in request')
+    parser.add_argument('--upload-mbps', type=float, default=0, help='Fake Telegram bandwidth (0 = disk speed)')
+    parser.add_argument('--workers', type=int, default=0, help='Override MAX_WORKERS for concurrent track downloads')
+    parser.add_argument('--zip', action='store_true', help='Enable album/playlist zip')
+    parser.add_argument('--playlist-conc', action='store_true', help='Download playlist tracks concurrently')
+    parser.add_argument('--keep-ratelimit', action='store_true', help='Keep the real provider API rate limits')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--json', help='Write results to this file')
+    args = parser.parse_args(argv)
+    if args.provider == 'tidal' and args.kind == 'playlist':
+        parser.error('the legacy Tidal handler has no playlist support')
+    return args
+
+
+if __name__ == '__main__':
+    asyncio.run(main(parse_args()))
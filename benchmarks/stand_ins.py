@@ -0,0 +1,297 @@
+"""
+Local aiohttp stand-ins for the provider APIs used by the benchmarks.
+
+The server runs in its own process (see `serve`) so that encryption work and
+payload buffers do not show up in the RSS / event-loop numbers of the bot
+process being measured. Requests for real hosts are routed here by the
+benchmark runner as `/<hostname>/<path>`.
+"""
+import os
+import base64
+import struct
+import asyncio
+
+from hashlib import md5
+from aiohttp import web
+from Cryptodome.Cipher import Blowfish
+
+
+STRIPE_SIZE = 3 * 2048
+BF_IV = b"\x00\x01\x02\x03\x04\x05\x06\x07"
+COVER_BYTES = b"\xff\xd8\xff\xe0" + os.urandom(32 * 1024) + b"\xff\xd9"
+
+DEEZER_ALBUM_ID = 1000
+DEEZER_PLAYLIST_ID = 2000
+TIDAL_ALBUM_ID = 3000
+QOBUZ_ALBUM_ID = 4000
+QOBUZ_PLAYLIST_ID = 5000
+
+
+def make_flac(size: int) -> bytes:
+    """
+    Build a FLAC file mutagen accepts: a valid STREAMINFO block followed by
+    random frame data (nothing in the pipeline decodes the audio itself)
+    """
+    total_samples = 44100 * 180
+    packed = (44100 << 44) | (1 << 41) | (15 << 36) | total_samples
+    streaminfo = struct.pack('>HH', 4096, 4096) + bytes(6) + packed.to_bytes(8, 'big') + bytes(16)
+    header = b'fLaC' + bytes([0x80]) + len(streaminfo).to_bytes(3, 'big') + streaminfo
+    return header + os.urandom(max(0, size - len(header)))
+
+
+def blowfish_key(track_id, secret: bytes) -> bytes:
+    # Same derivation as DeezerAPI._get_blowfish_key
+    md5_id = md5(str(track_id).encode()).hexdigest().encode('ascii')
+    return bytes([md5_id[i] ^ md5_id[i + 16] ^ secret[i] for i in range(16)])
+
+
+def encrypt_stripes(data: bytes, key: bytes) -> bytes:
+    """Deezer BF_CBC_STRIPE: the first 2048 bytes of every 6144 byte stripe are encrypted"""
+    out = bytearray()
+    for i in range(0, len(data), STRIPE_SIZE):
+        chunk = data[i:i + STRIPE_SIZE]
+        if len(chunk) >= 2048:
+            chunk = Blowfish.new(key, Blowfish.MODE_CBC, BF_IV).encrypt(chunk[:2048]) + chunk[2048:]
+        out += chunk
+    return bytes(out)
+
+
+class StandIns:
+    def __init__(self, base_url: str, tracks: int, track_size: int, segment_size: int, bf_secret: bytes, latency: float = 0):
+        self.base_url = base_url.rstrip('/')
+        self.tracks = tracks
+        self.segment_size = segment_size
+        self.bf_secret = bf_secret
+        self.latency = latency
+        self.payload = make_flac(track_size)
+        self._encrypted = {}
+        self.bytes_served = 0
+        self.requests = 0
+
+    # --- helpers ---
+
+    async def _delay(self):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def _media(self, body: bytes, content_type='application/octet-stream'):
+        self.bytes_served += len(body)
+        return web.Response(body=body, content_type=content_type)
+
+    def _track_ids(self, base: int):
+        return [base + i + 1 for i in range(self.tracks)]
+
+    # --- Deezer ---
+
+    def _dz_track(self, sng_id, number=1):
+        return {
+            'SNG_ID': str(sng_id),
+            'SNG_TITLE': f'Bench Track {sng_id}',
+            'ART_NAME': 'Bench Artist',
+            'ARTISTS': [{'ART_NAME': 'Bench Artist'}],
+            'ALB_TITLE': 'Bench Album',
+            'ALB_PICTURE': 'benchcover',
+            'ISRC': f'BENCH{sng_id}',
+            'DURATION': '180',
+            'TRACK_NUMBER': str(number),
+            'PHYSICAL_RELEASE_DATE': '2020-01-01',
+            'TRACK_TOKEN': f'tok-{sng_id}',
+            'TRACK_TOKEN_EXPIRE': 4102444800,
+            'AVAILABLE_COUNTRIES': {'STREAM_ADS': ['US']},
+            'FILESIZE_FLAC': str(len(self.payload)),
+            'FILESIZE_MP3_320': '0',
+        }
+
+    async def deezer_gw(self, request):
+        await self._delay()
+        method = request.query.get('method')
+        payload = await request.json() if request.can_read_body else {}
+        if method == 'deezer.pageTrack' or method == 'song.getData':
+            sng_id = int(payload['sng_id'])
+            results = {'DATA': self._dz_track(sng_id, sng_id % 1000)}
+        elif method == 'deezer.pageAlbum':
+            ids = self._track_ids(DEEZER_ALBUM_ID)
+            results = {
+                'DATA': {
+                    'ALB_TITLE': 'Bench Album', 'ART_NAME': 'Bench Artist',
+                    'ARTISTS': [{'ART_NAME': 'Bench Artist'}], 'UPC': '000000000000',
+                    'DIGITAL_RELEASE_DATE': '2020-01-01', 'NUMBER_TRACK': len(ids),
+                    'DURATION': str(180 * len(ids)), 'COPYRIGHT': 'Bench', 'ALB_PICTURE': 'benchcover',
+                },
+                'SONGS': {'data': [{'SNG_ID': str(i)} for i in ids]},
+            }
+        elif method == 'deezer.pagePlaylist':
+            ids = self._track_ids(DEEZER_PLAYLIST_ID)
+            results = {
+                'DATA': {
+                    'TITLE': 'Bench Playlist', 'DURATION': str(180 * len(ids)), 'NB_SONG': len(ids),
+                    'PLAYLIST_ID': str(DEEZER_PLAYLIST_ID), 'PLAYLIST_PICTURE': 'benchcover',
+                },
+                'SONGS': {'data': [{'SNG_ID': str(i)} for i in ids]},
+            }
+        else:
+            return web.json_response({'error': {'METHOD': f'unsupported {method}'}, 'payload': None, 'results': {}})
+        return web.json_response({'error': [], 'results': results})
+
+    async def deezer_get_url(self, request):
+        await self._delay()
+        body = await request.json()
+        sng_id = body['track_tokens'][0].split('-', 1)[1]
+        url = f"{self.base_url}/deezer-media/{sng_id}"
+        return web.json_response({'data': [{'media': [{'sources': [{'url': url}]}]}]})
+
+    async def deezer_media(self, request):
+        await self._delay()
+        sng_id = request.match_info['sng_id']
+        data = self._encrypted.get(sng_id)
+        if data is None:
+            data = self._encrypted[sng_id] = encrypt_stripes(self.payload, blowfish_key(sng_id, self.bf_secret))
+        return self._media(data, 'audio/flac')
+
+    # --- Tidal ---
+
+    def _tidal_track(self, track_id, number=1):
+        return {
+            'id': track_id, 'title': f'Bench Track {track_id}', 'version': None,
+            'artist': {'name': 'Bench Artist'}, 'artists': [{'name': 'Bench Artist'}],
+            'album': {'title': 'Bench Album', 'cover': 'bench-cover-id'},
+            'copyright': 'Bench', 'isrc': f'BENCH{track_id}', 'duration': 180,
+            'explicit': False, 'trackNumber': number,
+            'streamStartDate': '2020-01-01T00:00:00.000+0000',
+            'mediaMetadata': {'tags': ['LOSSLESS']},
+        }
+
+    def _mpd(self, track_id) -> bytes:
+        segments = max(1, -(-(len(self.payload) - self.segment_size) // self.segment_size))
+        base = f"{self.base_url}/tidal-seg/{track_id}"
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" type="static">'
+            '<Period><AdaptationSet contentType="audio" mimeType="audio/mp4">'
+            '<Representation id="FLAC,44100,16" codecs="flac" bandwidth="1000000" audioSamplingRate="44100">'
+            f'<SegmentTemplate timescale="44100" initialization="{base}/0" media="{base}/$Number$" startNumber="1">'
+            f'<SegmentTimeline><S d="176128" r="{segments - 1}"/></SegmentTimeline>'
+            '</SegmentTemplate></Representation></AdaptationSet></Period></MPD>'
+        ).encode()
+
+    async def tidal_api(self, request):
+        await self._delay()
+        parts = request.match_info['tail'].strip('/').split('/')
+        if parts[0] == 'albums' and len(parts) == 2:
+            n = self.tracks
+            return web.json_response({
+                'id': int(parts[1]), 'title': 'Bench Album', 'version': None,
+                'artist': {'name': 'Bench Artist'}, 'artists': [{'name': 'Bench Artist'}],
+                'upc': '000000000000', 'releaseDate': '2020-01-01', 'numberOfTracks': n,
+                'duration': 180 * n, 'copyright': 'Bench', 'explicit': False,
+                'numberOfVolumes': 1, 'cover': 'bench-cover-id',
+            })
+        if parts[0] == 'albums' and parts[2:] == ['tracks']:
+            ids = self._track_ids(TIDAL_ALBUM_ID)
+            return web.json_response({'items': [self._tidal_track(i, n) for n, i in enumerate(ids, 1)]})
+        if parts[0] == 'tracks' and len(parts) == 2:
+            return web.json_response(self._tidal_track(int(parts[1])))
+        if parts[0] == 'tracks' and 'playbackinfopostpaywall' in parts:
+            return web.json_response({
+                'trackId': int(parts[1]), 'audioMode': 'STEREO', 'audioQuality': 'LOSSLESS',
+                'manifestMimeType': 'application/dash+xml',
+                'manifest': base64.b64encode(self._mpd(parts[1])).decode(),
+            })
+        return web.json_response({'status': 404, 'subStatus': 0, 'userMessage': 'not emulated'}, status=404)
+
+    async def tidal_segment(self, request):
+        await self._delay()
+        n = int(request.match_info['n'])
+        start = n * self.segment_size
+        return self._media(self.payload[start:start + self.segment_size], 'audio/mp4')
+
+    # --- Qobuz ---
+
+    def _qz_album(self):
+        image = 'https://static.qobuz.com/images/covers/bench'
+        return {
+            'id': str(QOBUZ_ALBUM_ID), 'title': 'Bench Album', 'version': None,
+            'artist': {'name': 'Bench Artist'}, 'artists': [{'name': 'Bench Artist'}],
+            'upc': '000000000000', 'release_date_original': '2020-01-01',
+            'tracks_count': self.tracks, 'duration': 180 * self.tracks,
+            'copyright': 'Bench', 'genre': {'name': 'Bench'}, 'parental_warning': False,
+            'streamable': True,
+            'image': {'large': f'{image}_600.jpg', 'thumbnail': f'{image}_50.jpg'},
+        }
+
+    def _qz_track(self, track_id, number=1):
+        return {
+            'id': track_id, 'title': f'Bench Track {track_id}', 'version': None,
+            'isrc': f'BENCH{track_id}', 'duration': 180, 'track_number': number,
+            'copyright': 'Bench', 'parental_warning': False, 'streamable': True,
+            'release_date_original': '2020-01-01', 'album': self._qz_album(),
+        }
+
+    async def qobuz_api(self, request):
+        await self._delay()
+        epoint = request.match_info['epoint']
+        if epoint == 'album/get':
+            album = self._qz_album()
+            ids = self._track_ids(QOBUZ_ALBUM_ID)
+            album['tracks'] = {'items': [self._qz_track(i, n) for n, i in enumerate(ids, 1)]}
+            return web.json_response(album)
+        if epoint == 'playlist/get':
+            ids = self._track_ids(QOBUZ_PLAYLIST_ID)
+            return web.json_response({
+                'id': QOBUZ_PLAYLIST_ID, 'name': 'Bench Playlist',
+                'duration': 180 * len(ids), 'tracks_count': len(ids),
+                'tracks': {'items': [self._qz_track(i, n) for n, i in enumerate(ids, 1)]},
+            })
+        if epoint == 'track/get':
+            return web.json_response(self._qz_track(int(request.query['track_id'])))
+        if epoint == 'track/getFileUrl':
+            track_id = request.query['track_id']
+            return web.json_response({
+                'track_id': int(track_id), 'format_id': int(request.query['format_id']),
+                'url': f"{self.base_url}/qobuz-media/{track_id}",
+                'bit_depth': 16, 'sampling_rate': 44.1, 'mime_type': 'audio/flac',
+            })
+        return web.json_response({'status': 'error', 'code': 404, 'message': 'not emulated'}, status=404)
+
+    async def qobuz_media(self, request):
+        await self._delay()
+        return self._media(self.payload, 'audio/flac')
+
+    # --- shared ---
+
+    async def cover(self, request):
+        await self._delay()
+        return web.Response(body=COVER_BYTES, content_type='image/jpeg')
+
+    async def stats(self, request):
+        return web.json_response({'bytes': self.bytes_served, 'requests': self.requests})
+
+    def app(self) -> web.Application:
+        app = web.Application(client_max_size=16 * 1024 * 1024)
+        app.router.add_post('/www.deezer.com/ajax/gw-light.php', self.deezer_gw)
+        app.router.add_post('/media.deezer.com/v1/get_url', self.deezer_get_url)
+        app.router.add_get('/deezer-media/{sng_id}', self.deezer_media)
+        app.router.add_get('/cdn-images.dzcdn.net/{tail:.*}', self.cover)
+        app.router.add_get('/api.tidal.com/v1/{tail:.*}', self.tidal_api)
+        app.router.add_get('/tidal-seg/{track_id}/{n}', self.tidal_segment)
+        app.router.add_get('/resources.tidal.com/{tail:.*}', self.cover)
+        app.router.add_get('/www.qobuz.com/api.json/0.2/{epoint:.*}', self.qobuz_api)
+        app.router.add_get('/qobuz-media/{track_id}', self.qobuz_media)
+        app.router.add_get('/static.qobuz.com/{tail:.*}', self.cover)
+        app.router.add_get('/__stats', self.stats)
+        return app
+
+
+def serve(port: int, options: dict, ready):
+    """Process entry point: run the stand-ins until terminated"""
+    stand_ins = StandIns(f"http://127.0.0.1:{port}", **options)
+
+    async def main():
+        runner = web.AppRunner(stand_ins.app(), access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, '127.0.0.1', port).start()
+        ready.set()
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
@@ -53,6 +53,48 @@ class AbstractRcloneSessionsRepo(ABC):
     def delete_session(self, token: str) -> None:
         raise NotImplementedError
 
+class AbstractMediaCacheRepo(ABC):
+    """Abstract repository for uploaded media (Telegram file_ids and links) keyed by content."""
+
+    @abstractmethod
+    def get_entry(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """Returns {'media': [...], 'links': [...], 'created_at': epoch seconds} or None."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def set_entry(self, cache_key: str, provider: str, content_id: str, media: List[Dict[str, Any]], links: List[Dict[str, Any]]) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_entry(self, cache_key: str) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_content(self, provider: Optional[str] = None, content_id: Optional[str] = None) -> int:
+        """Deletes entries matching provider/content_id (all entries when both are None)."""
+        raise NotImplementedError
+
+class AbstractTaskQueueRepo(ABC):
+    """Abstract repository for queued and running download jobs, kept so they survive a restart."""
+
+    @abstractmethod
+    def save_job(self, job_id: str, user_id: int, link: str, options: Dict[str, Any], context: Dict[str, Any], state: str) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def update_job(self, job_id: str, state: Optional[str] = None, attempts: Optional[int] = None, checkpoint: Optional[Dict[str, Any]] = None) -> None:
+        """Updates the given fields of a job; None leaves a field unchanged."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_jobs(self) -> List[Dict[str, Any]]:
+        """Returns every job as {'job_id', 'user_id', 'link', 'options', 'context', 'state', 'attempts', 'checkpoint', 'created_at'}, oldest first."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_job(self, job_id: str) -> None:
+        raise NotImplementedError
+
 class DatabaseInterface(ABC):
     """Abstract interface for the entire database backend."""
 
@@ -61,6 +103,8 @@ class DatabaseInterface(ABC):
         self.history: AbstractHistoryRepo = None
         self.user_settings: AbstractUserSettingsRepo = None
         self.rclone_sessions: AbstractRcloneSessionsRepo = None
+        self.media_cache: AbstractMediaCacheRepo = None
+        self.task_queue: AbstractTaskQueueRepo = None
 
     @abstractmethod
     def connect(self, db_url: str, **kwargs) -> None:
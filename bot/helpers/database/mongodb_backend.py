@@ -5,11 +5,14 @@ from .interface import (
     AbstractHistoryRepo,
     AbstractUserSettingsRepo,
     AbstractRcloneSessionsRepo,
+    AbstractMediaCacheRepo,
+    AbstractTaskQueueRepo,
     DatabaseInterface
 )
 from pymongo import MongoClient, ASCENDING
 from pymongo.collection import Collection
 from pymongo.errors import DuplicateKeyError
+import time
 import datetime
 from typing import Any, Dict, List, Optional, Tuple
 
@@ -119,6 +122,78 @@ class MongoRcloneSessionsRepo(AbstractRcloneSessionsRepo):
     def delete_session(self, token: str) -> None:
         self._collection.delete_one({"_id": token})
 
+class MongoMediaCacheRepo(AbstractMediaCacheRepo):
+    def __init__(self, db_client: MongoClient, db_name: str):
+        self._collection: Collection = db_client[db_name]["media_cache"]
+        self._collection.create_index([("provider", ASCENDING), ("content_id", ASCENDING)])
+
+    def get_entry(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        doc = self._collection.find_one({"_id": cache_key})
+        if not doc:
+            return None
+        return {
+            "media": doc.get("media", []),
+            "links": doc.get("links", []),
+            "created_at": doc.get("created_at", 0)
+        }
+
+    def set_entry(self, cache_key: str, provider: str, content_id: str, media: List[Dict[str, Any]], links: List[Dict[str, Any]]) -> None:
+        doc = {
+            "provider": provider,
+            "content_id": content_id,
+            "media": media,
+            "links": links,
+            "created_at": time.time()
+        }
+        self._collection.update_one({"_id": cache_key}, {"$set": doc}, upsert=True)
+
+    def delete_entry(self, cache_key: str) -> None:
+        self._collection.delete_one({"_id": cache_key})
+
+    def delete_content(self, provider: Optional[str] = None, content_id: Optional[str] = None) -> int:
+        query = {}
+        if provider is not None:
+            query["provider"] = provider
+        if content_id is not None:
+            query["content_id"] = content_id
+        return self._collection.delete_many(query).deleted_count
+
+class MongoTaskQueueRepo(AbstractTaskQueueRepo):
+    def __init__(self, db_client: MongoClient, db_name: str):
+        self._collection: Collection = db_client[db_name]["task_queue"]
+        self._collection.create_index("created_at")
+
+    def save_job(self, job_id: str, user_id: int, link: str, options: Dict[str, Any], context: Dict[str, Any], state: str) -> None:
+        self._collection.update_one(
+            {"_id": job_id},
+            {
+                "$set": {"options": options, "context": context, "state": state},
+                "$setOnInsert": {"user_id": user_id, "link": link, "attempts": 0, "checkpoint": {}, "created_at": time.time()}
+            },
+            upsert=True
+        )
+
+    def update_job(self, job_id: str, state: Optional[str] = None, attempts: Optional[int] = None, checkpoint: Optional[Dict[str, Any]] = None) -> None:
+        fields = {}
+        if state is not None:
+            fields["state"] = state
+        if attempts is not None:
+            fields["attempts"] = attempts
+        if checkpoint is not None:
+            fields["checkpoint"] = checkpoint
+        if fields:
+            self._collection.update_one({"_id": job_id}, {"$set": fields})
+
+    def get_jobs(self) -> List[Dict[str, Any]]:
+        jobs = []
+        for doc in self._collection.find().sort("created_at", ASCENDING):
+            doc["job_id"] = doc.pop("_id")
+            jobs.append(doc)
+        return jobs
+
+    def delete_job(self, job_id: str) -> None:
+        self._collection.delete_one({"_id": job_id})
+
 # --- Main Backend Class ---
 
 class MongoDatabase(DatabaseInterface):
@@ -157,6 +232,8 @@ class MongoDatabase(DatabaseInterface):
         self.history = MongoHistoryRepo(self._client, self._db_name)
         self.user_settings = MongoUserSettingsRepo(self._client, self._db_name)
         self.rclone_sessions = MongoRcloneSessionsRepo(self._client, self._db_name)
+        self.media_cache = MongoMediaCacheRepo(self._client, self._db_name)
+        self.task_queue = MongoTaskQueueRepo(self._client, self._db_name)
 
     def disconnect(self) -> None:
         """Disconnect from the database."""
@@ -35,3 +35,5 @@ set_db = db.settings
 download_history = db.history
 user_set_db = db.user_settings
 rclone_sessions_db = db.rclone_sessions
+media_cache_db = db.media_cache
+task_queue_db = db.task_queue
@@ -5,9 +5,12 @@ from .interface import (
     AbstractHistoryRepo,
     AbstractUserSettingsRepo,
     AbstractRcloneSessionsRepo,
+    AbstractMediaCacheRepo,
+    AbstractTaskQueueRepo,
     DatabaseInterface
 )
 from .pg_db import DataBaseHandle
+import time
 import psycopg2
 import datetime
 import psycopg2.extras
@@ -235,6 +238,152 @@ class PostgresRcloneSessionsRepo(AbstractRcloneSessionsRepo):
         finally:
             self._db.ccur(cur)
 
+class PostgresMediaCacheRepo(AbstractMediaCacheRepo):
+    def __init__(self, db_handle: DataBaseHandle):
+        self._db = db_handle
+        schema = """
+        CREATE TABLE IF NOT EXISTS media_cache (
+            cache_key VARCHAR(255) PRIMARY KEY,
+            provider VARCHAR(20) NOT NULL,
+            content_id VARCHAR(100) NOT NULL,
+            media JSONB NOT NULL,
+            links JSONB NOT NULL,
+            created_at DOUBLE PRECISION NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_media_cache_content ON media_cache(provider, content_id);
+        """
+        cur = self._db.scur()
+        try:
+            cur.execute(schema)
+        finally:
+            self._db.ccur(cur)
+
+    def get_entry(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        sql = "SELECT media, links, created_at FROM media_cache WHERE cache_key = %s"
+        cur = self._db.scur(dictcur=True)
+        val = None
+        try:
+            cur.execute(sql, (cache_key,))
+            if cur.rowcount > 0:
+                val = dict(cur.fetchone())
+        finally:
+            self._db.ccur(cur)
+        return val
+
+    def set_entry(self, cache_key: str, provider: str, content_id: str, media: List[Dict[str, Any]], links: List[Dict[str, Any]]) -> None:
+        sql = """
+        INSERT INTO media_cache (cache_key, provider, content_id, media, links, created_at)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        ON CONFLICT (cache_key)
+        DO UPDATE SET media = EXCLUDED.media, links = EXCLUDED.links, created_at = EXCLUDED.created_at;
+        """
+        cur = self._db.scur()
+        try:
+            cur.execute(sql, (cache_key, provider, content_id, psycopg2.extras.Json(media), psycopg2.extras.Json(links), time.time()))
+        finally:
+            self._db.ccur(cur)
+
+    def delete_entry(self, cache_key: str) -> None:
+        cur = self._db.scur()
+        try:
+            cur.execute("DELETE FROM media_cache WHERE cache_key = %s", (cache_key,))
+        finally:
+            self._db.ccur(cur)
+
+    def delete_content(self, provider: Optional[str] = None, content_id: Optional[str] = None) -> int:
+        conditions = []
+        params = []
+        if provider is not None:
+            conditions.append("provider = %s")
+            params.append(provider)
+        if content_id is not None:
+            conditions.append("content_id = %s")
+            params.append(content_id)
+        sql = "DELETE FROM media_cache"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        cur = self._db.scur()
+        count = 0
+        try:
+            cur.execute(sql, tuple(params))
+            count = cur.rowcount
+        finally:
+            self._db.ccur(cur)
+        return count
+
+class PostgresTaskQueueRepo(AbstractTaskQueueRepo):
+    def __init__(self, db_handle: DataBaseHandle):
+        self._db = db_handle
+        schema = """
+        CREATE TABLE IF NOT EXISTS task_queue (
+            job_id VARCHAR(20) PRIMARY KEY,
+            user_id BIGINT NOT NULL,
+            link VARCHAR(2000) NOT NULL,
+            options JSONB NOT NULL,
+            context JSONB NOT NULL,
+            state VARCHAR(20) NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            checkpoint JSONB NOT NULL DEFAULT '{}'::jsonb,
+            created_at DOUBLE PRECISION NOT NULL
+        );
+        """
+        cur = self._db.scur()
+        try:
+            cur.execute(schema)
+        finally:
+            self._db.ccur(cur)
+
+    def save_job(self, job_id: str, user_id: int, link: str, options: Dict[str, Any], context: Dict[str, Any], state: str) -> None:
+        sql = """
+        INSERT INTO task_queue (job_id, user_id, link, options, context, state, created_at)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (job_id)
+        DO UPDATE SET options = EXCLUDED.options, context = EXCLUDED.context, state = EXCLUDED.state;
+        """
+        cur = self._db.scur()
+        try:
+            cur.execute(sql, (job_id, user_id, link, psycopg2.extras.Json(options), psycopg2.extras.Json(context), state, time.time()))
+        finally:
+            self._db.ccur(cur)
+
+    def update_job(self, job_id: str, state: Optional[str] = None, attempts: Optional[int] = None, checkpoint: Optional[Dict[str, Any]] = None) -> None:
+        fields = []
+        params = []
+        if state is not None:
+            fields.append("state = %s")
+            params.append(state)
+        if attempts is not None:
+            fields.append("attempts = %s")
+            params.append(attempts)
+        if checkpoint is not None:
+            fields.append("checkpoint = %s")
+            params.append(psycopg2.extras.Json(checkpoint))
+        if not fields:
+            return
+        params.append(job_id)
+        cur = self._db.scur()
+        try:
+            cur.execute(f"UPDATE task_queue SET {', '.join(fields)} WHERE job_id = %s", tuple(params))
+        finally:
+            self._db.ccur(cur)
+
+    def get_jobs(self) -> List[Dict[str, Any]]:
+        cur = self._db.scur(dictcur=True)
+        results = []
+        try:
+            cur.execute("SELECT * FROM task_queue ORDER BY created_at")
+            results = cur.fetchall()
+        finally:
+            self._db.ccur(cur)
+        return [dict(row) for row in results]
+
+    def delete_job(self, job_id: str) -> None:
+        cur = self._db.scur()
+        try:
+            cur.execute("DELETE FROM task_queue WHERE job_id = %s", (job_id,))
+        finally:
+            self._db.ccur(cur)
+
 # --- Main Backend Class ---
 
 class PostgresDatabase(DatabaseInterface):
@@ -254,6 +403,8 @@ class PostgresDatabase(DatabaseInterface):
         self.history = PostgresHistoryRepo(self._db_handle)
         self.user_settings = PostgresUserSettingsRepo(self._db_handle)
         self.rclone_sessions = PostgresRcloneSessionsRepo(self._db_handle)
+        self.media_cache = PostgresMediaCacheRepo(self._db_handle)
+        self.task_queue = PostgresTaskQueueRepo(self._db_handle)
 
     def disconnect(self) -> None:
         """Disconnect from the database."""
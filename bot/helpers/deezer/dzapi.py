@@ -14,6 +14,7 @@ from requests.models import HTTPError
 
 from config import Config
 from bot.logger import LOGGER
+from bot.helpers import metrics
 
 CHUNK_SIZE = 2048
 
@@ -235,6 +236,15 @@ class DeezerAPI:
 
 
     async def dl_track(self, id, url, path):
+        with metrics.Timer() as timer:
+            try:
+                size = await self._dl_track(id, url, path)
+            except Exception:
+                metrics.observe_download('deezer', 0, ok=False)
+                raise
+        metrics.observe_download('deezer', timer.elapsed, size)
+
+    async def _dl_track(self, id, url, path):
         bf_key = self._get_blowfish_key(id)
         async with self.session.get(url, allow_redirects=True) as resp:
             buf = bytearray()
@@ -255,6 +265,7 @@ class DeezerAPI:
                     else:
                         decrypted_chunk = data
                     await audio.write(decrypted_chunk)
+        return buflen
 
 
     @staticmethod
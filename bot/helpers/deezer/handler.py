@@ -7,6 +7,8 @@ from .dzapi import deezerapi
 from ..legacy_utils import *
 from ..legacy_uploader import *
 from ..metadata import set_metadata, get_audio_extension
+from ..disk_budget import refine
+from ..tasks import task_manager, item_key
 
 from ...settings import bot_set
 import bot.helpers.translations as lang
@@ -29,6 +31,9 @@ async def start_deezer(url:str, user: dict):
 
 async def start_track(item_id: int, user: dict, track_meta: dict | None, upload=True, \
     filepath=None, disable_link=False):
+    # Delivered before the bot restarted
+    if task_manager.is_done(user, item_key('Deezer', item_id)):
+        return True
 
     if not track_meta:
         if int(item_id) < 0: # For user uploaded
@@ -40,6 +45,7 @@ async def start_track(item_id: int, user: dict, track_meta: dict | None, upload=
         try:
             track_meta = await process_track_metadata(item_id, user['r_id'])
         except Exception as e:
+            task_manager.mark_failed(user)
             return await send_message(user, e)
 
         filepath = f"{Config.LEGACY_DOWNLOAD_BASE_DIR}/{user['r_id']}/{track_meta['provider']}/{track_meta['albumartist']}/{track_meta['album']}"
@@ -73,9 +79,12 @@ async def start_album(album_id:int, user:dict, upload=True):
     try:
         raw_data = await deezerapi.get_album(album_id)
     except Exception as e:
+        task_manager.mark_failed(user)
         return await send_message(user, e)
 
     album_meta = await process_album_metadata(album_id, raw_data['DATA'], raw_data['SONGS'], user['r_id'])
+    if not await refine(user, 'deezer', 'album', album_meta['duration']):
+        return
 
     album_folder = f"{Config.LEGACY_DOWNLOAD_BASE_DIR}/{user['r_id']}/{album_meta['provider']}/{album_meta['artist']}/{album_meta['title']}"
 
@@ -127,6 +136,8 @@ async def start_playlist(playlist_id, user):
     raw_data = await deezerapi.get_playlist(playlist_id, -1, 0)
 
     play_meta = await process_playlist_meta(raw_data, user['r_id'])
+    if not await refine(user, 'deezer', 'playlist', play_meta['duration']):
+        return
 
     playlist_folder = f"{Config.LEGACY_DOWNLOAD_BASE_DIR}/{user['r_id']}/{play_meta['provider']}/"
 
@@ -157,7 +168,8 @@ async def start_playlist(playlist_id, user):
         await run_concurrent_tasks(tasks, update_details)
     else:
         i = 0
-        if bot_set.playlist_zip: upload = False
+        # Rclone uploads the whole playlist as one batch after the downloads
+        if bot_set.playlist_zip or bot_set.upload_mode == 'RCLONE': upload = False
         for track in play_meta['tracks']:
             await progress_message(i, len(play_meta['tracks']), update_details)
             await start_track(track['itemid'], user, track, upload, playlist_folder, bot_set.disable_sort_link)
@@ -0,0 +1,277 @@
+import os
+import time
+import asyncio
+import shutil
+from typing import Callable, Dict, Optional
+
+from config import Config
+from bot.logger import LOGGER
+from bot.settings import bot_set
+from bot.helpers import executors
+
+from .media_cache import parse_content_id
+
+
+MB = 1024 * 1024
+
+# Playing time assumed when the length of a request is not known yet (seconds)
+_DEFAULT_DURATION = {
+    'track': 6 * 60,
+    'song': 6 * 60,
+    'music-video': 6 * 60,
+    'video': 6 * 60,
+    'album': 75 * 60,
+    'playlist': 4 * 3600,
+    'mix': 4 * 3600,
+    'artist': 12 * 3600,
+    'label': 12 * 3600,
+}
+
+# Rough upper bitrates (kbit/s) of the downloaded files
+_QOBUZ_KBPS = {5: 320, 6: 1100, 7: 3000, 27: 5500}
+_TIDAL_KBPS = {'LOW': 96, 'HIGH': 320, 'LOSSLESS': 1100, 'HI_RES': 3000, 'HI_RES_LOSSLESS': 5500}
+_VIDEO_KBPS = 25000
+
+
+def _bitrate(provider: str, kind: str, options: dict) -> int:
+    if provider == 'apple':
+        if kind in ('music-video', 'video'):
+            return _VIDEO_KBPS
+        if options.get('atmos'):
+            return int(Config.APPLE_ATMOS_QUALITY or 2768)
+        # ALAC at the configured sample rate, 24-bit stereo compresses to about 60%
+        return int(int(Config.APPLE_ALAC_QUALITY or 192000) * 24 * 2 * 0.6 / 1000)
+    if kind == 'video':
+        return _VIDEO_KBPS
+    if provider == 'qobuz':
+        quality = bot_set.qobuz.quality if bot_set.qobuz else Config.QOBUZ_QUALITY
+        return _QOBUZ_KBPS.get(int(quality or 27), 5500)
+    if provider == 'deezer':
+        quality = str(bot_set.deezer.quality if bot_set.deezer else '')
+        return 320 if 'MP3' in quality else 1100
+    if provider == 'tidal':
+        quality = bot_set.tidal.quality if bot_set.tidal else Config.TIDAL_QUALITY
+        return _TIDAL_KBPS.get(str(quality or 'HI_RES_LOSSLESS').upper(), 5500)
+    # tidal_ng reads its quality from its own settings file, assume the best
+    return 5500
+
+
+def _zips(provider: str, kind: str) -> bool:
+    """Whether the request is zipped before upload (the archive needs as much room again)"""
+    if provider == 'apple':
+        return kind == 'album' and bot_set.apple_album_zip or kind == 'playlist' and bot_set.apple_playlist_zip
+    if provider == 'tidal_ng':
+        return kind == 'album' and bot_set.tidal_ng_album_zip or kind in ('playlist', 'mix') and bot_set.tidal_ng_playlist_zip
+    return (kind == 'album' and bot_set.album_zip
+            or kind == 'playlist' and bot_set.playlist_zip
+            or kind == 'artist' and (bot_set.artist_zip or bot_set.album_zip))
+
+
+def content_kind(provider: str, link: str, options: dict = None) -> str:
+    """'track', 'album', 'playlist', ... of a link; 'album' when it can't be told offline"""
+    if provider == 'apple' and (options or {}).get('song'):
+        return 'song'
+    content_id = parse_content_id('tidal' if provider == 'tidal_ng' else provider, link)
+    return content_id.split('-', 1)[0] if content_id else 'album'
+
+
+def estimate(provider: str, kind: str, options: dict = None, duration: Optional[float] = None) -> int:
+    """Bytes a request needs on disk at its peak: the files, plus the archive when zipping
+
+    Args:
+        provider: provider key from `get_link_provider`
+        kind: content kind from `content_kind`
+        options: command options (Apple flags)
+        duration: total playing time in seconds when the metadata is known
+    """
+    options = options or {}
+    try:
+        duration = float(duration or 0)
+    except (TypeError, ValueError):
+        duration = 0
+    if not duration:
+        duration = _DEFAULT_DURATION.get(kind, _DEFAULT_DURATION['album'])
+    size = duration * _bitrate(provider, kind, options) * 1000 / 8
+    if _zips(provider, kind):
+        size *= 2
+    # Covers, lyrics and container overhead
+    return int(size * 1.05) + 10 * MB
+
+
+async def download_root(provider: str) -> str:
+    """Folder a provider downloads into, whose filesystem admission has to measure"""
+    if provider in ('qobuz', 'deezer', 'tidal'):
+        return Config.LEGACY_DOWNLOAD_BASE_DIR
+    if provider == 'tidal_ng':
+        from .tidal_ng.utils import get_tidal_ng_download_base_path
+        return await executors.disk_io.run(get_tidal_ng_download_base_path)
+    return Config.LOCAL_STORAGE
+
+
+def _existing(path: str) -> str:
+    """`path` or its nearest existing parent"""
+    while path and not os.path.exists(path):
+        parent = os.path.dirname(path.rstrip('/'))
+        if parent == path:
+            break
+        path = parent
+    return path or '.'
+
+
+async def refine(user: dict, provider: str, kind: str, duration) -> bool:
+    """Resize the reservation of the user's task from metadata once the real length is known
+
+    Only applies when the task was admitted for this very item, so the albums
+    of an artist download don't shrink the artist's reservation.
+    The task is already admitted, so the new size is granted without waiting.
+    """
+    task_id = user.get('task_id')
+    if not task_id or disk_budget.kind(task_id) != kind:
+        return True
+    from .tasks import task_manager
+    return await task_manager.reserve_disk(task_id, estimate(provider, kind, duration=duration), kind)
+
+
+class DiskBudget:
+    """Admission control for disk space.
+
+    Every task reserves the bytes it expects to need before downloading. A
+    reservation is granted when it fits in the free space of the filesystem
+    its provider downloads to, minus DISK_FREE_MARGIN and the space promised
+    to the other tasks on that filesystem; otherwise the task waits until
+    uploads and cleanups give space back. A task is always let through when
+    no other task on its filesystem holds a reservation, so an estimate
+    larger than the disk can't block the bot forever. Only admissions wait:
+    a resize of an admitted task is granted at once, since two admitted
+    tasks waiting on each other's reservations would never be released.
+    """
+
+    RECHECK_INTERVAL = 30
+
+    def __init__(self):
+        self._reserved: Dict[str, int] = {}
+        self._kinds: Dict[str, str] = {}
+        # Download root of every task and the filesystem (st_dev) it is on
+        self._roots: Dict[str, str] = {}
+        self._devices: Dict[str, int] = {}
+        self._cond = asyncio.Condition()
+
+    @property
+    def enabled(self) -> bool:
+        return Config.DISK_ADMISSION
+
+    @property
+    def reserved(self) -> int:
+        return sum(self._reserved.values())
+
+    def reservation(self, task_id: str) -> int:
+        return self._reserved.get(task_id, 0)
+
+    async def free(self, root: Optional[str] = None) -> int:
+        """Free bytes on the filesystem of `root` (LOCAL_STORAGE by default)"""
+        path = root or Config.LOCAL_STORAGE
+        try:
+            return await executors.disk_io.run(lambda: shutil.disk_usage(_existing(path)).free)
+        except OSError as e:
+            LOGGER.debug(f"Disk usage unavailable: {e}")
+            return 0
+
+    def _others(self, task_id: str) -> int:
+        """Bytes reserved by the other tasks on the same filesystem"""
+        device = self._devices.get(task_id)
+        return sum(
+            nbytes for tid, nbytes in self._reserved.items()
+            if tid != task_id and self._devices.get(tid) == device
+        )
+
+    async def _fits(self, task_id: str, nbytes: int) -> bool:
+        others = self._others(task_id)
+        if others == 0:
+            return True
+        # Part of `others` may already be on disk, so this errs on the side of waiting
+        available = await self.free(self._roots.get(task_id)) - Config.DISK_FREE_MARGIN * MB - others
+        return nbytes - self.reservation(task_id) <= available
+
+    async def reserve(self, task_id: str, nbytes: int, kind: Optional[str] = None,
+                      on_wait: Optional[Callable] = None, cancel_event: Optional[asyncio.Event] = None,
+                      root: Optional[str] = None) -> bool:
+        """Set the reservation of a task to `nbytes`, waiting for room when it grows
+
+        `root` is the folder the task downloads into; a resize keeps the one
+        given first. Returns False if `cancel_event` was set while waiting.
+        """
+        if not self.enabled or not task_id:
+            return True
+        if task_id not in self._roots:
+            root = root or Config.LOCAL_STORAGE
+            try:
+                device = await executors.disk_io.run(lambda: os.stat(_existing(root)).st_dev)
+            except OSError:
+                device = None
+            self._roots[task_id] = root
+            self._devices[task_id] = device
+        async with self._cond:
+            if nbytes <= self.reservation(task_id):
+                self._set(task_id, nbytes, kind)
+                self._cond.notify_all()
+                return True
+            if task_id in self._reserved:
+                # New admissions wait for the grown reservation instead
+                if not await self._fits(task_id, nbytes):
+                    LOGGER.info(f"Task {task_id} grew to {nbytes // MB} MB, "
+                                f"more than the free disk space left to it")
+                self._set(task_id, nbytes, kind)
+                return True
+            waited = None
+            while not await self._fits(task_id, nbytes):
+                if cancel_event and cancel_event.is_set():
+                    self._roots.pop(task_id, None)
+                    self._devices.pop(task_id, None)
+                    return False
+                if waited is None:
+                    waited = time.monotonic()
+                    LOGGER.info(f"Task {task_id} waiting for {nbytes // MB} MB of disk space "
+                                f"({self._others(task_id) // MB} MB reserved by other tasks)")
+                    if on_wait:
+                        try:
+                            await on_wait(nbytes)
+                        except Exception:
+                            pass
+                try:
+                    await asyncio.wait_for(self._cond.wait(), self.RECHECK_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+            if waited is not None:
+                LOGGER.info(f"Task {task_id} got its disk space after {time.monotonic() - waited:.0f}s")
+            self._set(task_id, nbytes, kind)
+            return True
+
+    def _set(self, task_id: str, nbytes: int, kind: Optional[str]):
+        self._reserved[task_id] = max(0, int(nbytes))
+        if kind:
+            self._kinds[task_id] = kind
+
+    def kind(self, task_id: str) -> Optional[str]:
+        return self._kinds.get(task_id)
+
+    async def wake(self):
+        """Make waiting tasks look at the disk again (after a cancel or a cleanup outside the budget)"""
+        async with self._cond:
+            self._cond.notify_all()
+
+    async def release(self, task_id: str, nbytes: Optional[int] = None):
+        """Give back `nbytes` of a reservation (all of it when None)"""
+        if task_id not in self._reserved:
+            return
+        async with self._cond:
+            if nbytes is None or nbytes >= self._reserved.get(task_id, 0):
+                self._reserved.pop(task_id, None)
+                self._kinds.pop(task_id, None)
+                self._roots.pop(task_id, None)
+                self._devices.pop(task_id, None)
+            else:
+                self._reserved[task_id] -= int(nbytes)
+            self._cond.notify_all()
+
+
+disk_budget = DiskBudget()
@@ -0,0 +1,92 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator
+
+from config import Config
+from bot.helpers import metrics
+
+
+class BoundedExecutor:
+    """A named thread pool that reports its queue depth, running jobs and queue wait time"""
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+
+    def _publish(self):
+        metrics.EXECUTOR_QUEUED.set(self._queued, pool=self.name)
+        metrics.EXECUTOR_ACTIVE.set(self._active, pool=self.name)
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        queued_at = time.monotonic()
+        started = False
+
+        def _run():
+            nonlocal started
+            with self._lock:
+                started = True
+                self._queued -= 1
+                self._active += 1
+                self._publish()
+            metrics.EXECUTOR_WAIT.observe(time.monotonic() - queued_at, pool=self.name)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._publish()
+
+        def _done(future: Future):
+            # Cancelled before a thread picked it up
+            with self._lock:
+                if not started:
+                    self._queued -= 1
+                    self._publish()
+
+        with self._lock:
+            self._queued += 1
+            self._publish()
+        future = self._pool.submit(_run)
+        future.add_done_callback(_done)
+        return future
+
+    def map(self, fn: Callable, iterable: Iterable) -> Iterator:
+        """Like ThreadPoolExecutor.map: everything is submitted first, results come in order"""
+        futures = [self.submit(fn, item) for item in iterable]
+        try:
+            for future in futures:
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        """Await fn(*args, **kwargs) running on this pool"""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+
+_cpus = os.cpu_count() or 1
+_executors: Dict[str, BoundedExecutor] = {}
+
+
+def get(name: str, max_workers: int) -> BoundedExecutor:
+    """The executor called `name`, created with `max_workers` threads on first use"""
+    executor = _executors.get(name)
+    if executor is None:
+        executor = _executors.setdefault(name, BoundedExecutor(name, max_workers))
+    return executor
+
+
+# File system walks, stats, reads and deletes
+disk_io = get('disk_io', Config.DISK_IO_WORKERS or min(32, _cpus * 4))
+# Zipping and other work that holds the CPU
+cpu = get('cpu', Config.CPU_WORKERS or _cpus)
+# Blocking network SDKs (google-api-python-client)
+network = get('network', Config.NETWORK_WORKERS)
@@ -1,11 +1,14 @@
 import os
-import asyncio
 from config import Config
 
 from ..settings import bot_set
 from .message import send_message, edit_message
 from .utils import *
 from .uploader import _post_rclone_manage_button
+from .media_cache import media_cache
+from .tasks import task_manager, item_key
+from . import metrics, executors
+from .uploader_utils.rclone.rc import rclone_rc, RcloneRCError
 
 #
 #
@@ -14,17 +17,23 @@ from .uploader import _post_rclone_manage_button
 #
 
 async def track_upload(metadata, user, disable_link=False):
+    delivered = True
     if bot_set.upload_mode == 'Local':
         await local_upload(metadata, user)
     elif bot_set.upload_mode == 'Telegram':
-        await telegram_upload(metadata, user)
+        delivered = await telegram_upload(metadata, user) is not None
     else:
         rclone_link, index_link, remote_info = await rclone_upload(user, metadata['filepath'])
+        delivered = bool(rclone_link)
         if not disable_link:
             await post_simple_message(user, metadata, rclone_link, index_link)
+    if delivered:
+        await task_manager.mark_done(user, item_key(metadata.get('provider'), metadata.get('itemid')))
 
     try:
+        size = os.path.getsize(metadata['filepath'])
         os.remove(metadata['filepath'])
+        await task_manager.release_disk(user.get('task_id'), size)
     except FileNotFoundError:
         pass
 
@@ -98,18 +107,22 @@ async def playlist_upload(metadata, user):
                     _, _, remote_info = await rclone_upload(user, f"{Config.DOWNLOAD_BASE_DIR}/{user['r_id']}/")
                     if remote_info:
                         await _post_rclone_manage_button(user, remote_info)
+                        await _checkpoint_tracks(user, metadata['tracks'])
                 except Exception:
                     pass
             else:
-                for track in metadata['tracks']:
-                    try:
-                        rclone_link, index_link, remote_info = await rclone_upload(user, track['filepath'])
-                        if not bot_set.disable_sort_link:
-                            await post_simple_message(user, track, rclone_link, index_link)
-                    except ValueError: # might try to upload track which is not available
-                        pass
+                # One batched transfer for every track, then a message per track
+                tracks = [t for t in metadata['tracks'] if t.get('filepath')]
+                links, _ = await rclone_upload_batch(user, [t['filepath'] for t in tracks])
+                for track in tracks:
+                    if track['filepath'] in links:
+                        rclone_link, index_link = links[track['filepath']]
+                        await post_simple_message(user, track, rclone_link, index_link)
+                await _checkpoint_tracks(user, [t for t in tracks if t['filepath'] in links])
         else:
             rclone_link, index_link, remote_info = await rclone_upload(user, metadata['folderpath'])
+            if remote_info:
+                await _checkpoint_tracks(user, metadata['tracks'])
             if metadata['poster_msg']:
                 try:
                     await edit_art_poster(metadata, user, rclone_link, index_link, await format_string(lang.s.PLAYLIST_TEMPLATE, metadata, user))
@@ -120,12 +133,55 @@ async def playlist_upload(metadata, user):
             if remote_info:
                 await _post_rclone_manage_button(user, remote_info)
 
+async def _checkpoint_tracks(user, tracks):
+    """Checkpoint tracks delivered by a playlist-wide upload, they skip track_upload"""
+    for track in tracks:
+        await task_manager.mark_done(user, item_key(track.get('provider'), track.get('itemid')))
+
 #
 #
 #  CORE
 #
 #
 
+def _compute_relative(p: str, base: str | None) -> str:
+    try:
+        p_abs = os.path.abspath(p)
+        if base:
+            base_abs = os.path.abspath(base)
+            if p_abs.startswith(base_abs):
+                return os.path.relpath(p_abs, base_abs)
+    except Exception:
+        pass
+    return os.path.basename(p_abs) if os.path.isfile(p_abs) else os.path.basename(os.path.normpath(p_abs))
+
+
+def _remote_info(dest_root: str, relative_path: str, is_directory: bool) -> dict:
+    """Manage context compatible with the modern manage UI"""
+    try:
+        if dest_root and ':' in dest_root:
+            remote_name, remote_base = dest_root.split(':', 1)
+            remote_base = remote_base.strip('/')
+        else:
+            remote_name = (dest_root or '').rstrip(':')
+            remote_base = ''
+    except Exception:
+        remote_name = (dest_root or '').rstrip(':')
+        remote_base = ''
+
+    return {
+        'remote': remote_name,
+        'base': remote_base,
+        'path': relative_path,
+        'is_dir': is_directory
+    }
+
+
+def _transfer_progress(user):
+    reporter = user.get('progress')
+    return reporter.update_transfer if reporter else None
+
+
 async def rclone_upload(user, realpath):
     """
     Legacy Rclone uploader with copy scope (FILE/FOLDER), link generation, and manage context.
@@ -134,17 +190,6 @@ async def rclone_upload(user, realpath):
     # Preserve legacy base path usage for relative computations
     base_path = f"{Config.DOWNLOAD_BASE_DIR}/{user['r_id']}/"
 
-    def _compute_relative(p: str, base: str | None) -> str:
-        try:
-            p_abs = os.path.abspath(p)
-            if base:
-                base_abs = os.path.abspath(base)
-                if p_abs.startswith(base_abs):
-                    return os.path.relpath(p_abs, base_abs)
-        except Exception:
-            pass
-        return os.path.basename(p_abs) if os.path.isfile(p_abs) else os.path.basename(os.path.normpath(p_abs))
-
     dest_root = Config.RCLONE_DEST
     abs_path = os.path.abspath(realpath)
     is_directory = os.path.isdir(abs_path)
@@ -171,43 +216,27 @@ async def rclone_upload(user, realpath):
             source_for_copy = abs_path
             dest_path = f"{dest_root}/{parent_dir}".rstrip("/")
 
-    copy_cmd = f'rclone copy --config ./rclone.conf "{source_for_copy}" "{dest_path}"'
-    task = await asyncio.create_subprocess_shell(
-        copy_cmd,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE
-    )
-    stdout, stderr = await task.communicate()
-    if task.returncode != 0:
-        try:
-            LOGGER.debug(f"Rclone copy failed: {stderr.decode().strip()}")
-        except Exception:
-            pass
+    try:
+        with metrics.Timer() as timer:
+            await rclone_rc.transfer(
+                source_for_copy,
+                dest_path,
+                os.path.isdir(source_for_copy),
+                on_stats=_transfer_progress(user),
+                _config={'Transfers': Config.RCLONE_TRANSFERS}
+            )
+    except RcloneRCError as e:
+        LOGGER.debug(f"Rclone copy failed: {e}")
+        task_manager.mark_failed(user)
+        metrics.observe_upload('rclone', timer.elapsed, ok=False)
         return None, None, None
+    metrics.observe_upload('rclone', timer.elapsed, await executors.disk_io.run(metrics.path_size, abs_path))
 
     # Generate links using legacy helper
     r_link, i_link = await create_link(realpath, base_path)
+    media_cache.record_links(user, r_link, i_link)
 
-    # Build manage context compatible with modern manage UI
-    remote_name = ''
-    remote_base = ''
-    try:
-        if dest_root and ':' in dest_root:
-            remote_name, remote_base = dest_root.split(':', 1)
-            remote_base = remote_base.strip('/')
-        else:
-            remote_name = (dest_root or '').rstrip(':')
-            remote_base = ''
-    except Exception:
-        remote_name = (dest_root or '').rstrip(':')
-        remote_base = ''
-
-    remote_info = {
-        'remote': remote_name,
-        'base': remote_base,
-        'path': relative_path,
-        'is_dir': is_directory
-    }
+    remote_info = _remote_info(dest_root, relative_path, is_directory)
 
     # Post manage button right after upload to match Apple/Tidal NG UX
     try:
@@ -219,6 +248,84 @@ async def rclone_upload(user, realpath):
     return r_link, i_link, remote_info
 
 
+async def rclone_upload_batch(user, paths):
+    """
+    Uploads many files with one rclone job (per source root) instead of a copy
+    and a link call per file. FOLDER scope also takes the rest of each file's folder.
+    Returns: ({path: (rclone_link, index_link)} for uploaded paths, remote_info)
+    """
+    base_path = f"{Config.DOWNLOAD_BASE_DIR}/{user['r_id']}/"
+    dest_root = Config.RCLONE_DEST
+    scope = getattr(bot_set, 'rclone_copy_scope', 'FILE').upper()
+
+    # Group files by the local root their remote path is relative to
+    relative = {}
+    groups = {}
+    for p in paths:
+        abs_path = os.path.abspath(p)
+        if not os.path.isfile(abs_path): # might try to upload track which is not available
+            continue
+        if scope == 'FOLDER':
+            parent = os.path.dirname(abs_path)
+            rel_parent = _compute_relative(parent, base_path)
+            root = parent[:-len(rel_parent)]
+            rel = os.path.join(rel_parent, os.path.basename(abs_path))
+            files = groups.setdefault(root, set())
+            for dirpath, _, names in os.walk(parent):
+                files.update(os.path.relpath(os.path.join(dirpath, n), root) for n in names)
+        else:
+            rel = _compute_relative(abs_path, base_path)
+            root = abs_path[:-len(rel)]
+            groups.setdefault(root, set()).add(rel)
+        relative[p] = (root, rel)
+    if not relative:
+        return {}, None
+
+    uploaded = set()
+    for root, files in groups.items():
+        size = sum(os.path.getsize(os.path.join(root, f)) for f in files)
+        try:
+            with metrics.Timer() as timer:
+                await rclone_rc.copy_files(
+                    root,
+                    sorted(files),
+                    dest_root,
+                    transfers=Config.RCLONE_TRANSFERS,
+                    on_stats=_transfer_progress(user)
+                )
+        except RcloneRCError as e:
+            LOGGER.debug(f"Rclone batch copy failed for {root}: {e}")
+            task_manager.mark_failed(user)
+            metrics.observe_upload('rclone', timer.elapsed, ok=False)
+            continue
+        metrics.observe_upload('rclone', timer.elapsed, size)
+        uploaded.update(os.path.join(root, f) for f in files)
+
+    done = {p: rel for p, (root, rel) in relative.items() if os.path.join(root, rel) in uploaded}
+    r_links = {}
+    if bot_set.link_options in ['RCLONE', 'Both']:
+        targets = {p: f"{dest_root}/{rel}" for p, rel in done.items()}
+        found = await rclone_rc.public_links(list(targets.values()))
+        r_links = {p: found.get(t) for p, t in targets.items()}
+    links = {}
+    for p, rel in done.items():
+        i_link = None
+        if bot_set.link_options in ['Index', 'Both'] and Config.INDEX_LINK:
+            i_link = Config.INDEX_LINK + '/' + quote(rel)
+        links[p] = (r_links.get(p), i_link)
+        media_cache.record_links(user, r_links.get(p), i_link)
+
+    remote_info = None
+    if done:
+        common = os.path.commonpath([os.path.dirname(rel) or '.' for rel in done.values()])
+        remote_info = _remote_info(dest_root, '' if common == '.' else common, True)
+        try:
+            await _post_rclone_manage_button(user, remote_info)
+        except Exception:
+            pass
+    return links, remote_info
+
+
 async def local_upload(metadata, user):
     """
     Copies directory to local storage and merges contents if the destination exists.
@@ -252,8 +359,10 @@ async def telegram_upload(track, user):
     Only upload a single track
     Args:
         track: track metadata
+    Returns:
+        The sent message, None if the upload failed
         """
-    await send_message(user, track['filepath'], 'audio', meta=track)
+    return await send_message(user, track['filepath'], 'audio', meta=track)
 
 
 async def batch_telegram_upload(metadata, user):
@@ -263,12 +372,17 @@ async def batch_telegram_upload(metadata, user):
         user: user details
     """
     if metadata['type'] == 'album' or metadata['type'] == 'playlist':
-        for track in metadata['tracks']:
-            try:
-                await telegram_upload(track, user)
-            except FileNotFoundError:
-                pass
+        tracks = metadata['tracks']
     elif metadata['type'] == 'artist':
-        for album in metadata['albums']:
-            for track in album['tracks']:
-                await telegram_upload(track, user)
+        tracks = [track for album in metadata['albums'] for track in album['tracks']]
+    else:
+        return
+    for track in tracks:
+        key = item_key(track.get('provider'), track.get('itemid'))
+        if task_manager.is_done(user, key):
+            continue
+        try:
+            if await telegram_upload(track, user) is not None:
+                await task_manager.mark_done(user, key)
+        except FileNotFoundError:
+            pass
@@ -1,5 +1,6 @@
 import os
 import math
+import time
 import aiohttp
 import asyncio
 import shutil
@@ -9,7 +10,6 @@ from pathlib import Path
 from urllib.parse import quote
 from aiohttp import ClientTimeout
 from pyrogram.errors import MessageNotModified
-from concurrent.futures import ThreadPoolExecutor
 from pyrogram.errors import FloodWait
 
 from config import Config
@@ -19,12 +19,14 @@ from ..logger import LOGGER
 from ..settings import bot_set
 from .buttons.links import links_button
 from .message import send_message, edit_message
+from . import metrics, executors
+from .uploader_utils.rclone.rc import rclone_rc, RcloneRCError
 
 
 MAX_SIZE = 1.9 * 1024 * 1024 * 1024  # 2GB
 # download folder structure : BASE_DOWNLOAD_DIR + message_r_id
 
-async def download_file(url, path, retries=3, timeout=30, cancel_event: asyncio.Event | None = None):
+async def download_file(url, path, retries=3, timeout=30, cancel_event: asyncio.Event | None = None, provider: str = 'other'):
     """
     Download a file with retry logic, timeout, and cooperative cancellation
     Args:
@@ -33,9 +35,19 @@ async def download_file(url, path, retries=3, timeout=30, cancel_event: asyncio.
         retries (int): Number of retry attempts
         timeout (int): Timeout in seconds
         cancel_event: Optional asyncio.Event to signal cancellation
+        provider (str): Provider label used for the download metrics
     Returns:
         str or None: Error message if failed, else None
     """
+    start = time.monotonic()
+    err = await _download_file(url, path, retries, timeout, cancel_event)
+    if err != "Cancelled":
+        size = os.path.getsize(path) if not err and os.path.exists(path) else 0
+        metrics.observe_download(provider, time.monotonic() - start, size, ok=not err)
+    return err
+
+
+async def _download_file(url, path, retries, timeout, cancel_event):
     os.makedirs(os.path.dirname(path), exist_ok=True)
 
     for attempt in range(1, retries + 1):
@@ -147,20 +159,10 @@ async def create_link(path, basepath):
     index_link = None
 
     if bot_set.link_options == 'RCLONE' or bot_set.link_options=='Both':
-        cmd = f'rclone link --config ./rclone.conf "{Config.RCLONE_DEST}/{path}"'
-        task = await asyncio.create_subprocess_shell(
-            cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-
-        stdout, stderr = await task.communicate()
-
-        if task.returncode == 0:
-            rclone_link = stdout.decode().strip()
-        else:
-            error_message = stderr.decode().strip()
-            LOGGER.debug(f"Failed to get link: {error_message}")
+        try:
+            rclone_link = await rclone_rc.public_link(f"{Config.RCLONE_DEST}/{path}")
+        except RcloneRCError as e:
+            LOGGER.debug(f"Failed to get link: {e}")
     if bot_set.link_options == 'Index' or bot_set.link_options=='Both':
         if Config.INDEX_LINK:
             index_link =  Config.INDEX_LINK + '/' + quote(path)
@@ -169,13 +171,9 @@ async def create_link(path, basepath):
 
 
 async def zip_handler(folderpath):
-    loop = asyncio.get_running_loop()
-    with ThreadPoolExecutor() as pool:
-        if bot_set.upload_mode == 'Telegram':
-            zips = await loop.run_in_executor(pool, split_zip_folder, folderpath)
-        else:
-            zips = await loop.run_in_executor(pool, zip_folder, folderpath)
-        return zips
+    if bot_set.upload_mode == 'Telegram':
+        return await executors.cpu.run(split_zip_folder, folderpath)
+    return await executors.cpu.run(zip_folder, folderpath)
 
 
 def split_zip_folder(folderpath) -> list:
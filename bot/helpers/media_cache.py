@@ -0,0 +1,253 @@
+import re
+import json
+import time
+from typing import Optional
+
+from config import Config
+from bot.logger import LOGGER
+from bot.settings import bot_set
+from bot.helpers import executors
+
+from .database.pg_impl import media_cache_db, user_set_db
+
+
+_CONTENT_PATTERNS = {
+    'apple': re.compile(r'/(album|song|playlist|music-video|artist)/[^/]+/(\d+)'),
+    'tidal': re.compile(r'/(track|album|playlist|video|artist|mix)/([\w-]+)'),
+    'qobuz': re.compile(r'/(album|track|playlist|artist|label)/(?:[^/?]+/)*([\w-]+)/?(?:\?|$)'),
+    'deezer': re.compile(r'/(track|album|playlist|artist)/(\d+)'),
+}
+
+
+def parse_content_id(provider: str, link: str) -> Optional[str]:
+    """Return a stable "<type>-<id>" for a provider link, or None if it can't be parsed offline"""
+    pattern = _CONTENT_PATTERNS.get(provider)
+    if not pattern:
+        return None
+    match = pattern.search(link)
+    if not match:
+        return None
+    kind, item_id = match.group(1), match.group(2)
+    # Apple album links with ?i=<id> point at a single song
+    if provider == 'apple':
+        song = re.search(r'[?&]i=(\d+)', link)
+        if song:
+            kind, item_id = 'song', song.group(1)
+    return f"{kind}-{item_id}"
+
+
+class MediaCache:
+    """Reuses Telegram file_ids and upload links of content that was already delivered.
+
+    While a download runs, `send_message` and the uploaders report every media
+    message and link they produce to the recorder stored in `user['media_cache']`.
+    When the task completes cleanly the recording is stored under
+    provider + item id + quality + delivery mode, and a later request for the same
+    key is answered by re-sending the cached media instead of downloading again.
+    """
+
+    def __init__(self):
+        self.ttl = Config.MEDIA_CACHE_TTL * 3600
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    async def resolve_key(self, provider: str, link: str, user: dict, options: dict = None) -> Optional[str]:
+        """Build the cache key for a request; None means the request is not cacheable"""
+        if not self.enabled:
+            return None
+        content_id = parse_content_id('tidal' if provider == 'tidal_ng' else provider, link)
+        if not content_id:
+            return None
+        quality = await self._quality(provider, options or {})
+        delivery = self._delivery(provider, user)
+        if quality is None or delivery is None:
+            return None
+        return f"{provider}:{content_id}:{quality}:{delivery}"
+
+    async def _quality(self, provider: str, options: dict) -> Optional[str]:
+        if provider == 'apple':
+            flags = ','.join(f"{k}={v}" for k, v in sorted(options.items()) if k != 'nocache')
+            return f"{bot_set.apple.get('format')}|{flags}"
+        if provider == 'qobuz':
+            return str(bot_set.qobuz.quality) if bot_set.qobuz else None
+        if provider == 'deezer':
+            return str(bot_set.deezer.quality) if bot_set.deezer else None
+        if provider == 'tidal':
+            return f"{bot_set.tidal.quality}|{bot_set.tidal.spatial}" if bot_set.tidal else None
+        if provider == 'tidal_ng':
+            from .tidal_ng.utils import SETTINGS_PATH
+
+            def _read():
+                try:
+                    with open(SETTINGS_PATH, 'r', encoding='utf-8') as f:
+                        return json.load(f).get('quality_audio')
+                except Exception:
+                    return None
+            return str(await executors.disk_io.run(_read))
+        return None
+
+    def _delivery(self, provider: str, user: dict) -> Optional[str]:
+        """Describe where/how the content is delivered; cached media only fits the same mode"""
+        if provider == 'apple':
+            uploader, _ = user_set_db.get_user_setting(user['user_id'], 'default_uploader')
+            zips = (bot_set.apple_album_zip, bot_set.apple_playlist_zip, bot_set.artist_zip)
+            mode = uploader or 'telegram'
+            if mode != 'telegram':
+                # GDrive/Rclone destinations are per-user, so are their links
+                mode = f"{mode}={user['user_id']}"
+        else:
+            if bot_set.upload_mode == 'Local':
+                return None
+            if provider == 'tidal_ng':
+                zips = (bot_set.tidal_ng_album_zip, bot_set.tidal_ng_playlist_zip)
+            else:
+                zips = (bot_set.album_zip, bot_set.playlist_zip, bot_set.artist_zip, bot_set.playlist_sort)
+            mode = bot_set.upload_mode.lower()
+            if mode == 'rclone':
+                mode = f"rclone={bot_set.rclone_dest or Config.RCLONE_DEST}"
+        return f"{mode}|{''.join('1' if z else '0' for z in zips)}"
+
+    # --- Lookup / replay ---
+
+    def lookup(self, cache_key: str) -> Optional[dict]:
+        try:
+            entry = media_cache_db.get_entry(cache_key)
+        except Exception as e:
+            LOGGER.error(f"Media cache lookup failed: {e}")
+            return None
+        if not entry:
+            return None
+        if time.time() - float(entry.get('created_at') or 0) > self.ttl:
+            self.invalidate_key(cache_key)
+            return None
+        return entry
+
+    async def _verified(self, media: list) -> Optional[list]:
+        """The cached items with fresh file_ids, or None if any of them can't be re-sent
+
+        Looks up the messages the files were first delivered in (one request per
+        200 messages of a chat), so a stale entry is caught before anything is sent.
+        """
+        from bot.tgclient import aio
+
+        chats = {}
+        for item in media:
+            if not item.get('chat_id') or not item.get('message_id'):
+                # Recorded without its message, can't be checked up front
+                return None
+            chats.setdefault(item['chat_id'], []).append(item['message_id'])
+        found = {}
+        try:
+            for chat_id, ids in chats.items():
+                for i in range(0, len(ids), 200):
+                    for msg in await aio.get_messages(chat_id, ids[i:i + 200]):
+                        media_obj = getattr(msg, 'audio', None) or getattr(msg, 'document', None) or getattr(msg, 'video', None)
+                        if media_obj is not None:
+                            found[(chat_id, msg.id)] = media_obj.file_id
+        except Exception as e:
+            LOGGER.info(f"Media cache check failed: {e}")
+            return None
+        verified = []
+        for item in media:
+            file_id = found.get((item['chat_id'], item['message_id']))
+            if file_id is None:
+                return None
+            verified.append({**item, 'file_id': file_id})
+        return verified
+
+    async def replay(self, user: dict, cache_key: str) -> bool:
+        """Re-send cached media/links for a key. Returns False (nothing sent) on a miss."""
+        entry = self.lookup(cache_key)
+        if not entry or not (entry.get('media') or entry.get('links')):
+            return False
+
+        from .message import send_message
+        from .buttons.links import links_button
+
+        media = entry.get('media') or []
+        if media:
+            media = await self._verified(media)
+            if media is None:
+                # Some source message is gone: drop the entry and download normally
+                LOGGER.info(f"Media cache entry {cache_key} is no longer valid, invalidating")
+                self.invalidate_key(cache_key)
+                return False
+
+        LOGGER.info(f"Media cache hit for {cache_key}")
+        total = len(media)
+        for idx, item in enumerate(media, start=1):
+            msg = await send_message(user, item['file_id'], 'cached', caption=item.get('caption'))
+            if msg is None:
+                LOGGER.info(f"Media cache entry {cache_key} failed at item {idx}/{total}, invalidating")
+                self.invalidate_key(cache_key)
+                if idx == 1:
+                    return False
+                # Downloading now would send the first items twice, the next request downloads instead
+                await send_message(user, f"Only {idx - 1}/{total} cached files could be sent, request the link again to download it.")
+                return True
+        for link in entry.get('links') or []:
+            await send_message(user, link.get('text') or '🔗 Links', markup=links_button(link.get('rclone'), link.get('index')))
+        return True
+
+    # --- Recording ---
+
+    def start_recording(self, user: dict, cache_key: Optional[str]):
+        if cache_key:
+            user['media_cache'] = {'key': cache_key, 'media': [], 'links': [], 'failed': False}
+
+    def record_media(self, user: dict, msg, caption=None):
+        rec = user.get('media_cache') if isinstance(user, dict) else None
+        if rec is None or msg is None:
+            return
+        media = getattr(msg, 'audio', None) or getattr(msg, 'document', None) or getattr(msg, 'video', None)
+        if media is None:
+            return
+        rec['media'].append({
+            'file_id': media.file_id,
+            'caption': caption,
+            'chat_id': msg.chat.id,
+            'message_id': msg.id,
+        })
+
+    def record_links(self, user: dict, rclone_link=None, index_link=None, text=None):
+        rec = user.get('media_cache') if isinstance(user, dict) else None
+        if rec is None or not (rclone_link or index_link or text):
+            return
+        rec['links'].append({'rclone': rclone_link, 'index': index_link, 'text': text})
+
+    def record_failure(self, user: dict):
+        rec = user.get('media_cache') if isinstance(user, dict) else None
+        if rec is not None:
+            rec['failed'] = True
+
+    def commit(self, user: dict):
+        """Persist the recording of a completed task (skipped if cancelled or partially failed)"""
+        rec = user.pop('media_cache', None)
+        if not rec or rec['failed'] or not (rec['media'] or rec['links']):
+            return
+        cancel_event = user.get('cancel_event')
+        if cancel_event and cancel_event.is_set():
+            return
+        provider, content_id = rec['key'].split(':', 2)[:2]
+        try:
+            media_cache_db.set_entry(rec['key'], provider, content_id, rec['media'], rec['links'])
+            LOGGER.info(f"Media cache stored {len(rec['media'])} file(s) for {rec['key']}")
+        except Exception as e:
+            LOGGER.error(f"Media cache store failed: {e}")
+
+    # --- Invalidation ---
+
+    def invalidate_key(self, cache_key: str):
+        try:
+            media_cache_db.delete_entry(cache_key)
+        except Exception as e:
+            LOGGER.error(f"Media cache delete failed: {e}")
+
+    def invalidate(self, provider: Optional[str] = None, content_id: Optional[str] = None) -> int:
+        """Drop cached entries for a provider item (every quality/delivery mode), or everything"""
+        return media_cache_db.delete_content(provider, content_id)
+
+
+media_cache = MediaCache()
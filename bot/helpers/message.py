@@ -9,6 +9,7 @@ from pyrogram.enums import ParseMode
 
 from bot.settings import bot_set
 from bot.logger import LOGGER
+from bot.helpers import metrics, executors
 
 import bot.helpers.translations as lang
 
@@ -133,8 +134,8 @@ async def send_message(user, item, itype='text', caption=None, markup=None, chat
         try:
             await progress_reporter.set_stage(progress_label or 'Uploading')
             # Run blocking file operations in a thread
-            if isinstance(item, str) and await asyncio.to_thread(os.path.exists, item):
-                total_bytes = await asyncio.to_thread(os.path.getsize, item)
+            if isinstance(item, str) and await executors.disk_io.run(os.path.exists, item):
+                total_bytes = await executors.disk_io.run(os.path.getsize, item)
                 await progress_reporter.update_upload(0, total_bytes, file_index=file_index, file_total=total_files, label=progress_label or 'Uploading')
         except Exception:
             pass
@@ -142,6 +143,7 @@ async def send_message(user, item, itype='text', caption=None, markup=None, chat
     # Create the progress callback instance using the main loop
     progress_callback = _make_progress_cb(main_loop, progress_label, file_index, total_files) if progress_reporter else None
 
+    started = time.monotonic()
     try:
         if itype == 'text':
             msg = await aio.send_message(
@@ -201,11 +203,34 @@ async def send_message(user, item, itype='text', caption=None, markup=None, chat
                 caption=caption,
                 reply_to_message_id=user['r_id']
             )
+        elif itype == 'cached':
+            # item is a Telegram file_id from the media cache
+            msg = await aio.send_cached_media(
+                chat_id=chat_id,
+                file_id=item,
+                caption=caption,
+                reply_to_message_id=user['r_id']
+            )
     except FloodWait as e:
+        metrics.FLOODWAITS.inc(method='send_message')
+        metrics.FLOODWAIT_SECONDS.inc(e.value, method='send_message')
         await asyncio.sleep(e.value)
         return await send_message(user, item, itype, caption, markup, chat_id, meta, progress_reporter, progress_label, file_index, total_files, cancel_event)
     except Exception as e:
         LOGGER.error(f"Error sending message: {str(e)}")
+
+    if itype in ('doc', 'audio', 'video'):
+        media = getattr(msg, 'audio', None) or getattr(msg, 'document', None) or getattr(msg, 'video', None)
+        metrics.observe_upload('telegram', time.monotonic() - started, getattr(media, 'file_size', 0) or 0, ok=msg is not None)
+
+    # Remember uploaded media so repeat requests can be answered from the media cache
+    if itype in ('doc', 'audio', 'video'):
+        if msg is None:
+            from bot.helpers.tasks import task_manager
+            task_manager.mark_failed(user)
+        elif 'media_cache' in user:
+            from bot.helpers.media_cache import media_cache
+            media_cache.record_media(user, msg, caption)
     
     return msg
 
@@ -223,7 +248,9 @@ async def edit_message(msg:Message, text, markup=None, antiflood=True):
     except MessageNotModified:
         return None
     except FloodWait as e:
+        metrics.FLOODWAITS.inc(method='edit_message')
         if antiflood:
+            metrics.FLOODWAIT_SECONDS.inc(e.value, method='edit_message')
             await asyncio.sleep(e.value)
             return await edit_message(msg, text, markup, antiflood)
         else:
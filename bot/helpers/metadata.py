@@ -167,7 +167,7 @@ async def create_cover_file(url:dict, meta:dict, thumbnail=False):
     cover = meta['tempfolder'] + filename
     
     if not os.path.exists(cover):
-        err = await download_file(url, cover, 1, 5)
+        err = await download_file(url, cover, 1, 5, provider='cover')
         if err:
             return './project-siesta.png'
     return cover
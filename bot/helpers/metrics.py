@@ -0,0 +1,246 @@
+import time
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+from aiohttp import web
+
+from bot.logger import LOGGER
+
+
+DEFAULT_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # Progress callbacks run in Pyrogram worker threads, so guard with a thread lock
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple:
+        return tuple(str(labels.get(n, '')) for n in self.labelnames)
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return '\n'.join(lines)
+
+    def _samples(self):
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {v}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple, float] = {}
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def set_function(self, function: Callable[[], float]):
+        """Compute the (unlabelled) value at scrape time"""
+        self._function = function
+
+    def _samples(self):
+        if self._function:
+            try:
+                return [f"{self.name} {self._function()}"]
+            except Exception:
+                return []
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {v}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[Tuple, list] = {}  # key -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data[i] += 1
+            data[-2] += value
+            data[-1] += 1
+
+    def _samples(self):
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        lines = []
+        for key, data in items:
+            for i, bound in enumerate(self.buckets):
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', str(bound)))} {data[i]}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', '+Inf'))} {data[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {data[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {data[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds the bot's metrics and serves them in Prometheus text format"""
+
+    def __init__(self):
+        self._metrics = []
+        self._runner: Optional[web.AppRunner] = None
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return '\n'.join(m.render() for m in self._metrics) + '\n'
+
+    async def _handle(self, request):
+        return web.Response(text=self.render(), content_type='text/plain', charset='utf-8')
+
+    async def start_server(self, host: str, port: int):
+        if self._runner or not port:
+            return
+        app = web.Application()
+        app.router.add_get('/metrics', self._handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        try:
+            await web.TCPSite(runner, host, port).start()
+        except OSError as e:
+            LOGGER.error(f"METRICS : Could not bind {host}:{port}: {e}")
+            await runner.cleanup()
+            return
+        self._runner = runner
+        LOGGER.info(f"METRICS : Serving on http://{host}:{port}/metrics")
+
+    async def stop_server(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+class Timer:
+    """Context manager measuring elapsed seconds (time.monotonic)"""
+
+    def __enter__(self):
+        self.start = time.monotonic()
+        self.elapsed = 0.0
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.monotonic() - self.start
+        return False
+
+
+registry = MetricsRegistry()
+
+SIZE_BUCKETS = (1 << 20, 10 << 20, 50 << 20, 100 << 20, 500 << 20, 1 << 30, 2 << 30)
+
+TASKS_FINISHED = registry.counter('bot_tasks_total', 'Finished tasks by label and final status', ('label', 'status'))
+TASK_DURATION = registry.histogram('bot_task_duration_seconds', 'Task run time from creation to finish', ('label', 'status'))
+TASKS_RUNNING = registry.gauge('bot_tasks_running', 'Tasks currently running')
+QUEUE_PENDING = registry.gauge('bot_queue_pending', 'Jobs waiting in the queue')
+QUEUE_WAIT = registry.histogram('bot_queue_wait_seconds', 'Time a queued job waited before starting')
+STAGE_DURATION = registry.histogram('bot_stage_duration_seconds', 'Time spent in each progress stage', ('provider', 'stage'))
+
+DOWNLOAD_BYTES = registry.counter('bot_download_bytes_total', 'Bytes downloaded from providers', ('provider',))
+DOWNLOAD_DURATION = registry.histogram('bot_download_duration_seconds', 'Per-file download time', ('provider',))
+DOWNLOAD_FAILURES = registry.counter('bot_download_failures_total', 'Failed file downloads', ('provider',))
+
+UPLOAD_BYTES = registry.counter('bot_upload_bytes_total', 'Bytes uploaded by destination', ('destination',))
+UPLOAD_DURATION = registry.histogram('bot_upload_duration_seconds', 'Per-item upload time', ('destination',))
+UPLOAD_SIZE = registry.histogram('bot_upload_size_bytes', 'Per-item upload size', ('destination',), SIZE_BUCKETS)
+UPLOAD_FAILURES = registry.counter('bot_upload_failures_total', 'Failed uploads', ('destination',))
+
+FLOODWAITS = registry.counter('bot_floodwait_total', 'Telegram FloodWait errors', ('method',))
+FLOODWAIT_SECONDS = registry.counter('bot_floodwait_seconds_total', 'Seconds slept because of FloodWait', ('method',))
+
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60)
+
+EXECUTOR_QUEUED = registry.gauge('bot_executor_queued', 'Jobs waiting for a thread in each executor', ('pool',))
+EXECUTOR_ACTIVE = registry.gauge('bot_executor_active', 'Jobs running in each executor', ('pool',))
+EXECUTOR_WAIT = registry.histogram('bot_executor_wait_seconds', 'Time a job waited for a thread', ('pool',), WAIT_BUCKETS)
+
+
+def observe_upload(destination: str, seconds: float, size: int = 0, ok: bool = True):
+    if not ok:
+        UPLOAD_FAILURES.inc(destination=destination)
+        return
+    UPLOAD_DURATION.observe(seconds, destination=destination)
+    if size:
+        UPLOAD_BYTES.inc(size, destination=destination)
+        UPLOAD_SIZE.observe(size, destination=destination)
+
+
+def observe_download(provider: str, seconds: float, size: int = 0, ok: bool = True):
+    if not ok:
+        DOWNLOAD_FAILURES.inc(provider=provider)
+        return
+    DOWNLOAD_DURATION.observe(seconds, provider=provider)
+    if size:
+        DOWNLOAD_BYTES.inc(size, provider=provider)
+
+
+def path_size(path: str) -> int:
+    """Size of a file or the total size of a directory tree (blocking; run in a thread)"""
+    import os
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        for f in files:
+            try:
+                total += os.path.getsize(os.path.join(root, f))
+            except OSError:
+                continue
+    return total
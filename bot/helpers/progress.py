@@ -5,6 +5,7 @@ import time
 from typing import Optional
 
 from bot.helpers.message import edit_message
+from bot.helpers import metrics, executors
 from bot.logger import LOGGER
 
 
@@ -13,6 +14,9 @@ class ProgressReporter:
         self.msg = msg
         self.label = label
         self.stage: str = "Preparing"
+        # Provider part of the label ("Apple Music • ID: x" -> "Apple Music") for metrics
+        self.provider: str = label.split("•")[0].strip() or label
+        self._stage_started: float = time.monotonic()
 
         self.download_percent: int = 0
         self.tracks_done: int = 0
@@ -38,6 +42,10 @@ class ProgressReporter:
         return "".join(["▰" for _ in range(filled)] + ["▱" for _ in range(blocks - filled)])
 
     async def set_stage(self, stage: str):
+        if stage != self.stage:
+            now = time.monotonic()
+            metrics.STAGE_DURATION.observe(now - self._stage_started, provider=self.provider, stage=self.stage)
+            self._stage_started = now
         self.stage = stage
         await self._maybe_update(force=True)
 
@@ -69,6 +77,17 @@ class ProgressReporter:
             self.stage = label
         await self._maybe_update()
 
+    async def update_transfer(self, stats: dict):
+        """Aggregated upload progress from an rclone job's core/stats"""
+        if self.stage != "Uploading":
+            await self.set_stage("Uploading")
+        await self.update_upload(
+            stats.get('bytes', 0),
+            stats.get('totalBytes', 0),
+            file_index=stats.get('transfers') or None,
+            file_total=stats.get('totalTransfers') or None,
+        )
+
     def should_update(self) -> bool:
         return (time.monotonic() - self._last_update) >= self._min_interval
 
@@ -99,7 +118,7 @@ class ProgressReporter:
 
         # Optional system stats line (run in a thread to avoid blocking)
         if self._show_system_stats:
-            stats_line = await asyncio.to_thread(self._get_system_stats_sync)
+            stats_line = await executors.disk_io.run(self._get_system_stats_sync)
             if stats_line:
                 lines.append(stats_line)
 
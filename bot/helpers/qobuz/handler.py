@@ -6,6 +6,8 @@ from pathvalidate import sanitize_filepath
 
 from ..legacy_utils import *
 from ..metadata import set_metadata
+from ..disk_budget import refine
+from ..tasks import task_manager, item_key
 
 # FIXED IMPORT: Changed from ..uploder to ..uploader
 from ..legacy_uploader import track_upload, album_upload, artist_upload, playlist_upload
@@ -32,7 +34,10 @@ async def start_qobuz(url:str, user:dict):
 async def start_album(item_id:int, user:dict, upload=True, basefolder=None):
     album_meta, err = await get_album_metadata(item_id, user['r_id'])
     if err:
+        task_manager.mark_failed(user)
         return await send_message(user, err)
+    if not await refine(user, 'qobuz', 'album', album_meta['duration']):
+        return
 
     # Get user quality by doing a track request
     track_meta = await qobuz_api.get_track_url(album_meta['tracks'][0]['itemid'])
@@ -87,10 +92,14 @@ async def start_track(item_id:int, user:dict, track_meta:dict | None, upload=Tru
     Returns:
         Acknowledgement (bool) when finished
     """
+    # Delivered before the bot restarted
+    if task_manager.is_done(user, item_key('Qobuz', item_id)):
+        return True
 
     if not track_meta:
         track_meta, err = await get_track_metadata(item_id, user['r_id'])
         if err:
+            task_manager.mark_failed(user)
             return await send_message(user, err)
         filepath = f"{Config.LEGACY_DOWNLOAD_BASE_DIR}/{user['r_id']}/{track_meta['provider']}/{track_meta['albumartist']}/{track_meta['album']}"
     else:
@@ -104,6 +113,7 @@ async def start_track(item_id:int, user:dict, track_meta:dict | None, upload=Tru
     try:
         url = raw_data['url']
     except KeyError:
+        task_manager.mark_failed(user)
         return await send_message(user, lang.s.ERR_QOBUZ_NOT_AVAILABLE)
 
     track_meta['extension'], track_meta['quality'] = await get_quality(raw_data)
@@ -114,8 +124,9 @@ async def start_track(item_id:int, user:dict, track_meta:dict | None, upload=Tru
     filepath = sanitize_filepath(filepath)
     track_meta['filepath'] = filepath
 
-    err = await download_file(url, filepath, cancel_event=user.get('cancel_event'))
+    err = await download_file(url, filepath, cancel_event=user.get('cancel_event'), provider='qobuz')
     if err:
+        task_manager.mark_failed(user)
         return await send_message(user, err)
 
     await set_metadata(track_meta)
@@ -157,6 +168,8 @@ async def start_artist(albums, user, artist):
 
 async def start_playlist(tracks, playlist, user):
     play_meta = await get_playlist_meta(playlist[0], tracks, user['r_id'])
+    if not await refine(user, 'qobuz', 'playlist', play_meta['duration']):
+        return
 
     playlist_folder = None
 
@@ -190,7 +203,8 @@ async def start_playlist(tracks, playlist, user):
         await run_concurrent_tasks(tasks, update_details)
     else:
         i = 0
-        if bot_set.playlist_zip: upload = False
+        # Rclone uploads the whole playlist as one batch after the downloads
+        if bot_set.playlist_zip or bot_set.upload_mode == 'RCLONE': upload = False
         for track in play_meta['tracks']:
             await progress_message(i, len(play_meta['tracks']), update_details)
             await start_track(track['itemid'], user, track, upload, playlist_folder, bot_set.disable_sort_link, True)
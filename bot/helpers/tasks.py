@@ -1,8 +1,20 @@
+import time
 import asyncio
 import uuid
 from typing import Dict, Optional, List, Callable, Any, Tuple
 
+from config import Config
 from bot.logger import LOGGER
+from bot.helpers import metrics
+
+
+# Fields of the user details a persisted job needs to message its user again
+JOB_CONTEXT = ('user_id', 'name', 'user_name', 'r_id', 'chat_id')
+
+
+def item_key(provider: str, item_id) -> str:
+    """Checkpoint key of a delivered track, e.g. Qobuz:12345"""
+    return f"{provider}:{item_id}"
 
 
 class TaskState:
@@ -16,6 +28,13 @@ class TaskState:
         self.status: str = "running"
         # Optional progress reporter instance
         self.progress = None
+        # Metrics bookkeeping: provider is filled in once the link is routed
+        self.created_at = time.monotonic()
+        self.provider: Optional[str] = None
+        self.failed = False
+        # Persisted queue entry of this task and what it already delivered
+        self.job_id: Optional[str] = None
+        self.checkpoint: Dict[str, Any] = {}
 
 
 class TaskManager:
@@ -26,14 +45,20 @@ class TaskManager:
         self._pending: List[Dict[str, Any]] = []  # each: {qid, user_id, link, options, job}
         self._pending_event = asyncio.Event()
         self._worker_started = False
+        metrics.TASKS_RUNNING.set_function(lambda: len(self._tasks))
+        metrics.QUEUE_PENDING.set_function(lambda: len(self._pending))
 
-    async def create(self, user: dict, label: str) -> TaskState:
+    async def create(self, user: dict, label: str, job_id: Optional[str] = None, checkpoint: Optional[Dict[str, Any]] = None) -> TaskState:
         async with self._lock:
             task_id = uuid.uuid4().hex[:8]
             state = TaskState(task_id, user.get("user_id"), user.get("chat_id"), label)
+            state.job_id = job_id
+            state.checkpoint = dict(checkpoint or {})
             self._tasks[task_id] = state
             LOGGER.info(f"Task {task_id} created for user {state.user_id} ({label})")
-            return state
+        if job_id:
+            self._store('update_job', job_id, state='running')
+        return state
 
     async def register_subprocess(self, task_id: str, process: asyncio.subprocess.Process):
         async with self._lock:
@@ -69,7 +94,8 @@ class TaskManager:
                     except Exception:
                         pass
                 LOGGER.info(f"Task {task_id} cancellation requested")
-            return True
+        await self._wake_disk_waiters()
+        return True
 
     async def cancel_all(self, user_id: Optional[int] = None) -> int:
         async with self._lock:
@@ -87,16 +113,119 @@ class TaskManager:
                             pass
                     count += 1
                     LOGGER.info(f"Task {tid} cancellation requested (bulk)")
-            return count
+        if count:
+            await self._wake_disk_waiters()
+        return count
 
     async def finish(self, task_id: str, status: str = "done"):
         async with self._lock:
             state = self._tasks.get(task_id)
             if state:
+                if status == "done" and state.failed:
+                    status = "failed"
                 state.status = status
+                labels = {'label': state.provider or state.label, 'status': status}
+                metrics.TASKS_FINISHED.inc(**labels)
+                metrics.TASK_DURATION.observe(time.monotonic() - state.created_at, **labels)
                 # Keep a short window before deletion if needed in future
                 del self._tasks[task_id]
                 LOGGER.info(f"Task {task_id} finished with status={status}")
+                if state.job_id:
+                    self._store('delete_job', state.job_id)
+        from bot.helpers.disk_budget import disk_budget
+        await disk_budget.release(task_id)
+
+    # --- Disk admission ---
+    async def reserve_disk(self, task_id: str, nbytes: int, kind: Optional[str] = None, on_wait=None,
+                           root: Optional[str] = None) -> bool:
+        """Hold `nbytes` of disk for a task, waiting while other tasks need the space.
+
+        Calling it again resizes the reservation (e.g. once the real album length is
+        known). Returns False when the task was cancelled while waiting.
+        """
+        from bot.helpers.disk_budget import disk_budget
+        state = self._tasks.get(task_id)
+        if not state:
+            return True
+        previous = state.status
+        state.status = "waiting for disk"
+        try:
+            return await disk_budget.reserve(task_id, nbytes, kind, on_wait, state.cancel_event, root)
+        finally:
+            if state.status == "waiting for disk":
+                state.status = previous
+
+    async def release_disk(self, task_id: Optional[str], nbytes: Optional[int] = None):
+        """Give back disk space of a task once its files are uploaded and removed"""
+        if not task_id:
+            return
+        from bot.helpers.disk_budget import disk_budget
+        await disk_budget.release(task_id, nbytes)
+
+    async def _wake_disk_waiters(self):
+        from bot.helpers.disk_budget import disk_budget
+        await disk_budget.wake()
+
+    # --- Persistence ---
+    @staticmethod
+    def _store(method: str, *args, **kwargs):
+        """Call the task queue repository; a database error must not break the download itself"""
+        try:
+            from bot.helpers.database.pg_impl import task_queue_db
+            return getattr(task_queue_db, method)(*args, **kwargs)
+        except Exception as e:
+            LOGGER.error(f"Task queue store failed ({method}): {e}")
+            return None
+
+    def persist_job(self, user: dict, link: str, options: Dict[str, Any], state: str = "queued") -> str:
+        """Store a download so it is picked up again after a restart, return its job id"""
+        job_id = uuid.uuid4().hex[:8]
+        context = {key: user.get(key) for key in JOB_CONTEXT}
+        self._store('save_job', job_id, user.get('user_id'), link, options or {}, context, state)
+        return job_id
+
+    def load_jobs(self) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Split the jobs left by the previous run into (to resume, given up).
+
+        A job that was running when the bot stopped counts one more attempt; after
+        TASK_MAX_ATTEMPTS it is dropped instead of crashing the bot in a loop.
+        """
+        resume, given_up = [], []
+        for job in self._store('get_jobs') or []:
+            if job.get('state') == 'running':
+                job['attempts'] = (job.get('attempts') or 0) + 1
+                if job['attempts'] > Config.TASK_MAX_ATTEMPTS:
+                    self._store('delete_job', job['job_id'])
+                    given_up.append(job)
+                    continue
+                self._store('update_job', job['job_id'], attempts=job['attempts'])
+            job['options'] = job.get('options') or {}
+            job['checkpoint'] = job.get('checkpoint') or {}
+            resume.append(job)
+        return resume, given_up
+
+    def is_done(self, user: dict, key: str) -> bool:
+        """Whether an earlier run of this task already delivered `key`"""
+        state = self._tasks.get(user.get('task_id'))
+        return bool(state) and key in state.checkpoint.get('done', ())
+
+    async def mark_done(self, user: dict, key: str):
+        """Checkpoint a delivered item, so a resumed task skips it"""
+        state = self._tasks.get(user.get('task_id'))
+        if not state or not state.job_id:
+            return
+        done = state.checkpoint.setdefault('done', [])
+        if key not in done:
+            done.append(key)
+            self._store('update_job', state.job_id, checkpoint=state.checkpoint)
+
+    def mark_failed(self, user: dict):
+        """Flag the task as failed (an item was not delivered), whether or not the media cache records it"""
+        state = self._tasks.get(user.get('task_id'))
+        if state:
+            state.failed = True
+        from bot.helpers.media_cache import media_cache
+        media_cache.record_failure(user)
 
     async def get(self, task_id: str) -> Optional[TaskState]:
         # Read-only; acceptable without lock
@@ -125,6 +254,7 @@ class TaskManager:
                         self._pending_event.clear()
                 if not item:
                     continue
+                metrics.QUEUE_WAIT.observe(time.monotonic() - item['enqueued_at'])
                 job = item.get('job')
                 try:
                     await job()
@@ -136,16 +266,20 @@ class TaskManager:
 
         asyncio.get_event_loop().create_task(_worker_loop())
 
-    async def enqueue(self, user_id: int, link: str, options: Dict[str, Any], job_coro_factory: Callable[[], Any]) -> Tuple[str, int]:
-        """Enqueue a job with metadata, return (queue_id, position)."""
+    async def enqueue(self, user_id: int, link: str, options: Dict[str, Any], job_coro_factory: Callable[[], Any], job_id: Optional[str] = None) -> Tuple[str, int]:
+        """Enqueue a job with metadata, return (queue_id, position).
+
+        `job_id` is the persisted entry of the job, it doubles as the queue id.
+        """
         async with self._lock:
-            qid = uuid.uuid4().hex[:8]
+            qid = job_id or uuid.uuid4().hex[:8]
             self._pending.append({
                 'qid': qid,
                 'user_id': user_id,
                 'link': link,
                 'options': options or {},
                 'job': job_coro_factory,
+                'enqueued_at': time.monotonic(),
             })
             self._pending_event.set()
             position = len(self._pending)
@@ -176,6 +310,7 @@ class TaskManager:
                     del self._pending[i]
                     if not self._pending:
                         self._pending_event.clear()
+                    self._store('delete_job', qid)
                     return True
         return False
 
@@ -9,6 +9,8 @@ from .metadata import *
 
 from ..legacy_utils import *
 from ..metadata import set_metadata, get_audio_extension
+from ..disk_budget import refine
+from ..tasks import task_manager, item_key
 from ..legacy_uploader import *
 from ..message import send_message
 
@@ -36,10 +38,15 @@ async def start_tidal(url:str, user:dict):
 
 async def start_track(track_id:int, user:dict, track_meta:dict | None, \
     upload=True, basefolder=None, session=None, quality=None, disable_link=False, disable_msg=False):
+    # Delivered before the bot restarted
+    if task_manager.is_done(user, item_key('Tidal', track_id)):
+        return True
+
     if not track_meta:
         try:
             track_data = await tidalapi.get_track(track_id)
         except Exception as e:
+            task_manager.mark_failed(user)
             return await send_message(user, e)
 
         track_meta = await get_track_metadata(track_id, track_data, user['r_id'])
@@ -57,6 +64,7 @@ async def start_track(track_id:int, user:dict, track_meta:dict | None, \
         if 'Asset is not ready for playback' in str(e):
             error = f'Track [{track_id}] is not available in your region'
         LOGGER.error(error)
+        task_manager.mark_failed(user)
         return await send_message(user, error)
 
 
@@ -86,15 +94,17 @@ async def start_track(track_id:int, user:dict, track_meta:dict | None, \
             temp_files = []
             for url in urls[0]:
                 temp_path = f"{filepath}.{i}"
-                err = await download_file(url, temp_path, cancel_event=user.get('cancel_event'))
+                err = await download_file(url, temp_path, cancel_event=user.get('cancel_event'), provider='tidal')
                 if err:
+                    task_manager.mark_failed(user)
                     return await send_message(user, err)
                 i+=1
                 temp_files.append(temp_path)
             await merge_tracks(temp_files, filepath)
         else:
-            err = await download_file(urls, filepath, cancel_event=user.get('cancel_event'))
+            err = await download_file(urls, filepath, cancel_event=user.get('cancel_event'), provider='tidal')
             if err:
+                task_manager.mark_failed(user)
                 return await send_message(user, err)
 
         track_meta['extension'] = await get_audio_extension(filepath)
@@ -112,6 +122,8 @@ async def start_track(track_id:int, user:dict, track_meta:dict | None, \
 
         if upload:
             await track_upload(track_meta, user, False)
+    else:
+        task_manager.mark_failed(user)
 
     return True
 
@@ -121,11 +133,14 @@ async def start_album(album_id:int, user:dict, upload=True, basefolder=None):
     try:
         album_data = await tidalapi.get_album(album_id)
     except Exception as e:
+        task_manager.mark_failed(user)
         return await send_message(user, e)
 
     tracks_data = await tidalapi.get_album_tracks(album_id)
 
     album_meta = await get_album_metadata(album_id, album_data, tracks_data, user['r_id'])
+    if not await refine(user, 'tidal', 'album', album_meta['duration']):
+        return
 
     if basefolder:
         album_folder = basefolder + f"/{album_meta['title']}"
@@ -180,6 +195,7 @@ async def start_artist(artist_id:int, user:dict):
         artist_albums = await tidalapi.get_artist_albums(artist_id)
         artist_eps = await tidalapi.get_artist_albums_ep_singles(artist_id)
     except Exception as e:
+        task_manager.mark_failed(user)
         return await send_message(user, e)
 
     albums = await sort_album_from_artist(artist_albums['items'])
@@ -7,6 +7,7 @@ from shutil import copyfileobj
 from xml.etree import ElementTree
 
 from .tidal_api import tidalapi
+from .. import executors
 
 
 async def parse_url(url):
@@ -148,7 +149,7 @@ async def merge_tracks(temp_tracks: list, output_path: str):
                     await dest_file.write(chunk)
 
     # Delete temp files asynchronously
-    delete_tasks = [asyncio.to_thread(os.remove, temp_location) for temp_location in temp_tracks]
+    delete_tasks = [executors.disk_io.run(os.remove, temp_location) for temp_location in temp_tracks]
     await asyncio.gather(*delete_tasks)
 
 async def get_quality(stream_data: dict):
@@ -10,6 +10,7 @@ from config import Config
 from ..message import edit_message, send_message
 from bot.logger import LOGGER
 from ..database.pg_impl import download_history
+from ..tasks import task_manager
 from bot.helpers.utils import (
     extract_audio_metadata,
     extract_video_metadata,
@@ -79,6 +80,7 @@ async def start_tidal_ng(link: str, user: dict, options: dict = None):
     # Initialize progress reporter
     label = "Tidal NG"
     reporter = ProgressReporter(bot_msg, label=label, show_system_stats=False)
+    user['progress'] = reporter
     await reporter.set_stage("Downloading")
 
     try:
@@ -223,6 +225,7 @@ async def start_tidal_ng(link: str, user: dict, options: dict = None):
 
     except Exception as e:
         LOGGER.error(f"An error occurred in start_tidal_ng: {e}", exc_info=True)
+        task_manager.mark_failed(user)
         await edit_message(bot_msg, f"❌ **Fatal Error:** {e}")
 
     finally:
@@ -1,6 +1,5 @@
 import os
 import shutil
-import asyncio
 import re
 from config import Config
 from bot.logger import LOGGER
@@ -8,6 +7,10 @@ from bot.settings import bot_set
 from bot.helpers.utils import format_string, send_message, edit_message, MAX_SIZE
 from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from ..state import conversation_state
+from ..media_cache import media_cache
+from ..tasks import task_manager
+from .. import metrics, executors
+from ..uploader_utils.rclone.rc import rclone_rc, RcloneRCError
 
 
 def _get_folder_size(folder_path: str) -> int:
@@ -109,39 +112,39 @@ async def _rclone_upload(user, path, base_path):
         source_for_copy = os.path.dirname(abs_path)
         dest_path = f"{dest_root}/{os.path.dirname(rel_path)}".rstrip('/')
 
-    # Add verbose flag and include filter for single files
-    copy_cmd = f'rclone copy -v --create-empty-src-dirs --config ./rclone.conf "{source_for_copy}" "{dest_path}"'
-    if not is_dir:
-        # Ensure we only copy the intended file, not everything in the source directory
-        file_name = os.path.basename(abs_path)
-        copy_cmd += f" --include \"{file_name}\""
-
-    proc = await asyncio.create_subprocess_shell(
-        copy_cmd,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE
-    )
-    out, err = await proc.communicate()
-    if proc.returncode != 0:
-        LOGGER.error(f"Rclone copy failed for '{source_for_copy}'.\nCMD: {copy_cmd}\nOutput:\n{err.decode().strip()}")
+    # Folders go up as one job with parallel transfers; a single file is copied
+    # on its own into the same destination folder
+    reporter = user.get('progress')
+    on_stats = reporter.update_transfer if reporter else None
+    rc_config = {'Transfers': Config.RCLONE_TRANSFERS}
+    try:
+        with metrics.Timer() as timer:
+            if is_dir:
+                await rclone_rc.transfer(
+                    source_for_copy, dest_path, True,
+                    on_stats=on_stats, _config=rc_config, createEmptySrcDirs=True
+                )
+            else:
+                await rclone_rc.transfer(abs_path, dest_path, False, on_stats=on_stats)
+    except RcloneRCError as e:
+        LOGGER.error(f"Rclone copy failed for '{source_for_copy}'.\nOutput:\n{e}")
+        task_manager.mark_failed(user)
+        metrics.observe_upload('rclone', timer.elapsed, ok=False)
         return None, None, None
+    metrics.observe_upload('rclone', timer.elapsed, await executors.disk_io.run(metrics.path_size, abs_path))
 
     # Link generation
     rclone_link = None
     index_link = None
     if bot_set.link_options in ['RCLONE', 'Both']:
         link_target = f"{dest_root}/{rel_path}".rstrip('/')
-        link_cmd = f'rclone link --config ./rclone.conf "{link_target}"'
-        t2 = await asyncio.create_subprocess_shell(
-            link_cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        so, se = await t2.communicate()
-        if t2.returncode == 0:
-            rclone_link = so.decode().strip()
+        try:
+            rclone_link = await rclone_rc.public_link(link_target)
+        except RcloneRCError as e:
+            LOGGER.debug(f"Failed to get link: {e}")
     if bot_set.link_options in ['Index', 'Both'] and Config.INDEX_LINK:
         index_link = f"{Config.INDEX_LINK}/{rel_path}".replace(' ', '%20')
+    media_cache.record_links(user, rclone_link, index_link)
 
     # remote_info for the manage button
     remote = ''
@@ -1,7 +1,7 @@
 import os
+import time
 import shutil
 import zipfile
-import asyncio
 from config import Config
 from bot.helpers.utils import create_apple_zip, format_string, send_message, edit_message, zip_handler, MAX_SIZE
 from bot.logger import LOGGER
@@ -10,23 +10,39 @@ from mutagen.mp4 import MP4
 import re
 from bot.settings import bot_set
 from bot.helpers.progress import ProgressReporter
+from bot.helpers.media_cache import media_cache
+from bot.helpers.tasks import task_manager
+from bot.helpers import metrics, executors
 from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
 # --- Uploader Listener ---
 
 class UploaderListener:
-    def __init__(self, user, path, name):
+    def __init__(self, user, path, name, destination='gdrive'):
         self.user = user
         self.path = path
         self.name = name
+        self.destination = destination
         self.is_cancelled = False
+        self._started = time.monotonic()
+        # Set by uploaders that delete the files as they go
+        self.uploader = None
 
     async def on_upload_complete(self, link, files, folders, mime_type, dir_id):
         LOGGER.info(f"Upload complete for {self.user['user_id']}: {link}")
-        await send_message(self.user, f"✅ **Upload Complete!**\n\n**Link:** {link}")
+        if self.uploader is not None:
+            size = self.uploader._uploaded_bytes
+        else:
+            size = await executors.disk_io.run(metrics.path_size, self.path)
+        metrics.observe_upload(self.destination, time.monotonic() - self._started, size)
+        text = f"✅ **Upload Complete!**\n\n**Link:** {link}"
+        media_cache.record_links(self.user, text=text)
+        await send_message(self.user, text)
 
     async def on_upload_error(self, error):
         LOGGER.error(f"Upload error for {self.user['user_id']}: {error}")
+        task_manager.mark_failed(self.user)
+        metrics.observe_upload(self.destination, 0, ok=False)
         await send_message(self.user, f"❌ **Upload Failed!**\n\n**Error:** {error}")
 
 # --- Upload Destination Implementations ---
@@ -44,20 +60,13 @@ async def gdrive_upload(user, path, name):
         return
 
     listener = UploaderListener(user, path, name)
+    listener.up_dest = Config.GDRIVE_ID or "root"
 
-    user_temp_path = os.path.join(Config.LOCAL_STORAGE, str(user_id), "gdrive_creds")
-    os.makedirs(user_temp_path, exist_ok=True)
-    token_file_path = os.path.join(user_temp_path, "token.pickle")
-
-    with open(token_file_path, 'wb') as f:
-        f.write(token_blob)
-
-    try:
-        uploader = GoogleDriveUpload(listener, path, token_path=token_file_path)
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, uploader.upload)
-    finally:
-        shutil.rmtree(user_temp_path, ignore_errors=True)
+    # The token is used straight from the database; the authorized service is
+    # reused for every upload with the same token
+    uploader = GoogleDriveUpload(listener, path, token=token_blob)
+    listener.uploader = uploader
+    await executors.network.run(uploader.upload)
 
 async def rclone_upload(user, path, name):
     """Upload files via Rclone using the advanced uploader."""
@@ -86,8 +95,10 @@ async def rclone_upload(user, path, name):
         await send_message(user, "❌ **Rclone destination not set!**\nPlease set a default Rclone path in the bot's config or user settings.")
         return
 
-    listener = UploaderListener(user, path, name)
+    listener = UploaderListener(user, path, name, destination='rclone')
     listener.up_dest = rclone_dest
+    listener.rc_flags = Config.RCLONE_FLAGS or ''
+    listener.excluded_extensions = []
 
     try:
         uploader = RcloneTransferHelper(listener, config_path=rclone_conf_path)
@@ -170,7 +181,7 @@ async def _telegram_upload(user, metadata, content_type, index=None, total=None)
             for idx, zp in enumerate(zip_paths, start=1):
                 await send_message(user, zp, 'doc', caption=caption, progress_reporter=reporter, progress_label="Uploading", file_index=idx, total_files=total_parts)
                 try:
-                    await asyncio.to_thread(os.remove, zp)
+                    await executors.disk_io.run(os.remove, zp)
                 except Exception as e:
                     LOGGER.error(f"Error during zip cleanup for {content_type} {metadata.get('title')}: {e}")
         else:
@@ -196,6 +207,11 @@ async def upload_item(user, metadata, content_type, index=None, total=None):
     path = metadata.get('filepath') or metadata.get('folderpath')
     name = metadata.get('title')
 
+    # Measured first, the GDrive uploader deletes every file once it is sent
+    size = 0
+    if uploader != 'telegram':
+        size = await _get_folder_size(path) if os.path.isdir(path) else os.path.getsize(path) if os.path.exists(path) else 0
+
     if uploader == 'gdrive':
         await gdrive_upload(user, path, name)
     elif uploader == 'rclone':
@@ -214,6 +230,7 @@ async def upload_item(user, metadata, content_type, index=None, total=None):
                     os.remove(metadata['thumbnail'])
             except:
                 pass
+        await task_manager.release_disk(user.get('task_id'), size)
 
 
 # --- Original Upload Functions (Refactored) ---
@@ -241,7 +258,7 @@ async def _get_folder_size(folder_path: str) -> int:
         for f in files:
             try:
                 file_path = os.path.join(root, f)
-                total_size += await asyncio.to_thread(os.path.getsize, file_path)
+                total_size += await executors.disk_io.run(os.path.getsize, file_path)
             except Exception:
                 continue
     return total_size
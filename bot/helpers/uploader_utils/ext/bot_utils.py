@@ -1,16 +1,17 @@
 from httpx import AsyncClient
 from asyncio.subprocess import PIPE
-from functools import partial, wraps
-from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
 from asyncio import (
     create_subprocess_exec,
     create_subprocess_shell,
     run_coroutine_threadsafe,
     sleep,
+    wrap_future,
 )
 
 # from ... import user_data, bot_loop
 from config import Config
+from bot.helpers.executors import disk_io
 # from ..tg_helper.button_build import ButtonMaker
 # from .telegraph_helper import telegraph
 # from .help_messages import (
@@ -21,8 +22,6 @@ from config import Config
 
 COMMAND_USAGE = {}
 
-THREAD_POOL = ThreadPoolExecutor(max_workers=500)
-
 
 class SetInterval:
     def __init__(self, interval, action, *args, **kwargs):
@@ -233,10 +232,9 @@ def new_task(func):
     return wrapper
 
 
-async def sync_to_async(func, *args, wait=True, **kwargs):
-    pfunc = partial(func, *args, **kwargs)
-    future = bot_loop.run_in_executor(THREAD_POOL, pfunc)
-    return await future if wait else future
+async def sync_to_async(func, *args, wait=True, executor=disk_io, **kwargs):
+    future = executor.submit(func, *args, **kwargs)
+    return await wrap_future(future) if wait else wrap_future(future)
 
 
 def async_to_sync(func, *args, wait=True, **kwargs):
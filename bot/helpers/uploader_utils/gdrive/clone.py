@@ -1,6 +1,7 @@
 from googleapiclient.errors import HttpError
 from logging import getLogger
 from os import path as ospath
+from threading import Lock
 from tenacity import (
     retry,
     wait_exponential,
@@ -10,16 +11,22 @@ from tenacity import (
 )
 from time import time
 
+from config import Config
+from bot.helpers import executors
 from ..ext.bot_utils import async_to_sync
 from .helper import GoogleDriveHelper
 
 LOGGER = getLogger(__name__)
 
+# Shared by clones and counts so the workers keep their authorized services
+drive_pool = executors.get("gdrive_clone", Config.GDRIVE_CLONE_WORKERS)
+
 
 class GoogleDriveClone(GoogleDriveHelper):
     def __init__(self, listener):
         self.listener = listener
         self._start_time = time()
+        self._lock = Lock()
         super().__init__()
         self.is_cloning = True
         self.user_setting()
@@ -51,7 +58,6 @@ class GoogleDriveClone(GoogleDriveHelper):
                 None,
                 None,
             )
-        self.service = self.authorize()
         msg = ""
         LOGGER.info(f"File ID: {file_id}")
         try:
@@ -63,7 +69,7 @@ class GoogleDriveClone(GoogleDriveHelper):
                 durl = self.G_DRIVE_DIR_BASE_DOWNLOAD_URL.format(dir_id)
                 if self.listener.is_cancelled:
                     LOGGER.info("Deleting cloned data from Drive...")
-                    self.service.files().delete(
+                    self._get_service().files().delete(
                         fileId=dir_id, supportsAllDrives=True
                     ).execute()
                     return None, None, None, None, None
@@ -103,28 +109,91 @@ class GoogleDriveClone(GoogleDriveHelper):
             return None, None, None, None, None
 
     def _clone_folder(self, folder_name, folder_id, dest_id):
-        LOGGER.info(f"Syncing: {folder_name}")
-        files = self.get_files_by_folder_id(folder_id)
-        if len(files) == 0:
-            return dest_id
-        for file in files:
-            if file.get("mimeType") == self.G_DRIVE_DIR_MIME_TYPE:
-                self.total_folders += 1
-                file_path = ospath.join(folder_name, file.get("name"))
-                current_dir_id = self.create_directory(file.get("name"), dest_id)
-                self._clone_folder(file_path, file.get("id"), current_dir_id)
-            elif (
-                not file.get("name")
-                .strip()
-                .lower()
-                .endswith(tuple(self.listener.excluded_extensions))
-            ):
-                self.total_files += 1
-                self._copy_file(file.get("id"), dest_id)
-                self.proc_bytes += int(file.get("size", 0))
-                self.total_time = int(time() - self._start_time)
+        """
+        Breadth-first: list every folder of a level and create its subfolders
+        on the worker pool, then copy all files of the level in batches.
+        """
+        level = [(folder_name, folder_id, dest_id)]
+        while level and not self.listener.is_cancelled:
+            next_level, copies = [], []
+            for folders, files in drive_pool.map(self._sync_folder, level):
+                next_level.extend(folders)
+                copies.extend(files)
             if self.listener.is_cancelled:
                 break
+            batches = [
+                copies[i : i + self.BATCH_SIZE]
+                for i in range(0, len(copies), self.BATCH_SIZE)
+            ]
+            for _ in drive_pool.map(self._copy_batch, batches):
+                pass
+            level = next_level
+
+    def _sync_folder(self, entry):
+        folder_name, folder_id, dest_id = entry
+        LOGGER.info(f"Syncing: {folder_name}")
+        files = self.get_files_by_folder_id(folder_id)
+        folders = [f for f in files if f.get("mimeType") == self.G_DRIVE_DIR_MIME_TYPE]
+        copies = [
+            (file, dest_id)
+            for file in files
+            if file.get("mimeType") != self.G_DRIVE_DIR_MIME_TYPE
+            and not file.get("name")
+            .strip()
+            .lower()
+            .endswith(tuple(self.listener.excluded_extensions))
+        ]
+        created = {}
+        self.execute_batch(
+            folders,
+            lambda folder: self._get_service().files().create(
+                body={
+                    "name": folder.get("name"),
+                    "description": "Uploaded by Mirror-leech-telegram-bot",
+                    "mimeType": self.G_DRIVE_DIR_MIME_TYPE,
+                    "parents": [dest_id],
+                },
+                supportsAllDrives=True,
+                fields="id",
+            ),
+            lambda folder, response: created.__setitem__(folder["id"], response["id"]),
+        )
+        if not Config.IS_TEAM_DRIVE:
+            self.execute_batch(
+                list(created.values()),
+                lambda new_id: self._get_service().permissions().create(
+                    fileId=new_id,
+                    body={"role": "reader", "type": "anyone"},
+                    supportsAllDrives=True,
+                ),
+                lambda new_id, response: None,
+            )
+        with self._lock:
+            self.total_folders += len(created)
+        return [
+            (ospath.join(folder_name, folder.get("name")), folder["id"], created[folder["id"]])
+            for folder in folders
+            if folder["id"] in created
+        ], copies
+
+    def _copy_batch(self, copies):
+        self.execute_batch(
+            copies,
+            lambda item: self._get_service().files().copy(
+                fileId=item[0]["id"],
+                body={"parents": [item[1]]},
+                supportsAllDrives=True,
+                fields="id",
+            ),
+            self._copied,
+            skip_reasons=("cannotCopyFile",),
+        )
+
+    def _copied(self, item, response):
+        with self._lock:
+            self.total_files += 1
+            self.proc_bytes += int(item[0].get("size", 0))
+            self.total_time = int(time() - self._start_time)
 
     @retry(
         wait=wait_exponential(multiplier=2, min=3, max=6),
@@ -135,7 +204,7 @@ class GoogleDriveClone(GoogleDriveHelper):
         body = {"parents": [dest_id]}
         try:
             return (
-                self.service.files()
+                self._get_service().files()
                 .copy(fileId=file_id, body=body, supportsAllDrives=True)
                 .execute()
             )
@@ -1,6 +1,8 @@
 from logging import getLogger
 from tenacity import RetryError
+from threading import Lock
 
+from .clone import drive_pool
 from .helper import GoogleDriveHelper
 
 LOGGER = getLogger(__name__)
@@ -8,6 +10,7 @@ LOGGER = getLogger(__name__)
 
 class GoogleDriveCount(GoogleDriveHelper):
     def __init__(self):
+        self._lock = Lock()
         super().__init__()
 
     def count(self, link, user_id):
@@ -21,7 +24,6 @@ class GoogleDriveCount(GoogleDriveHelper):
                 None,
                 None,
             )
-        self.service = self.authorize()
         LOGGER.info(f"File ID: {file_id}")
         try:
             return self._proceed_count(file_id)
@@ -61,20 +63,36 @@ class GoogleDriveCount(GoogleDriveHelper):
         self.proc_bytes += size
 
     def _gdrive_directory(self, drive_folder):
+        """Breadth-first, one level of folders listed at once on the worker pool"""
+        level = [drive_folder]
+        while level:
+            next_level = []
+            for folders in drive_pool.map(self._count_folder, level):
+                next_level.extend(folders)
+            level = next_level
+
+    def _count_folder(self, drive_folder):
         files = self.get_files_by_folder_id(drive_folder["id"])
-        if len(files) == 0:
-            return
-        for filee in files:
-            shortcut_details = filee.get("shortcutDetails")
-            if shortcut_details is not None:
-                mime_type = shortcut_details["targetMimeType"]
-                file_id = shortcut_details["targetId"]
-                filee = self.get_file_metadata(file_id)
-            else:
-                mime_type = filee.get("mimeType")
-            if mime_type == self.G_DRIVE_DIR_MIME_TYPE:
-                self.total_folders += 1
-                self._gdrive_directory(filee)
+        shortcuts = [f for f in files if f.get("shortcutDetails") is not None]
+        entries = [f for f in files if f.get("shortcutDetails") is None]
+        # Resolve all shortcut targets of the folder in batch requests
+        self.execute_batch(
+            shortcuts,
+            lambda f: self._get_service().files().get(
+                fileId=f["shortcutDetails"]["targetId"],
+                supportsAllDrives=True,
+                fields="name, id, mimeType, size",
+            ),
+            lambda f, target: entries.append(target),
+        )
+        folders = []
+        for filee in entries:
+            if filee.get("mimeType") == self.G_DRIVE_DIR_MIME_TYPE:
+                folders.append(filee)
             else:
-                self.total_files += 1
-                self._gdrive_file(filee)
+                with self._lock:
+                    self.total_files += 1
+                    self._gdrive_file(filee)
+        with self._lock:
+            self.total_folders += len(folders)
+        return folders
@@ -15,10 +15,9 @@ class GoogleDriveDelete(GoogleDriveHelper):
             file_id = self.get_id_from_url(link, user_id)
         except (KeyError, IndexError):
             return "Google Drive ID could not be found in the provided link"
-        self.service = self.authorize()
         msg = ""
         try:
-            self.service.files().delete(
+            self._get_service().files().delete(
                 fileId=file_id, supportsAllDrives=True
             ).execute()
             msg = "Successfully deleted"
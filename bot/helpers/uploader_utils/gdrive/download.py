@@ -28,7 +28,6 @@ class GoogleDriveDownload(GoogleDriveHelper):
 
     def download(self):
         file_id = self.get_id_from_url(self.listener.link, self.listener.user_id)
-        self.service = self.authorize()
         self._updater = SetInterval(self.update_interval, self.progress)
         try:
             meta = self.get_file_metadata(file_id)
@@ -99,11 +98,11 @@ class GoogleDriveDownload(GoogleDriveHelper):
     )
     def _download_file(self, file_id, path, filename, mime_type, export=False):
         if export:
-            request = self.service.files().export_media(
+            request = self._get_service().files().export_media(
                 fileId=file_id, mimeType="application/pdf"
             )
         else:
-            request = self.service.files().get_media(
+            request = self._get_service().files().get_media(
                 fileId=file_id, supportsAllDrives=True, acknowledgeAbuse=True
             )
         filename = filename.replace("/", "")
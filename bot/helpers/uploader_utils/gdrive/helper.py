@@ -2,10 +2,14 @@ from google.oauth2 import service_account
 from googleapiclient.discovery import build
 from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.http import build_http
+from hashlib import sha1
+from json import loads
 from logging import getLogger, ERROR
 from os import path as ospath, listdir
-from pickle import load as pload
+from pickle import load as pload, loads as ploads
 from random import randrange
+from threading import Lock, local
+from time import sleep
 from re import search as re_search
 from urllib.parse import parse_qs, urlparse
 from tenacity import (
@@ -21,11 +25,22 @@ from ..ext.links_utils import is_gdrive_id
 LOGGER = getLogger(__name__)
 getLogger("googleapiclient.discovery").setLevel(ERROR)
 
+# Credentials are shared by all helpers, services (httplib2 isn't thread
+# safe) are built once per credential and thread.
+_credentials = {}
+_credentials_lock = Lock()
+_services = local()
+
+RATE_LIMIT_REASONS = ("userRateLimitExceeded", "rateLimitExceeded", "dailyLimitExceeded")
+
 
 class GoogleDriveHelper:
-    def __init__(self, token_path="token.pickle"):
+    BATCH_SIZE = 100
+
+    def __init__(self, token_path="token.pickle", token=None):
         self._OAUTH_SCOPE = ["https://www.googleapis.com/auth/drive"]
         self.token_path = token_path
+        self.token = token
         self.G_DRIVE_DIR_MIME_TYPE = "application/vnd.google-apps.folder"
         self.G_DRIVE_BASE_DOWNLOAD_URL = (
             "https://drive.google.com/uc?id={}&export=download"
@@ -34,11 +49,12 @@ class GoogleDriveHelper:
         self.is_uploading = False
         self.is_downloading = False
         self.is_cloning = False
-        self.sa_index = 0
+        self.sa_index = None
+        self._sa_files = []
         self.sa_count = 1
+        self._sa_lock = Lock()
         self.sa_number = 100
         self.alt_auth = False
-        self.service = None
         self.total_files = 0
         self.total_folders = 0
         self.file_processed_bytes = 0
@@ -47,6 +63,7 @@ class GoogleDriveHelper:
         self.status = None
         self.update_interval = 3
         self.use_sa = Config.USE_SERVICE_ACCOUNTS
+        self._resolve_sa()
 
     @property
     def speed(self):
@@ -69,25 +86,62 @@ class GoogleDriveHelper:
             self.proc_bytes += chunk_size
             self.total_time += self.update_interval
 
-    def authorize(self):
-        credentials = None
-        if self.use_sa:
-            json_files = listdir("accounts")
-            self.sa_number = len(json_files)
+    def _resolve_sa(self):
+        """Pick the first service account, so sa_index is known before any request"""
+        if self.use_sa and self.sa_index is None:
+            self._sa_files = listdir("accounts")
+            self.sa_number = len(self._sa_files)
             self.sa_index = randrange(self.sa_number)
-            LOGGER.info(f"Authorizing with {json_files[self.sa_index]} service account")
-            credentials = service_account.Credentials.from_service_account_file(
-                f"accounts/{json_files[self.sa_index]}", scopes=self._OAUTH_SCOPE
+            LOGGER.info(
+                f"Authorizing with {self._sa_files[self.sa_index]} service account"
+            )
+
+    def _credential(self):
+        """(cache key, loader) of the credential this helper uses now"""
+        if self.use_sa:
+            self._resolve_sa()
+            sa_file = f"accounts/{self._sa_files[self.sa_index]}"
+            return f"sa:{sa_file}", lambda: (
+                service_account.Credentials.from_service_account_file(
+                    sa_file, scopes=self._OAUTH_SCOPE
+                )
             )
-        elif ospath.exists(self.token_path):
-            LOGGER.info(f"Authorize with {self.token_path}")
-            with open(self.token_path, "rb") as f:
-                credentials = pload(f)
+        if self.token is not None:
+            token = self.token
+            return f"token:{sha1(token).hexdigest()}", lambda: ploads(token)
+        if ospath.exists(self.token_path):
+            token_path = self.token_path
+
+            def _load():
+                LOGGER.info(f"Authorize with {token_path}")
+                with open(token_path, "rb") as f:
+                    return pload(f)
+
+            return f"path:{ospath.abspath(token_path)}:{ospath.getmtime(token_path)}", _load
+        LOGGER.error("token.pickle not found!")
+        return None, lambda: None
+
+    def _get_service(self):
+        """Service of the current credential for the calling thread (httplib2 isn't thread safe)"""
+        key, load = self._credential()
+        if key is None:
+            credentials = load()
         else:
-            LOGGER.error("token.pickle not found!")
-        authorized_http = AuthorizedHttp(credentials, http=build_http())
-        authorized_http.http.disable_ssl_certificate_validation = True
-        return build("drive", "v3", http=authorized_http, cache_discovery=False)
+            with _credentials_lock:
+                if key not in _credentials:
+                    _credentials[key] = load()
+                credentials = _credentials[key]
+        services = getattr(_services, "by_key", None)
+        if services is None:
+            services = _services.by_key = {}
+        if key is None or key not in services:
+            authorized_http = AuthorizedHttp(credentials, http=build_http())
+            authorized_http.http.disable_ssl_certificate_validation = True
+            service = build("drive", "v3", http=authorized_http, cache_discovery=False)
+            if key is None:
+                return service
+            services[key] = service
+        return services[key]
 
     def switch_service_account(self):
         if self.sa_index == self.sa_number - 1:
@@ -96,7 +150,78 @@ class GoogleDriveHelper:
             self.sa_index += 1
         self.sa_count += 1
         LOGGER.info(f"Switching to {self.sa_index} index")
-        self.service = self.authorize()
+
+    def _switch_service_account(self, failed_index, err):
+        """Switch once for all workers that hit the limit on the same account"""
+        with self._sa_lock:
+            if self.sa_index != failed_index:
+                return
+            if self.sa_count >= self.sa_number:
+                LOGGER.info(
+                    f"Reached maximum number of service accounts switching, which is {self.sa_count}"
+                )
+                raise err
+            self.switch_service_account()
+
+    @staticmethod
+    def error_reason(err):
+        try:
+            return loads(err.content)["error"]["errors"][0]["reason"]
+        except Exception:
+            return ""
+
+    def execute_batch(self, items, make_request, on_result, skip_reasons=()):
+        """
+        Send make_request(item) for all items in Drive batch requests and call
+        on_result(item, response) for every success. Rate-limited requests are
+        sent again after a backoff, or on the next service account when the
+        daily limit is hit or the backoff doesn't help; errors with a reason in
+        `skip_reasons` are logged and skipped, any other error is raised.
+        """
+        listener = getattr(self, "listener", None)
+        for start in range(0, len(items), self.BATCH_SIZE):
+            pending = items[start : start + self.BATCH_SIZE]
+            attempt = 0
+            while pending:
+                if listener is not None and listener.is_cancelled:
+                    return
+                self._resolve_sa()
+                sa_index = self.sa_index
+                results = {}
+
+                def _callback(request_id, response, exception):
+                    results[int(request_id)] = (response, exception)
+
+                batch = self._get_service().new_batch_http_request(callback=_callback)
+                for i, item in enumerate(pending):
+                    batch.add(make_request(item), request_id=str(i))
+                batch.execute()
+
+                limited = []
+                for i, item in enumerate(pending):
+                    response, err = results[i]
+                    if err is None:
+                        on_result(item, response)
+                        continue
+                    reason = self.error_reason(err)
+                    if reason in RATE_LIMIT_REASONS:
+                        limited.append((item, reason, err))
+                    elif reason in skip_reasons:
+                        LOGGER.error(err)
+                    else:
+                        raise err
+                pending = [item for item, _, _ in limited]
+                if not pending:
+                    break
+                attempt += 1
+                _, reason, err = limited[0]
+                if self.use_sa and (reason == "dailyLimitExceeded" or attempt > 3):
+                    self._switch_service_account(sa_index, err)
+                    attempt = 0
+                elif attempt > 5:
+                    raise err
+                else:
+                    sleep(min(2**attempt, 32))
 
     def get_id_from_url(self, link, user_id=""):
         if user_id and link.startswith("mtp:"):
@@ -133,7 +258,7 @@ class GoogleDriveHelper:
             "withLink": True,
         }
         return (
-            self.service.permissions()
+            self._get_service().permissions()
             .create(fileId=file_id, body=permissions, supportsAllDrives=True)
             .execute()
         )
@@ -145,7 +270,7 @@ class GoogleDriveHelper:
     )
     def get_file_metadata(self, file_id):
         return (
-            self.service.files()
+            self._get_service().files()
             .get(
                 fileId=file_id,
                 supportsAllDrives=True,
@@ -170,13 +295,13 @@ class GoogleDriveHelper:
             q = f"'{folder_id}' in parents and mimeType != '{self.G_DRIVE_DIR_MIME_TYPE}' and trashed = false"
         while True:
             response = (
-                self.service.files()
+                self._get_service().files()
                 .list(
                     supportsAllDrives=True,
                     includeItemsFromAllDrives=True,
                     q=q,
                     spaces="drive",
-                    pageSize=200,
+                    pageSize=1000,
                     fields="nextPageToken, files(id, name, mimeType, size, shortcutDetails)",
                     orderBy="folder, name",
                     pageToken=page_token,
@@ -203,7 +328,7 @@ class GoogleDriveHelper:
         if dest_id is not None:
             file_metadata["parents"] = [dest_id]
         file = (
-            self.service.files()
+            self._get_service().files()
             .create(body=file_metadata, supportsAllDrives=True)
             .execute()
         )
@@ -225,13 +350,13 @@ class GoogleDriveHelper:
         if not rootId:
             rootId = file.get('teamDriveId')
         if rootId == "root":
-            rootId = self.service.files().get(
+            rootId = self._get_service().files().get(
                 fileId='root', fields='id').execute().get('id')
         x = file.get("name")
         y = file.get("id")
         while (y != rootId):
             rtnlist.append(x)
-            file = self.service.files().get(fileId=file.get("parents")[0], supportsAllDrives=True,
+            file = self._get_service().files().get(fileId=file.get("parents")[0], supportsAllDrives=True,
                                             fields='id, name, parents').execute()
             x = file.get("name")
             y = file.get("id")
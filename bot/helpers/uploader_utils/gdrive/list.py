@@ -247,9 +247,8 @@ class GoogleDriveList(GoogleDriveHelper):
             await self.get_items_buttons()
 
     async def list_drives(self):
-        self.service = self.authorize()
         try:
-            result = self.service.drives().list(pageSize="100").execute()
+            result = self._get_service().drives().list(pageSize="100").execute()
         except Exception as e:
             self.id = str(e)
             self.event.set()
@@ -35,7 +35,7 @@ class GoogleDriveSearch(GoogleDriveHelper):
                 query += "trashed = false"
                 if dir_id == "root":
                     return (
-                        self.service.files()
+                        self._get_service().files()
                         .list(
                             q=f"{query} and 'me' in owners",
                             pageSize=200,
@@ -47,7 +47,7 @@ class GoogleDriveSearch(GoogleDriveHelper):
                     )
                 else:
                     return (
-                        self.service.files()
+                        self._get_service().files()
                         .list(
                             supportsAllDrives=True,
                             includeItemsFromAllDrives=True,
@@ -76,7 +76,7 @@ class GoogleDriveSearch(GoogleDriveHelper):
                         query += f"mimeType = '{self.G_DRIVE_DIR_MIME_TYPE}' and "
                 query += "trashed = false"
                 return (
-                    self.service.files()
+                    self._get_service().files()
                     .list(
                         supportsAllDrives=True,
                         includeItemsFromAllDrives=True,
@@ -119,8 +119,6 @@ class GoogleDriveSearch(GoogleDriveHelper):
         ):
             self.use_sa = False
 
-        self.service = self.authorize()
-
         for drive_name, dir_id, index_url in drives:
             isRecur = (
                 False if self._is_recursive and len(dir_id) > 23 else self._is_recursive
@@ -1,7 +1,11 @@
+from concurrent.futures import as_completed
 from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaFileUpload
+from hashlib import sha1
+from json import dump, load, loads
 from logging import getLogger
-from os import path as ospath, listdir, remove
+from os import path as ospath, makedirs, remove, replace, stat, walk
+from threading import Lock
 from tenacity import (
     retry,
     wait_exponential,
@@ -11,22 +15,106 @@ from tenacity import (
 )
 
 from config import Config
+from bot.helpers import executors
 from ..ext.bot_utils import async_to_sync, SetInterval
 from ..ext.files_utils import get_mime_type
 from .helper import GoogleDriveHelper
 
 LOGGER = getLogger(__name__)
 
+SESSIONS_DIR = "gdrive_sessions"
+SIMPLE_UPLOAD_LIMIT = 5 * 1024 * 1024
+CHUNK_ALIGN = 256 * 1024
+MIN_CHUNK_SIZE = 8 * 1024 * 1024
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+
+# Shared by all uploads so the workers keep their authorized services
+_upload_pool = executors.get("gdrive_upload", Config.GDRIVE_UPLOAD_WORKERS)
+
+
+def chunk_size(size):
+    """About a tenth of the file per request, 8-64 MiB on the 256 KiB boundary Drive wants"""
+    chunk = -(-size // 10)
+    chunk = -(-chunk // CHUNK_ALIGN) * CHUNK_ALIGN
+    return max(MIN_CHUNK_SIZE, min(MAX_CHUNK_SIZE, chunk))
+
+
+class UploadJournal:
+    """
+    Folder ids and resumable session URIs of one upload, kept on disk so an
+    upload interrupted by an error or a restart reuses its folders and
+    continues its files where the sessions stopped.
+    """
+
+    def __init__(self, key):
+        self.path = f"{SESSIONS_DIR}/{key}.json"
+        self._lock = Lock()
+        try:
+            with open(self.path) as f:
+                data = load(f)
+        except (OSError, ValueError):
+            data = {}
+        self.folders = data.get("folders", {})
+        self.sessions = data.get("sessions", {})
+
+    def _save(self):
+        makedirs(SESSIONS_DIR, exist_ok=True)
+        with open(f"{self.path}.tmp", "w") as f:
+            dump({"folders": self.folders, "sessions": self.sessions}, f)
+        replace(f"{self.path}.tmp", self.path)
+
+    def set_folder(self, rel, folder_id):
+        with self._lock:
+            self.folders[rel] = folder_id
+            self._save()
+
+    def session(self, rel, file_path):
+        entry = self.sessions.get(rel)
+        if entry is None:
+            return None
+        st = stat(file_path)
+        if entry["size"] != st.st_size or entry["mtime"] != st.st_mtime:
+            return None
+        return entry["uri"]
+
+    def set_session(self, rel, file_path, uri):
+        st = stat(file_path)
+        with self._lock:
+            self.sessions[rel] = {"uri": uri, "size": st.st_size, "mtime": st.st_mtime}
+            self._save()
+
+    def drop_session(self, rel):
+        with self._lock:
+            if self.sessions.pop(rel, None) is not None:
+                self._save()
+
+    def discard(self):
+        try:
+            remove(self.path)
+        except OSError:
+            pass
+
 
 class GoogleDriveUpload(GoogleDriveHelper):
-    def __init__(self, listener, path, token_path="token.pickle"):
+    def __init__(self, listener, path, token_path="token.pickle", token=None):
         self.listener = listener
         self._updater = None
         self._path = path
         self._is_errored = False
-        super().__init__(token_path)
+        self._journal = None
+        self._failed = False
+        self._progress_lock = Lock()
+        self._uploaded_bytes = 0
+        self._file_bytes = {}
+        super().__init__(token_path, token)
         self.is_uploading = True
 
+    async def progress(self):
+        with self._progress_lock:
+            processed = self._uploaded_bytes + sum(self._file_bytes.values())
+        self.proc_bytes = processed
+        self.total_time += self.update_interval
+
     def user_setting(self):
         if self.listener.up_dest.startswith("mtp:"):
             self.token_path = f"tokens/{self.listener.user_id}.pickle"
@@ -41,9 +129,13 @@ class GoogleDriveUpload(GoogleDriveHelper):
 
     def upload(self):
         self.user_setting()
-        self.service = self.authorize()
+        # Before the workers start, they all compare against this index on rate limits
+        self._resolve_sa()
+        key = sha1(f"{ospath.abspath(self._path)}|{self.listener.up_dest}".encode())
+        self._journal = UploadJournal(key.hexdigest())
         LOGGER.info(f"Uploading: {self._path}")
         self._updater = SetInterval(self.update_interval, self.progress)
+        dir_id = None
         try:
             if ospath.isfile(self._path):
                 mime_type = get_mime_type(self._path)
@@ -61,10 +153,13 @@ class GoogleDriveUpload(GoogleDriveHelper):
                 LOGGER.info(f"Uploaded To G-Drive: {self._path}")
             else:
                 mime_type = "Folder"
-                dir_id = self.create_directory(
-                    ospath.basename(ospath.abspath(self.listener.name)),
-                    self.listener.up_dest,
-                )
+                dir_id = self._journal.folders.get("")
+                if dir_id is None:
+                    dir_id = self.create_directory(
+                        ospath.basename(ospath.abspath(self.listener.name)),
+                        self.listener.up_dest,
+                    )
+                    self._journal.set_folder("", dir_id)
                 result = self._upload_dir(self._path, dir_id)
                 if result is None:
                     raise ValueError("Upload has been manually cancelled!")
@@ -83,14 +178,16 @@ class GoogleDriveUpload(GoogleDriveHelper):
         finally:
             self._updater.cancel()
             if self.listener.is_cancelled and not self._is_errored:
+                self._journal.discard()
                 if mime_type == "Folder" and dir_id:
                     LOGGER.info("Deleting uploaded data from Drive...")
-                    self.service.files().delete(
+                    self._get_service().files().delete(
                         fileId=dir_id, supportsAllDrives=True
                     ).execute()
                 return
             elif self._is_errored:
                 return
+            self._journal.discard()
             async_to_sync(
                 self.listener.on_upload_complete,
                 link,
@@ -101,33 +198,65 @@ class GoogleDriveUpload(GoogleDriveHelper):
             )
             return
 
-    def _upload_dir(self, input_directory, dest_id):
-        list_dirs = listdir(input_directory)
-        if len(list_dirs) == 0:
-            return dest_id
-        new_id = None
-        for item in list_dirs:
-            current_file_name = ospath.join(input_directory, item)
-            if ospath.isdir(current_file_name):
-                current_dir_id = self.create_directory(item, dest_id)
-                new_id = self._upload_dir(current_file_name, current_dir_id)
+    def _create_tree(self, input_directory, dest_id):
+        """Create (or reuse from the journal) every folder first and list the files with their parent ids"""
+        folder_ids = {"": dest_id}
+        files = []
+        for dirpath, dirnames, filenames in walk(input_directory):
+            rel_dir = ospath.relpath(dirpath, input_directory)
+            rel_dir = "" if rel_dir == "." else rel_dir
+            parent_id = folder_ids[rel_dir]
+            for name in dirnames:
+                rel = ospath.join(rel_dir, name)
+                folder_id = self._journal.folders.get(rel)
+                if folder_id is None:
+                    folder_id = self.create_directory(name, parent_id)
+                    self._journal.set_folder(rel, folder_id)
+                folder_ids[rel] = folder_id
                 self.total_folders += 1
-            else:
-                mime_type = get_mime_type(current_file_name)
-                file_name = current_file_name.split("/")[-1]
-                self._upload_file(current_file_name, file_name, mime_type, dest_id)
+                if self.listener.is_cancelled:
+                    return files
+            for name in filenames:
+                files.append(
+                    (ospath.join(dirpath, name), name, parent_id, ospath.join(rel_dir, name))
+                )
+        return files
+
+    def _upload_dir(self, input_directory, dest_id):
+        files = self._create_tree(input_directory, dest_id)
+        if self.listener.is_cancelled:
+            return None
+        futures = [
+            _upload_pool.submit(
+                self._upload_file,
+                file_path,
+                file_name,
+                get_mime_type(file_path),
+                parent_id,
+                rel=rel,
+            )
+            for file_path, file_name, parent_id, rel in files
+        ]
+        try:
+            for future in as_completed(futures):
+                future.result()
                 self.total_files += 1
-                new_id = dest_id
-            if self.listener.is_cancelled:
-                break
-        return new_id
+        except BaseException:
+            # Stop the other workers between chunks, their sessions stay resumable
+            self._failed = True
+            for future in futures:
+                future.cancel()
+            raise
+        return None if self.listener.is_cancelled else dest_id
 
     @retry(
         wait=wait_exponential(multiplier=2, min=3, max=6),
         stop=stop_after_attempt(3),
         retry=retry_if_exception_type(Exception),
     )
-    def _upload_file(self, file_path, file_name, mime_type, dest_id, in_dir=True):
+    def _upload_file(
+        self, file_path, file_name, mime_type, dest_id, in_dir=True, rel=None
+    ):
         file_metadata = {
             "name": file_name,
             "description": "Uploaded by Mirror-leech-telegram-bot",
@@ -135,38 +264,61 @@ class GoogleDriveUpload(GoogleDriveHelper):
         }
         if dest_id is not None:
             file_metadata["parents"] = [dest_id]
+        rel = rel or file_name
+        size = ospath.getsize(file_path)
 
-        if ospath.getsize(file_path) == 0:
+        if size <= SIMPLE_UPLOAD_LIMIT:
             media_body = MediaFileUpload(file_path, mimetype=mime_type, resumable=False)
             response = (
-                self.service.files()
+                self._get_service().files()
                 .create(
                     body=file_metadata, media_body=media_body, supportsAllDrives=True
                 )
                 .execute()
             )
-            if not Config.IS_TEAM_DRIVE:
-                self.set_permission(response["id"])
-
-            drive_file = (
-                self.service.files()
-                .get(fileId=response["id"], supportsAllDrives=True)
-                .execute()
+            self._file_done(file_path, size)
+        else:
+            response = self._upload_resumable(
+                file_path, file_metadata, mime_type, size, rel
             )
-            return self.G_DRIVE_BASE_DOWNLOAD_URL.format(drive_file.get("id"))
+            if response is None:
+                return
+        if not Config.IS_TEAM_DRIVE:
+            self.set_permission(response["id"])
+        if not in_dir:
+            return self.G_DRIVE_BASE_DOWNLOAD_URL.format(response["id"])
+        return
+
+    def _upload_resumable(self, file_path, file_metadata, mime_type, size, rel):
         media_body = MediaFileUpload(
-            file_path, mimetype=mime_type, resumable=True, chunksize=100 * 1024 * 1024
+            file_path, mimetype=mime_type, resumable=True, chunksize=chunk_size(size)
         )
-
-        drive_file = self.service.files().create(
+        sa_index = self.sa_index
+        drive_file = self._get_service().files().create(
             body=file_metadata, media_body=media_body, supportsAllDrives=True
         )
+        resumed = self._journal.session(rel, file_path)
         response = None
+        if resumed:
+            progress, response = self._session_progress(drive_file, resumed, size)
+            if progress is None:
+                LOGGER.info(f"Upload session of {rel} expired, starting over")
+                self._journal.drop_session(rel)
+                resumed = None
+            else:
+                drive_file.resumable_uri = resumed
+                drive_file.resumable_progress = progress
         retries = 0
-        while response is None and not self.listener.is_cancelled:
+        while response is None and not self.listener.is_cancelled and not self._failed:
             try:
-                self.status, response = drive_file.next_chunk()
+                status, response = drive_file.next_chunk()
             except HttpError as err:
+                if resumed and err.resp.status in [404, 410]:
+                    LOGGER.info(f"Upload session of {rel} expired, starting over")
+                    self._journal.drop_session(rel)
+                    return self._upload_resumable(
+                        file_path, file_metadata, mime_type, size, rel
+                    )
                 if err.resp.status in [500, 502, 503, 504, 429] and retries < 10:
                     retries += 1
                     continue
@@ -180,40 +332,54 @@ class GoogleDriveUpload(GoogleDriveHelper):
                     ]:
                         raise err
                     if self.use_sa:
-                        if self.sa_count >= self.sa_number:
-                            LOGGER.info(
-                                f"Reached maximum number of service accounts switching, which is {self.sa_count}"
-                            )
-                            raise err
-                        else:
-                            if self.listener.is_cancelled:
-                                return
-                            self.switch_service_account()
-                            LOGGER.info(f"Got: {reason}, Trying Again...")
-                            return self._upload_file(
-                                file_path,
-                                file_name,
-                                mime_type,
-                                dest_id,
-                                in_dir,
-                            )
+                        if self.listener.is_cancelled:
+                            return
+                        self._journal.drop_session(rel)
+                        self._switch_service_account(sa_index, err)
+                        LOGGER.info(f"Got: {reason}, Trying Again...")
+                        return self._upload_resumable(
+                            file_path, file_metadata, mime_type, size, rel
+                        )
                     else:
                         LOGGER.error(f"Got: {reason}")
                         raise err
-        if self.listener.is_cancelled:
+                raise err
+            if drive_file.resumable_uri and drive_file.resumable_uri != resumed:
+                resumed = drive_file.resumable_uri
+                self._journal.set_session(rel, file_path, resumed)
+            if status is not None:
+                with self._progress_lock:
+                    self._file_bytes[file_path] = status.resumable_progress
+        if response is None:
             return
+        self._journal.drop_session(rel)
+        self._file_done(file_path, size)
+        return response
+
+    @staticmethod
+    def _session_progress(drive_file, uri, size):
+        """
+        (bytes the resumable session already has, file resource if it completed)
+        from an empty PUT with Content-Range: bytes */size; (None, None) once
+        the session is gone.
+        """
+        resp, content = drive_file.http.request(
+            uri,
+            "PUT",
+            headers={"Content-Length": "0", "Content-Range": f"bytes */{size}"},
+        )
+        if resp.status in (200, 201):
+            return size, loads(content)
+        if resp.status == 308:
+            received = resp.get("range")
+            return (int(received.rsplit("-", 1)[1]) + 1 if received else 0), None
+        return None, None
+
+    def _file_done(self, file_path, size):
         try:
             remove(file_path)
         except:
             pass
-        self.file_processed_bytes = 0
-        if not Config.IS_TEAM_DRIVE:
-            self.set_permission(response["id"])
-        if not in_dir:
-            drive_file = (
-                self.service.files()
-                .get(fileId=response["id"], supportsAllDrives=True)
-                .execute()
-            )
-            return self.G_DRIVE_BASE_DOWNLOAD_URL.format(drive_file.get("id"))
-        return
+        with self._progress_lock:
+            self._file_bytes.pop(file_path, None)
+            self._uploaded_bytes += size
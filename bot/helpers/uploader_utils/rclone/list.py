@@ -1,16 +1,15 @@
 from aiofiles import open as aiopen
 from aiofiles.os import path as aiopath
 from asyncio import wait_for, Event, gather
-from configparser import RawConfigParser
 from functools import partial
-from json import loads
 from pyrogram.filters import regex, user
 from pyrogram.handlers import CallbackQueryHandler
 from time import time
 
 from bot.logger import LOGGER
 from config import Config
-from ..ext.bot_utils import cmd_exec, update_user_ldata, new_task
+from .rc import RcloneRCError, rclone_rc, read_config
+from ..ext.bot_utils import update_user_ldata, new_task
 from ..ext.db_handler import database
 from ..ext.status_utils import get_readable_file_size, get_readable_time
 from ..tg_helper.button_build import ButtonMaker
@@ -257,54 +256,38 @@ class RcloneList:
             self.item_type = "--dirs-only"
         elif itype:
             self.item_type = itype
-        cmd = [
-            "rclone",
-            "lsjson",
-            self.item_type,
-            "--fast-list",
-            "--no-mimetype",
-            "--no-modtime",
-            "--config",
-            self.config_path,
-            f"{self.remote}{self.path}",
-        ]
         if self.listener.is_cancelled:
             return
-        res, err, code = await cmd_exec(cmd)
-        if code in [0, -9]:
-            result = loads(res)
-            if (
-                len(result) == 0
-                and itype != self.item_type
-                and self.list_status == "rcd"
-            ):
-                itype = (
-                    "--dirs-only"
-                    if self.item_type == "--files-only"
-                    else "--files-only"
-                )
-                self.item_type = itype
-                await self.get_path(itype)
-            else:
-                self.path_list = sorted(result, key=lambda x: x["Path"])
-                self.iter_start = 0
-                await self.get_path_buttons()
-        else:
+        opt = {"dirsOnly": True} if self.item_type == "--dirs-only" else {"filesOnly": True}
+        try:
+            result = await rclone_rc.list_cached(
+                f"{self.remote}{self.path}",
+                self.config_path,
+                noModTime=True,
+                noMimeType=True,
+                **opt,
+            )
+        except RcloneRCError as err:
             LOGGER.error(
-                f"While rclone listing. Path: {self.remote}{self.path}. Stderr: {err}"
+                f"While rclone listing. Path: {self.remote}{self.path}. Error: {err}"
             )
-            self.remote = err[:4000]
+            self.remote = str(err)[:4000]
             self.path = ""
             self.event.set()
+            return
+        if len(result) == 0 and itype != self.item_type and self.list_status == "rcd":
+            itype = "--dirs-only" if self.item_type == "--files-only" else "--files-only"
+            self.item_type = itype
+            await self.get_path(itype)
+        else:
+            self.path_list = sorted(result, key=lambda x: x["Path"])
+            self.iter_start = 0
+            await self.get_path_buttons()
 
     async def list_remotes(self):
-        config = RawConfigParser()
-        async with aiopen(self.config_path, "r") as f:
-            contents = await f.read()
-            config.read_string(contents)
-        if config.has_section("combine"):
-            config.remove_section("combine")
-        self._sections = config.sections()
+        self._sections = [
+            remote for remote in read_config(self.config_path) if remote != "combine"
+        ]
         if len(self._sections) == 1:
             self.remote = f"{self._sections[0]}:"
             await self.get_path()
@@ -0,0 +1,459 @@
+from aiohttp import BasicAuth, ClientError, ClientSession, ClientTimeout
+from asyncio import (
+    CancelledError,
+    Lock,
+    Semaphore,
+    create_subprocess_exec,
+    create_task,
+    current_task,
+    gather,
+    shield,
+    sleep,
+)
+from asyncio.subprocess import DEVNULL
+from collections import OrderedDict
+from configparser import RawConfigParser
+from functools import partial
+from os import fdopen, path as ospath, remove, stat
+from secrets import token_urlsafe
+from shutil import which
+from socket import socket
+from tempfile import mkstemp
+from time import monotonic
+
+from bot.logger import LOGGER
+from config import Config
+
+
+class RcloneRCError(Exception):
+    pass
+
+
+def default_config_path():
+    if Config.RCLONE_CONFIG and ospath.exists(Config.RCLONE_CONFIG):
+        return Config.RCLONE_CONFIG
+    for path in ("/workspace/rclone.conf", "rclone.conf"):
+        if ospath.exists(path):
+            return path
+    return ""
+
+
+_parsed_configs = {}
+
+
+def read_config(config_path):
+    """
+    {section: options} of an rclone config, parsed again only when the
+    file's mtime or size changes. The result is shared, don't modify it.
+    """
+    config_file = ospath.abspath(config_path)
+    st = stat(config_file)
+    version = (st.st_mtime_ns, st.st_size)
+    cached = _parsed_configs.get(config_file)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    config = RawConfigParser()
+    with open(config_file, "r") as f:
+        config.read_string(f.read())
+    sections = {section: dict(config.items(section)) for section in config.sections()}
+    _parsed_configs[config_file] = (version, sections)
+    return sections
+
+
+def split_path(path):
+    """'remote:a/b/c' -> ('remote:a/b', 'c'), '/x/y' -> ('/x', 'y')"""
+    if path.startswith("/") or ":" not in path:
+        prefix, rest = "", path
+    else:
+        prefix, rest = path.split(":", 1)
+        prefix += ":"
+    rest = rest.rstrip("/")
+    parent, _, name = rest.rpartition("/")
+    if not parent and rest.startswith("/"):
+        parent = "/"
+    return f"{prefix}{parent}", name
+
+
+def _remote_and_path(path):
+    """'remote:a/b/' -> ('remote', 'a/b'), local paths have no remote"""
+    if path.startswith("/") or ":" not in path:
+        return "", path.strip("/")
+    remote, rest = path.split(":", 1)
+    return remote, rest.strip("/")
+
+
+def _quote(value):
+    if any(c in value for c in ",:\"'"):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+def _connection_string(sections, remote, path="", depth=0):
+    if remote not in sections or depth > 3:
+        raise RcloneRCError(f"Remote {remote} not found in config")
+    options = dict(sections[remote])
+    backend = options.pop("type", "")
+    params = []
+    for key, value in options.items():
+        if key == "upstreams":
+            raise RcloneRCError(f"Remote {remote} ({backend}) can't be used through rc")
+        if key == "remote" and ":" in value and not value.startswith((":", "/")):
+            inner, inner_path = value.split(":", 1)
+            if inner in sections:
+                value = _connection_string(sections, inner, inner_path, depth + 1)
+        params.append(f",{key}={_quote(value)}")
+    return f":{backend}{''.join(params)}:{path}"
+
+
+class ListingCache:
+    """
+    operations/list results keyed by (config file, remote, path, options).
+    Listings younger than half the TTL are served from memory, older ones
+    are served while a background task lists them again and expired ones
+    are listed before returning. Transfers drop the listings of the paths
+    they touch, their parents and children.
+    """
+
+    def __init__(self, ttl, size=256):
+        self.ttl = ttl
+        self.size = size
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._generation = 0
+
+    async def get(self, key, fetch):
+        entry = self._entries.get(key)
+        if entry is not None:
+            fetched_at, listing = entry
+            age = monotonic() - fetched_at
+            if age < self.ttl:
+                self._entries.move_to_end(key)
+                if age > self.ttl / 2:
+                    self._refresh(key, fetch)
+                return listing
+        return await shield(self._refresh(key, fetch))
+
+    def _refresh(self, key, fetch):
+        task = self._pending.get(key)
+        if task is None:
+            task = create_task(self._fetch(key, fetch))
+            # Background refreshes nobody awaits must not warn on failure
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._pending[key] = task
+        return task
+
+    async def _fetch(self, key, fetch):
+        generation = self._generation
+        try:
+            listing = await fetch()
+        finally:
+            if self._pending.get(key) is current_task():
+                del self._pending[key]
+        if generation == self._generation:
+            self._entries[key] = (monotonic(), listing)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return listing
+
+    def invalidate(self, config_file, remote, path):
+        self._generation += 1
+        for key in [*self._entries, *self._pending]:
+            (key_file, _, _), key_remote, key_path, _ = key
+            if key_file != config_file or key_remote != remote:
+                continue
+            if (
+                not key_path
+                or not path
+                or key_path == path
+                or path.startswith(f"{key_path}/")
+                or key_path.startswith(f"{path}/")
+            ):
+                self._entries.pop(key, None)
+                self._pending.pop(key, None)
+
+    def clear(self):
+        self._generation += 1
+        self._entries.clear()
+        self._pending.clear()
+
+
+class RcloneRC:
+    """
+    Manages one `rclone rcd` for the bot's rclone.conf and talks to it over
+    its HTTP API. Paths from other config files (per-user configs, service
+    account configs) are sent as on-the-fly connection strings.
+    """
+
+    def __init__(self):
+        self._proc = None
+        self._session = None
+        self._url = ""
+        self._auth = None
+        self._lock = Lock()
+        self.config_path = ""
+        self.listings = ListingCache(Config.RCLONE_LIST_CACHE_TTL)
+
+    @property
+    def running(self):
+        return self._proc is not None and self._proc.returncode is None
+
+    async def start(self):
+        async with self._lock:
+            if self.running:
+                return True
+            config_path = default_config_path()
+            if not config_path or not which("rclone"):
+                return False
+            port = Config.RCLONE_RC_PORT
+            if not port:
+                with socket() as s:
+                    s.bind(("127.0.0.1", 0))
+                    port = s.getsockname()[1]
+            user, password = "bot", token_urlsafe(16)
+            cmd = [
+                "rclone",
+                "rcd",
+                "--rc-addr",
+                f"127.0.0.1:{port}",
+                "--rc-user",
+                user,
+                "--rc-pass",
+                password,
+                "--config",
+                config_path,
+                "--rc-job-expire-duration",
+                "10m",
+                "--log-file",
+                "rcd_log.txt",
+            ]
+            self._proc = await create_subprocess_exec(*cmd, stdout=DEVNULL, stderr=DEVNULL)
+            self._url = f"http://127.0.0.1:{port}"
+            self._auth = BasicAuth(user, password)
+            if self._session is None or self._session.closed:
+                self._session = ClientSession(timeout=ClientTimeout(total=None, sock_connect=10))
+            for _ in range(50):
+                if self._proc.returncode is not None:
+                    break
+                try:
+                    async with self._session.post(f"{self._url}/rc/noop", auth=self._auth, json={}) as resp:
+                        if resp.status == 200:
+                            self.config_path = config_path
+                            LOGGER.info(f"RCLONE : rcd started on {self._url} with {config_path}")
+                            return True
+                except ClientError:
+                    pass
+                await sleep(0.2)
+            LOGGER.error("RCLONE : rcd failed to start, see rcd_log.txt")
+            await self._kill()
+            return False
+
+    async def _kill(self):
+        if self.running:
+            try:
+                self._proc.terminate()
+                await self._proc.wait()
+            except ProcessLookupError:
+                pass
+        self._proc = None
+
+    async def restart(self):
+        """Pick up a replaced or removed rclone.conf"""
+        async with self._lock:
+            await self._kill()
+        self.listings.clear()
+        return await self.start()
+
+    async def stop(self):
+        await self._kill()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def call(self, command, **params):
+        if not self.running and not await self.start():
+            raise RcloneRCError("rclone rcd is not running (is rclone.conf present?)")
+        try:
+            async with self._session.post(f"{self._url}/{command}", auth=self._auth, json=params) as resp:
+                data = await resp.json(content_type=None)
+        except (ClientError, ValueError) as e:
+            raise RcloneRCError(f"{command}: {e}") from e
+        if resp.status != 200:
+            raise RcloneRCError((data or {}).get("error") or f"{command} failed with HTTP {resp.status}")
+        return data or {}
+
+    # --- path helpers ---
+
+    def fs(self, path, config_path=None):
+        """Translate 'remote:path' from `config_path` into something the daemon understands"""
+        if (
+            not config_path
+            or ":" not in path
+            or path.startswith((":", "/"))
+            or ospath.abspath(config_path) == ospath.abspath(self.config_path or default_config_path())
+        ):
+            return path
+        remote, rest = path.split(":", 1)
+        try:
+            sections = read_config(config_path)
+        except OSError as e:
+            raise RcloneRCError(str(e)) from e
+        return _connection_string(sections, remote, rest)
+
+    def _config_id(self, config_path=None):
+        """(file, mtime, size) of a config, so a replaced config misses the cache"""
+        config_file = ospath.abspath(
+            config_path or self.config_path or default_config_path() or "rclone.conf"
+        )
+        try:
+            st = stat(config_file)
+        except OSError:
+            return config_file, 0, 0
+        return config_file, st.st_mtime_ns, st.st_size
+
+    def invalidate(self, path, config_path=None):
+        """Forget cached listings of `path`, its parents and children"""
+        remote, rel = _remote_and_path(path)
+        self.listings.invalidate(self._config_id(config_path)[0], remote, rel)
+
+    # --- jobs ---
+
+    async def start_job(self, command, **params):
+        return (await self.call(command, _async=True, **params))["jobid"]
+
+    async def wait_job(self, jobid, on_stats=None, interval=1):
+        try:
+            while True:
+                status = await self.call("job/status", jobid=jobid)
+                if on_stats is not None:
+                    await on_stats(await self.stats(f"job/{jobid}"))
+                if status.get("finished"):
+                    break
+                await sleep(interval)
+        except CancelledError:
+            await self.stop_job(jobid)
+            raise
+        finally:
+            try:
+                await self.call("core/stats-delete", group=f"job/{jobid}")
+            except RcloneRCError:
+                pass
+        if not status.get("success"):
+            raise RcloneRCError(status.get("error") or f"job {jobid} failed")
+        return status.get("output") or {}
+
+    async def stop_job(self, jobid):
+        try:
+            await self.call("job/stop", jobid=jobid)
+        except RcloneRCError:
+            pass
+
+    async def stats(self, group=None):
+        return await self.call("core/stats", group=group) if group else await self.call("core/stats")
+
+    # --- operations ---
+
+    async def list_remotes(self):
+        return (await self.call("config/listremotes")).get("remotes") or []
+
+    async def list(self, path, config_path=None, **opt):
+        """operations/list; `opt` takes dirsOnly, filesOnly, recurse, noModTime, noMimeType..."""
+        data = await self.call("operations/list", fs=self.fs(path, config_path), remote="", opt=opt)
+        return data.get("list") or []
+
+    async def list_cached(self, path, config_path=None, **opt):
+        """`list` through the listing cache, for the remote browsers"""
+        if self.listings.ttl <= 0:
+            return await self.list(path, config_path, **opt)
+        remote, rel = _remote_and_path(path)
+        key = (self._config_id(config_path), remote, rel, tuple(sorted(opt.items())))
+        return await self.listings.get(key, partial(self.list, path, config_path, **opt))
+
+    async def public_link(self, path, config_path=None):
+        fs, remote = split_path(path)
+        data = await self.call("operations/publiclink", fs=self.fs(fs, config_path), remote=remote)
+        return data.get("url")
+
+    async def public_links(self, paths, concurrency=4):
+        """{path: link or None} with a few publiclink calls in flight at once"""
+        sem = Semaphore(concurrency)
+
+        async def _link(path):
+            async with sem:
+                try:
+                    return await self.public_link(path)
+                except RcloneRCError as e:
+                    LOGGER.debug(f"Failed to get link for {path}: {e}")
+                    return None
+
+        links = await gather(*(_link(path) for path in paths))
+        return dict(zip(paths, links))
+
+    async def transfer(
+        self,
+        source,
+        destination,
+        is_dir,
+        move=False,
+        on_stats=None,
+        on_job=None,
+        config_path=None,
+        **params,
+    ):
+        """
+        Copy/move `source` into `destination` as `rclone copy/move` would: a
+        directory's contents land in `destination`, a file lands inside it.
+        Extra params (_config, _filter, createEmptySrcDirs...) are passed through.
+        Cached listings of the destination (and of a moved source) are dropped.
+        """
+        if is_dir:
+            command = "sync/move" if move else "sync/copy"
+            params.update(
+                srcFs=self.fs(source, config_path), dstFs=self.fs(destination, config_path)
+            )
+        else:
+            command = "operations/movefile" if move else "operations/copyfile"
+            src_fs, name = split_path(source)
+            params.update(
+                srcFs=self.fs(src_fs, config_path),
+                srcRemote=name,
+                dstFs=self.fs(destination, config_path),
+                dstRemote=name,
+            )
+        try:
+            jobid = await self.start_job(command, **params)
+            if on_job is not None:
+                on_job(jobid)
+            return await self.wait_job(jobid, on_stats)
+        finally:
+            self.invalidate(destination, config_path)
+            if move:
+                self.invalidate(source if is_dir else split_path(source)[0], config_path)
+
+    async def copy_files(self, source_dir, files, destination, transfers=0, **params):
+        """
+        One job for many files: the rc form of
+        `rclone copy source_dir destination --files-from list --transfers N`,
+        `files` being relative to `source_dir`.
+        """
+        fd, list_path = mkstemp(prefix="rclone_files_", suffix=".txt")
+        with fdopen(fd, "w") as f:
+            f.write("".join(f"{name}\n" for name in files))
+        rc_config = {"NoTraverse": True}
+        if transfers:
+            rc_config["Transfers"] = transfers
+        rc_config.update(params.pop("_config", {}))
+        try:
+            return await self.transfer(
+                source_dir,
+                destination,
+                True,
+                _config=rc_config,
+                _filter={"FilesFromRaw": [list_path]},
+                **params,
+            )
+        finally:
+            remove(list_path)
+
+
+rclone_rc = RcloneRC()
@@ -0,0 +1,76 @@
+from os import path as ospath
+from re import IGNORECASE, compile as re_compile
+
+from config import Config
+
+RATE_LIMIT_ERROR = re_compile(
+    r"rate_?limit_?exceeded|error 429|too many requests", IGNORECASE
+)
+
+
+def is_rate_limited(text):
+    return bool(text) and RATE_LIMIT_ERROR.search(text) is not None
+
+
+class DriveThrottle:
+    """
+    AIMD limits for Google Drive remotes, kept per (config file, remote) so
+    every service account learns its own rate. A transfer without rate-limit
+    errors raises the transactions per second by one, a rate-limit error
+    halves them, and parallel transfers follow at half the TPS. The limits
+    live as long as the bot, so the next task starts at the last safe rate.
+    """
+
+    START_TPS = 4
+
+    def __init__(self):
+        self._tps = {}
+
+    @staticmethod
+    def _key(config_path, remote):
+        return f"{ospath.abspath(config_path)}:{remote}"
+
+    def _get(self, key):
+        ceiling = max(1, Config.RCLONE_DRIVE_MAX_TPS)
+        return min(self._tps.get(key, self.START_TPS), ceiling)
+
+    def limits(self, config_path, remote):
+        """(tps, transfers) for the next transfer"""
+        tps = max(1, int(self._get(self._key(config_path, remote))))
+        return tps, max(1, tps // 2)
+
+    def rc_config(self, config_path, remote):
+        tps, transfers = self.limits(config_path, remote)
+        return {"TPSLimit": tps, "TPSLimitBurst": 1, "Transfers": transfers}
+
+    def flags(self, config_path, remote):
+        tps, transfers = self.limits(config_path, remote)
+        return [
+            "--tpslimit",
+            str(tps),
+            "--tpslimit-burst",
+            "1",
+            "--transfers",
+            str(transfers),
+        ]
+
+    def success(self, config_path, remote):
+        key = self._key(config_path, remote)
+        self._tps[key] = min(self._get(key) + 1, max(1, Config.RCLONE_DRIVE_MAX_TPS))
+
+    def rate_limited(self, config_path, remote):
+        """Halve the rate; False when it was already at the floor"""
+        key = self._key(config_path, remote)
+        tps = self._get(key)
+        self._tps[key] = max(1, tps / 2)
+        return self._tps[key] < tps
+
+    def record(self, config_path, remote, output):
+        """Feed the stderr of a finished rclone command"""
+        if is_rate_limited(output):
+            self.rate_limited(config_path, remote)
+        else:
+            self.success(config_path, remote)
+
+
+drive_throttle = DriveThrottle()
@@ -2,8 +2,7 @@ from aiofiles import open as aiopen
 from aiofiles.os import path as aiopath, makedirs, listdir
 from asyncio import create_subprocess_exec, gather, sleep, wait_for
 from asyncio.subprocess import PIPE
-from configparser import RawConfigParser
-from json import loads
+from configparser import NoSectionError
 from logging import getLogger
 from random import randrange
 from re import findall as re_findall
@@ -14,15 +13,69 @@ from ..ext.files_utils import (
     get_mime_type,
     count_files_and_folders,
 )
+from ..ext.status_utils import get_readable_file_size, get_readable_time
+from .rc import rclone_rc, RcloneRCError, read_config
+from .throttle import drive_throttle, is_rate_limited
 
 LOGGER = getLogger(__name__)
 
+SA_CONF_DIR = "rclone_sa"
+# (remote, option, drive id) -> (service account config, number of accounts)
+_sa_configs = {}
+
+
+async def _sa_config(remote, remote_opts, accounts=None):
+    if gd_id := remote_opts.get("team_drive"):
+        option = "team_drive"
+    elif gd_id := remote_opts.get("root_folder_id"):
+        option = "root_folder_id"
+    else:
+        return None
+    key = (remote, option, gd_id)
+    if key in _sa_configs:
+        return _sa_configs[key]
+    if accounts is None:
+        accounts = await listdir("accounts")
+    if not accounts:
+        return None
+    sa_conf_file = f"{SA_CONF_DIR}/{remote}.conf"
+    text = "".join(
+        f"[sa{i:03}]\ntype = drive\nscope = drive\nservice_account_file = accounts/{sa}\n{option} = {gd_id}\n\n"
+        for i, sa in enumerate(accounts)
+    )
+    await makedirs(SA_CONF_DIR, exist_ok=True)
+    async with aiopen(sa_conf_file, "w") as f:
+        await f.write(text)
+    _sa_configs[key] = (sa_conf_file, len(accounts))
+    return _sa_configs[key]
+
+
+async def prepare_sa_configs(config_path="rclone.conf"):
+    """Write the service account configs of all drive remotes before the first transfer"""
+    _sa_configs.clear()
+    if not (
+        Config.USE_SERVICE_ACCOUNTS
+        and await aiopath.isfile(config_path)
+        and await aiopath.isdir("accounts")
+    ):
+        return
+    accounts = await listdir("accounts")
+    for remote, remote_opts in read_config(config_path).items():
+        if remote_opts.get("type") == "drive" and not remote_opts.get(
+            "service_account_file"
+        ):
+            await _sa_config(remote, remote_opts, accounts)
+
 
 class RcloneTransferHelper:
     def __init__(self, listener, config_path="rclone.conf"):
         self._listener = listener
         self._config_path = config_path
         self._proc = None
+        self._jobid = None
+        self._throttle_key = None
+        self._throttle_restart = False
+        self._rate_limited = False
         self._transferred_size = "0 B"
         self._eta = "-"
         self._percentage = "0%"
@@ -82,6 +135,29 @@ class RcloneTransferHelper:
                 ) = data[0]
             await sleep(0.05)
 
+    async def _rc_progress(self, stats):
+        transferred = stats.get("bytes", 0)
+        total = stats.get("totalBytes", 0)
+        self._transferred_size = get_readable_file_size(transferred)
+        self._size = get_readable_file_size(total)
+        self._percentage = f"{transferred * 100 / total:.0f}%" if total else "0%"
+        self._speed = f"{get_readable_file_size(stats.get('speed', 0))}/s"
+        self._eta = get_readable_time(stats["eta"]) if stats.get("eta") else "-"
+        if self._throttle_key is None or not is_rate_limited(stats.get("lastError")):
+            return
+        self._rate_limited = True
+        # Stop the job and carry on at the lowered rate instead of failing it
+        if not self._throttle_restart and drive_throttle.rate_limited(*self._throttle_key):
+            self._throttle_restart = True
+            tps, transfers = drive_throttle.limits(*self._throttle_key)
+            LOGGER.info(
+                f"Rate limited on {self._throttle_key[1]}, continuing with tps {tps} and {transfers} transfers"
+            )
+            await rclone_rc.stop_job(self._jobid)
+
+    def _set_job(self, jobid):
+        self._jobid = jobid
+
     def _switch_service_account(self):
         if self._sa_index == self._sa_number - 1:
             self._sa_index = 0
@@ -93,37 +169,27 @@ class RcloneTransferHelper:
         return remote
 
     async def _create_rc_sa(self, remote, remote_opts):
-        sa_conf_dir = "rclone_sa"
-        sa_conf_file = f"{sa_conf_dir}/{remote}.conf"
-        if await aiopath.isfile(sa_conf_file):
-            return sa_conf_file
-        await makedirs(sa_conf_dir, exist_ok=True)
-
-        if gd_id := remote_opts.get("team_drive"):
-            option = "team_drive"
-        elif gd_id := remote_opts.get("root_folder_id"):
-            option = "root_folder_id"
-        else:
+        sa = await _sa_config(remote, remote_opts)
+        if sa is None:
             self._use_service_accounts = False
             return self._config_path
-
-        files = await listdir("accounts")
-        text = "".join(
-            f"[sa{i:03}]\ntype = drive\nscope = drive\nservice_account_file = accounts/{sa}\n{option} = {gd_id}\n\n"
-            for i, sa in enumerate(files)
-        )
-
-        async with aiopen(sa_conf_file, "w") as f:
-            await f.write(text)
+        sa_conf_file, self._sa_number = sa
         return sa_conf_file
 
     async def _start_download(self, cmd, remote_type):
-        self._proc = await create_subprocess_exec(*cmd, stdout=PIPE, stderr=PIPE)
+        throttle_key = None
+        run_cmd = cmd
+        if remote_type == "drive" and not self._listener.rc_flags:
+            throttle_key = (cmd[4], cmd[6].split(":", 1)[0])
+            run_cmd = [*cmd, *drive_throttle.flags(*throttle_key)]
+        self._proc = await create_subprocess_exec(*run_cmd, stdout=PIPE, stderr=PIPE)
         await self._progress()
         _, stderr = await self._proc.communicate()
         return_code = self._proc.returncode
         if self._listener.is_cancelled:
             return
+        if throttle_key is not None and return_code != -9:
+            drive_throttle.record(*throttle_key, stderr.decode())
 
         if return_code == 0:
             await self._listener.on_download_complete()
@@ -136,7 +202,7 @@ class RcloneTransferHelper:
             if (
                 self._sa_number != 0
                 and remote_type == "drive"
-                and "RATE_LIMIT_EXCEEDED" in error
+                and is_rate_limited(error)
                 and self._use_service_accounts
             ):
                 if self._sa_count < self._sa_number:
@@ -171,8 +237,6 @@ class RcloneTransferHelper:
         ):
             config_path = await self._create_rc_sa(remote, remote_opts)
             if config_path != self._config_path:
-                sa_files = await listdir("accounts")
-                self._sa_number = len(sa_files)
                 self._sa_index = randrange(self._sa_number)
                 remote = f"sa{self._sa_index:03}"
                 LOGGER.info(f"Download with service account {remote}")
@@ -187,12 +251,6 @@ class RcloneTransferHelper:
                     "--drive-acknowledge-abuse",
                     "--drive-chunk-size",
                     "128M",
-                    "--tpslimit",
-                    "1",
-                    "--tpslimit-burst",
-                    "1",
-                    "--transfers",
-                    "1",
                 )
             )
 
@@ -200,34 +258,23 @@ class RcloneTransferHelper:
 
     async def _get_gdrive_link(self, config_path, destination, mime_type):
         epath = destination.rsplit("/", 1)[0] if mime_type == "Folder" else destination
-        cmd = [
-            "rclone",
-            "lsjson",
-            "--fast-list",
-            "--no-mimetype",
-            "--no-modtime",
-            "--config",
-            config_path,
-            epath,
-        ]
-        res, err, code = await cmd_exec(cmd)
-
-        if code == 0:
-            result = loads(res)
-            fid = next(
-                (r["ID"] for r in result if r["Path"] == self._listener.name), "err"
-            )
-            link = (
-                f"https://drive.google.com/drive/folders/{fid}"
-                if mime_type == "Folder"
-                else f"https://drive.google.com/uc?id={fid}&export=download"
+        try:
+            result = await rclone_rc.list(
+                epath, config_path=config_path, noModTime=True, noMimeType=True
             )
-        elif code != -9:
+        except RcloneRCError as err:
             LOGGER.error(
-                f"while getting drive link. Path: {destination}. Stderr: {err}"
+                f"while getting drive link. Path: {destination}. Error: {err}"
             )
-            link = ""
-        return link
+            return ""
+        fid = next(
+            (r["ID"] for r in result if r["Path"] == self._listener.name), "err"
+        )
+        return (
+            f"https://drive.google.com/drive/folders/{fid}"
+            if mime_type == "Folder"
+            else f"https://drive.google.com/uc?id={fid}&export=download"
+        )
 
     async def _start_upload(self, cmd, remote_type):
         self._proc = await create_subprocess_exec(*cmd, stdout=PIPE, stderr=PIPE)
@@ -247,7 +294,7 @@ class RcloneTransferHelper:
             if (
                 self._sa_number != 0
                 and remote_type == "drive"
-                and "RATE_LIMIT_EXCEEDED" in error
+                and is_rate_limited(error)
                 and self._use_service_accounts
             ):
                 if self._sa_count < self._sa_number:
@@ -265,6 +312,65 @@ class RcloneTransferHelper:
             await self._listener.on_upload_error(error[:4000])
             return False
 
+    async def _start_upload_rc(self, path, remote, rc_path, config_path, remote_type, is_dir):
+        rc_config = {"LowLevelRetries": 1, "Metadata": True}
+        if remote_type == "drive":
+            self._throttle_key = (config_path, remote)
+            self._rate_limited = False
+            rc_config.update(drive_throttle.rc_config(config_path, remote))
+        rc_filter = {"IgnoreCase": True}
+        if self._listener.excluded_extensions:
+            rc_filter["ExcludeRule"] = [
+                "*.{" + ",".join(self._listener.excluded_extensions) + "}"
+            ]
+        try:
+            await rclone_rc.transfer(
+                path,
+                f"{remote}:{rc_path}",
+                is_dir,
+                move=True,
+                on_stats=self._rc_progress,
+                on_job=self._set_job,
+                config_path=config_path,
+                _config=rc_config,
+                _filter=rc_filter,
+            )
+            if self._throttle_key is not None and not self._rate_limited:
+                drive_throttle.success(config_path, remote)
+            return True
+        except RcloneRCError as err:
+            error = str(err)
+        finally:
+            self._jobid = None
+            self._throttle_key = None
+
+        if self._listener.is_cancelled:
+            return False
+        if self._throttle_restart:
+            # Moved files are gone from the source, the new job picks up the rest
+            self._throttle_restart = False
+            return await self._start_upload_rc(
+                path, remote, rc_path, config_path, remote_type, is_dir
+            )
+        LOGGER.error(error)
+        if (
+            self._sa_number != 0
+            and remote_type == "drive"
+            and is_rate_limited(error)
+            and self._use_service_accounts
+        ):
+            if self._sa_count < self._sa_number:
+                remote = self._switch_service_account()
+                return await self._start_upload_rc(
+                    path, remote, rc_path, config_path, remote_type, is_dir
+                )
+            else:
+                LOGGER.info(
+                    f"Reached maximum number of service accounts switching, which is {self._sa_count}"
+                )
+        await self._listener.on_upload_error(error[:4000])
+        return False
+
     async def upload(self, path):
         self._is_upload = True
         rc_path = self._listener.up_dest
@@ -303,28 +409,20 @@ class RcloneTransferHelper:
         ):
             fconfig_path = await self._create_rc_sa(oremote, remote_opts)
             if fconfig_path != self._config_path:
-                sa_files = await listdir("accounts")
-                self._sa_number = len(sa_files)
                 self._sa_index = randrange(self._sa_number)
                 fremote = f"sa{self._sa_index:03}"
                 LOGGER.info(f"Upload with service account {fremote}")
 
-        cmd = self._get_updated_command(
-            fconfig_path, path, f"{fremote}:{rc_path}", "move"
-        )
-        if remote_type == "drive" and not self._listener.rc_flags:
-            cmd.extend(
-                (
-                    "--tpslimit",
-                    "1",
-                    "--tpslimit-burst",
-                    "1",
-                    "--transfers",
-                    "1",
-                )
+        # Custom rclone flags can't be mapped onto rc options, keep the CLI for them
+        if self._listener.rc_flags:
+            cmd = self._get_updated_command(
+                fconfig_path, path, f"{fremote}:{rc_path}", "move"
+            )
+            result = await self._start_upload(cmd, remote_type)
+        else:
+            result = await self._start_upload_rc(
+                path, fremote, rc_path, fconfig_path, remote_type, mime_type == "Folder"
             )
-
-        result = await self._start_upload(cmd, remote_type)
         if not result:
             return
 
@@ -338,19 +436,10 @@ class RcloneTransferHelper:
         if remote_type == "drive":
             link = await self._get_gdrive_link(oconfig_path, destination, mime_type)
         else:
-            cmd = [
-                "rclone",
-                "link",
-                "--config",
-                oconfig_path,
-                destination,
-            ]
-            res, err, code = await cmd_exec(cmd)
-
-            if code == 0:
-                link = res
-            elif code != -9:
-                LOGGER.error(f"while getting link. Path: {destination} | Stderr: {err}")
+            try:
+                link = await rclone_rc.public_link(destination, config_path=oconfig_path)
+            except RcloneRCError as err:
+                LOGGER.error(f"while getting link. Path: {destination} | Error: {err}")
                 link = ""
         if self._listener.is_cancelled:
             return
@@ -381,18 +470,11 @@ class RcloneTransferHelper:
         cmd = self._get_updated_command(
             config_path, f"{src_remote}:{src_path}", destination, method
         )
+        throttle_key = None
         if not self._listener.rc_flags and src_remote_type == "drive":
-            cmd.extend(
-                (
-                    "--drive-acknowledge-abuse",
-                    "--tpslimit",
-                    "3",
-                    "--tpslimit-burst",
-                    "1",
-                    "--transfers",
-                    "3",
-                )
-            )
+            throttle_key = (config_path, src_remote)
+            cmd.append("--drive-acknowledge-abuse")
+            cmd.extend(drive_throttle.flags(*throttle_key))
 
         self._proc = await create_subprocess_exec(*cmd, stdout=PIPE, stderr=PIPE)
         await self._progress()
@@ -401,6 +483,8 @@ class RcloneTransferHelper:
 
         if self._listener.is_cancelled:
             return None, None
+        if throttle_key is not None and return_code != -9:
+            drive_throttle.record(*throttle_key, stderr.decode())
 
         if return_code == -9:
             return None, None
@@ -486,15 +570,15 @@ class RcloneTransferHelper:
 
     @staticmethod
     async def _get_remote_options(config_path, remote):
-        config = RawConfigParser()
-        async with aiopen(config_path, "r") as f:
-            contents = await f.read()
-            config.read_string(contents)
-        options = config.options(remote)
-        return {opt: config.get(remote, opt) for opt in options}
+        sections = read_config(config_path)
+        if remote not in sections:
+            raise NoSectionError(remote)
+        return dict(sections[remote])
 
     async def cancel_task(self):
         self._listener.is_cancelled = True
+        if self._jobid is not None:
+            await rclone_rc.stop_job(self._jobid)
         if self._proc is not None:
             try:
                 self._proc.kill()
@@ -1,18 +1,57 @@
-import os
+import time
+import queue
+import atexit
 import logging
-import inspect
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from config import Config
 
 log_file_path = "./bot/bot_logs.log"
 
+
+class DebugRateLimitFilter(logging.Filter):
+    """Let at most `burst` DEBUG records per call site through every `window` seconds.
+
+    Hot loops (downloader output, per-chunk progress) log from a single line, so
+    keying on (pathname, lineno) samples them without touching other messages.
+    The number of dropped records is appended to the next one that passes.
+    """
+
+    def __init__(self, burst: int, window: float):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self._sites = {}  # (pathname, lineno) -> [window_start, passed, suppressed]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or self.burst <= 0:
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            site = self._sites.get(key)
+            if site is None or now - site[0] >= self.window:
+                suppressed = site[2] if site else 0
+                self._sites[key] = [now, 1, 0]
+                if suppressed:
+                    record.msg = f"{record.msg} [{suppressed} similar suppressed]"
+                return True
+            if site[1] < self.burst:
+                site[1] += 1
+                return True
+            site[2] += 1
+            return False
+
+
 class Logger:
 
     def __init__(self):
-        try:
-            logging.getLogger().removeHandler(logging.getLogger().handlers[0])
-        except:
-            pass
-        self.logger = logging.getLogger()
-        self.logger.setLevel(logging.DEBUG)
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        self.logger = root
         logging.getLogger("pyrogram").setLevel(logging.WARNING)
         logging.getLogger("pymongo").setLevel(logging.WARNING)
         logging.getLogger("asyncio").setLevel(logging.WARNING)
@@ -27,31 +66,52 @@ class Logger:
         logging.getLogger("pydub").setLevel(logging.WARNING)
         logging.getLogger("spotipy").setLevel(logging.WARNING)
 
-        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+        # Caller file comes from the record (stacklevel) instead of frame inspection
+        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(filename)s - %(message)s')
+
+        file_level = logging.getLevelName(Config.LOG_LEVEL)
+        console_level = logging.getLevelName(Config.CONSOLE_LOG_LEVEL)
+        if not isinstance(file_level, int):
+            file_level = logging.DEBUG
+        if not isinstance(console_level, int):
+            console_level = logging.INFO
+        self.logger.setLevel(min(file_level, console_level))
 
-        # Create file handler
-        file_handler = logging.FileHandler(log_file_path, 'a', 'utf-8')
-        file_handler.setLevel(logging.DEBUG)
+        # Create rotating file handler
+        file_handler = RotatingFileHandler(
+            log_file_path, 'a',
+            maxBytes=Config.LOG_MAX_BYTES,
+            backupCount=Config.LOG_BACKUP_COUNT,
+            encoding='utf-8'
+        )
+        file_handler.setLevel(file_level)
         file_handler.setFormatter(formatter)
-        self.logger.addHandler(file_handler)
 
         # Create console handler
         console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.DEBUG)
+        console_handler.setLevel(console_level)
         console_handler.setFormatter(formatter)
-        self.logger.addHandler(console_handler)
+
+        # The event loop only enqueues records; a listener thread does the I/O
+        log_queue = queue.SimpleQueue()
+        queue_handler = QueueHandler(log_queue)
+        queue_handler.addFilter(DebugRateLimitFilter(Config.LOG_DEBUG_BURST, Config.LOG_DEBUG_WINDOW))
+        self.logger.addHandler(queue_handler)
+
+        self.listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+        self.listener.start()
+        atexit.register(self.listener.stop)
 
     def debug(self, message, *args, **kwargs):
-        caller_frame = inspect.currentframe().f_back
-        caller_filename = os.path.basename(caller_frame.f_globals['__file__'])
-        self.logger.debug(f'{caller_filename} - {message}', *args, **kwargs)
+        self.logger.debug(message, *args, stacklevel=2, **kwargs)
 
     def info(self, message, *args, **kwargs):
-        self.logger.info(message, *args, **kwargs)
+        self.logger.info(message, *args, stacklevel=2, **kwargs)
+
+    def warning(self, message, *args, **kwargs):
+        self.logger.warning(message, *args, stacklevel=2, **kwargs)
 
     def error(self, message, *args, **kwargs):
-        caller_frame = inspect.currentframe().f_back
-        caller_filename = os.path.basename(caller_frame.f_globals['__file__'])
-        self.logger.error(f'{caller_filename} - {message}', *args, **kwargs)
+        self.logger.error(message, *args, stacklevel=2, **kwargs)
 
 LOGGER = Logger()
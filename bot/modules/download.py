@@ -1,4 +1,5 @@
 import asyncio
+from functools import partial
 from pyrogram.types import Message, InlineKeyboardButton, InlineKeyboardMarkup
 from pyrogram import Client, filters
 
@@ -14,9 +15,18 @@ from ..helpers.tidal_ng.handler import start_tidal_ng
 from ..helpers.deezer.handler import start_deezer
 from ..providers.apple import start_apple
 # IMPORT EDIT_MESSAGE HERE:
-from ..helpers.message import send_message, antiSpam, check_user, fetch_user_details, edit_message
+from ..helpers.message import send_message, antiSpam, check_user, fetch_user_details, edit_message, user_details
 from ..helpers.state import conversation_state
 
+# Resumed downloads running outside the queue, held so they aren't garbage collected
+_resumed = set()
+
+
+def _resumed_done(task: asyncio.Task):
+    _resumed.discard(task)
+    if not task.cancelled() and (e := task.exception()):
+        LOGGER.error(f"Resumed download failed: {e}")
+
 
 @Client.on_message(filters.command(CMD.DOWNLOAD))
 async def download_track(c, msg: Message):
@@ -80,58 +90,73 @@ async def download_track(c, msg: Message):
         if not spam:
             user = await fetch_user_details(msg, reply)
             user['link'] = link
-            from bot.helpers.tasks import task_manager
-            from bot.settings import bot_set
-            # If queue mode is ON, enqueue the job to run one-by-one
-            if getattr(bot_set, 'queue_mode', False):
-                # Build a small function that will create its own task state when executed
-                async def _job():
-                    state = await task_manager.create(user, label="Download")
-                    u = dict(user)
-                    u['task_id'] = state.task_id
-                    u['cancel_event'] = state.cancel_event
-                    u['bot_msg'] = await send_message(msg, f"Starting download…\nUse /cancel <code>{state.task_id}</code> to stop.")
-                    await send_message(u, f"Task ID:\n<code>{state.task_id}</code>")
-                    try:
-                        await start_link(link, u, options)
-                        await send_message(u, lang.s.TASK_COMPLETED)
-                    except asyncio.CancelledError:
-                        await send_message(u, "⏹️ Task cancelled")
-                    except Exception as e:
-                        LOGGER.error(f"Download failed: {e}")
-                        error_msg = f"Download failed: {str(e)}"
-                        await send_message(u, error_msg)
-                    try:
-                        await c.delete_messages(msg.chat.id, u['bot_msg'].id)
-                    except Exception:
-                        pass
-                    await cleanup(u)
-                    await task_manager.finish(state.task_id, status="cancelled" if state.cancel_event.is_set() else "done")
-                    await antiSpam(msg.from_user.id, msg.chat.id, True)
-
-                qid, pos = await task_manager.enqueue(user['user_id'], link, options, _job)
-                await send_message(user, f"✅ Added to queue. ID: <code>{qid}</code>\nPosition: {pos}")
-                return
-
-            # Otherwise, run immediately as before
-            state = await task_manager.create(user, label="Download")
-            user['task_id'] = state.task_id
-            user['cancel_event'] = state.cancel_event
-            user['bot_msg'] = await send_message(msg, f"Starting download…\nUse /cancel <code>{state.task_id}</code> to stop.")
-            await send_message(user, f"Task ID:\n<code>{state.task_id}</code>")
-            try:
-                await start_link(link, user, options)
-                await send_message(user, lang.s.TASK_COMPLETED)
-            except asyncio.CancelledError:
-                await send_message(user, "⏹️ Task cancelled")
-            except Exception as e:
-                LOGGER.error(f"Download failed: {e}")
-                error_msg = f"Download failed: {str(e)}"
-                await send_message(user, error_msg)
-            await c.delete_messages(msg.chat.id, user['bot_msg'].id)
-            await cleanup(user)  # deletes uploaded files
-            await task_manager.finish(state.task_id, status="cancelled" if state.cancel_event.is_set() else "done")
-            await antiSpam(msg.from_user.id, msg.chat.id, True)
+            await submit_download(user, link, options)
+
+
+async def submit_download(user: dict, link: str, options: dict):
+    """Start a download now, or queue it when Queue Mode is on; either way it survives a restart"""
+    from bot.helpers.tasks import task_manager
+    from bot.settings import bot_set
+    if getattr(bot_set, 'queue_mode', False):
+        job_id = task_manager.persist_job(user, link, options, state="queued")
+        qid, pos = await task_manager.enqueue(user['user_id'], link, options, partial(run_download, user, link, options, job_id), job_id=job_id)
+        await send_message(user, f"✅ Added to queue. ID: <code>{qid}</code>\nPosition: {pos}")
+        return
+    job_id = task_manager.persist_job(user, link, options, state="running")
+    await run_download(user, link, options, job_id)
+
+
+async def run_download(user: dict, link: str, options: dict, job_id: str = None, checkpoint: dict = None):
+    """Run one download as a task, from the start message to the cleanup"""
+    from bot.tgclient import aio
+    from bot.helpers.tasks import task_manager
+    state = await task_manager.create(user, label="Download", job_id=job_id, checkpoint=checkpoint)
+    user = dict(user)
+    user['task_id'] = state.task_id
+    user['cancel_event'] = state.cancel_event
+    user['bot_msg'] = await send_message(user, f"Starting download…\nUse /cancel <code>{state.task_id}</code> to stop.")
+    await send_message(user, f"Task ID:\n<code>{state.task_id}</code>")
+    try:
+        await start_link(link, user, options)
+        await send_message(user, lang.s.TASK_COMPLETED)
+    except asyncio.CancelledError:
+        await send_message(user, "⏹️ Task cancelled")
+    except Exception as e:
+        state.failed = True
+        LOGGER.error(f"Download failed: {e}")
+        await send_message(user, f"Download failed: {str(e)}")
+    try:
+        await aio.delete_messages(user['chat_id'], user['bot_msg'].id)
+    except Exception:
+        pass
+    await cleanup(user)  # deletes uploaded files
+    await task_manager.finish(state.task_id, status="cancelled" if state.cancel_event.is_set() else "done")
+    await antiSpam(user['user_id'], user['chat_id'], True)
+
+
+async def resume_jobs():
+    """Pick up the downloads that were queued or running when the bot stopped"""
+    from bot.helpers.tasks import task_manager
+    from bot.settings import bot_set
+    resume, given_up = task_manager.load_jobs()
+    for job in given_up:
+        LOGGER.warning(f"Dropping job {job['job_id']} after {job['attempts'] - 1} interrupted attempts")
+        await send_message(job['context'], f"❌ Gave up on {job['link']} after {job['attempts'] - 1} interrupted attempts.")
+    for job in resume:
+        user = dict(user_details)
+        user.update(job['context'])
+        user['link'] = job['link']
+        await antiSpam(user['user_id'], user['chat_id'])
+        run = partial(run_download, user, job['link'], job['options'], job['job_id'], job['checkpoint'])
+        if getattr(bot_set, 'queue_mode', False):
+            await task_manager.enqueue(user['user_id'], job['link'], job['options'], run, job_id=job['job_id'])
+        else:
+            task = asyncio.create_task(run())
+            _resumed.add(task)
+            task.add_done_callback(_resumed_done)
+        LOGGER.info(f"Resuming job {job['job_id']} ({job['link']})")
+    if resume:
+        LOGGER.info(f"Resumed {len(resume)} download(s) from the task queue")
 
 
 def parse_options(parts: list) -> dict:
@@ -168,6 +193,66 @@ async def start_link(link: str, user: dict, options: dict = None):
         user: User details dictionary
         options: Command-line options passed by user
     """
+    from bot.settings import bot_set
+    from ..helpers.media_cache import media_cache
+    from ..helpers.tasks import task_manager
+
+    provider = get_link_provider(link)
+    if provider is None:
+        await send_message(user, lang.s.ERR_UNSUPPORTED_LINK)
+        return None
+    if provider == 'spotify':
+        return 'spotify'
+
+    state = await task_manager.get(user['task_id']) if user.get('task_id') else None
+    if state:
+        state.provider = provider
+
+    if provider in ('qobuz', 'deezer', 'tidal'):
+        await bot_set.ensure_provider(provider)
+
+    # Answer repeat requests from the media cache when possible
+    options = options or {}
+    cache_key = await media_cache.resolve_key(provider, link, user, options)
+    if cache_key and not options.get('nocache'):
+        if await media_cache.replay(user, cache_key):
+            return None
+    # A resumed job skips the tracks it already delivered, its recording would be partial
+    if not (state and state.checkpoint.get('done')):
+        media_cache.start_recording(user, cache_key)
+
+    # Hold disk space for the download; waits while other tasks need it
+    if state:
+        from ..helpers.disk_budget import content_kind, estimate, download_root
+
+        async def _waiting(nbytes):
+            await edit_message(user['bot_msg'], f"⏳ Waiting for disk space (~{nbytes // (1024 * 1024)} MB needed)…")
+
+        kind = content_kind(provider, link, options)
+        root = await download_root(provider)
+        if not await task_manager.reserve_disk(state.task_id, estimate(provider, kind, options), kind, _waiting, root):
+            raise asyncio.CancelledError()
+
+    if provider == 'tidal':
+        await start_tidal(link, user)
+    elif provider == 'tidal_ng':
+        await start_tidal_ng(link, user)
+    elif provider == 'deezer':
+        await start_deezer(link, user)
+    elif provider == 'qobuz':
+        user['provider'] = 'Qobuz'
+        await start_qobuz(link, user)
+    elif provider == 'apple':
+        user['provider'] = 'Apple'
+        # USE IMPORTED EDIT_MESSAGE FUNCTION
+        await edit_message(user['bot_msg'], "Starting Apple Music download...")
+        await start_apple(link, user, options)
+
+    media_cache.commit(user)
+
+
+def get_link_provider(link: str) -> str | None:
+    """Return the provider key for a link ('tidal', 'tidal_ng', 'deezer', 'qobuz', 'spotify', 'apple') or None"""
     tidal = ["https://tidal.com", "https://listen.tidal.com", "tidal.com", "listen.tidal.com"]
     deezer = ["https://link.deezer.com", "https://deezer.com", "deezer.com", "https://www.deezer.com", "link.deezer.com"]
     qobuz = ["https://play.qobuz.com", "https://open.qobuz.com", "https://www.qobuz.com"]
@@ -176,25 +261,16 @@ async def start_link(link: str, user: dict, options: dict = None):
 
     from bot.settings import bot_set
     if link.startswith(tuple(tidal)):
-        if bot_set.tidal_legacy_enabled:
-            await start_tidal(link, user)
-        else:
-            await start_tidal_ng(link, user)
+        return 'tidal' if bot_set.tidal_legacy_enabled else 'tidal_ng'
     elif link.startswith(tuple(deezer)):
-        await start_deezer(link, user)
+        return 'deezer'
     elif link.startswith(tuple(qobuz)):
-        user['provider'] = 'Qobuz'
-        await start_qobuz(link, user)
+        return 'qobuz'
     elif link.startswith(tuple(spotify)):
         return 'spotify'
     elif link.startswith(tuple(apple_music)):
-        user['provider'] = 'Apple'
-        # USE IMPORTED EDIT_MESSAGE FUNCTION
-        await edit_message(user['bot_msg'], "Starting Apple Music download...")
-        await start_apple(link, user, options)
-    else:
-        await send_message(user, lang.s.ERR_UNSUPPORTED_LINK)
-        return None
+        return 'apple'
+    return None
 
 
 # --- Apple flags popup callbacks ---
@@ -239,54 +315,7 @@ async def apple_flag_select_cb(c, cb):
         user = await fetch_user_details(cb.message, reply=False)
         user['link'] = link
 
-        from bot.helpers.tasks import task_manager
-        from bot.settings import bot_set
-        if getattr(bot_set, 'queue_mode', False):
-            async def _job():
-                state = await task_manager.create(user, label="Download")
-                u = dict(user)
-                u['task_id'] = state.task_id
-                u['cancel_event'] = state.cancel_event
-                u['bot_msg'] = await send_message(cb.message, f"Starting download…\nUse /cancel <code>{state.task_id}</code> to stop.")
-                await send_message(u, f"Task ID:\n<code>{state.task_id}</code>")
-                try:
-                    await start_link(link, u, options)
-                    await send_message(u, lang.s.TASK_COMPLETED)
-                except asyncio.CancelledError:
-                    await send_message(u, "⏹️ Task cancelled")
-                except Exception as e:
-                    LOGGER.error(f"Download failed: {e}")
-                    await send_message(u, f"Download failed: {str(e)}")
-                try:
-                    await c.delete_messages(cb.message.chat.id, u['bot_msg'].id)
-                except Exception:
-                    pass
-                await cleanup(u)
-                await task_manager.finish(state.task_id, status="cancelled" if state.cancel_event.is_set() else "done")
-                await antiSpam(cb.from_user.id, cb.message.chat.id, True)
-
-            qid, pos = await task_manager.enqueue(user['user_id'], link, options, _job)
-            await send_message(cb.message, f"✅ Added to queue. ID: <code>{qid}</code>\nPosition: {pos}")
-            return
-
-        # Immediate run
-        state = await task_manager.create(user, label="Download")
-        user['task_id'] = state.task_id
-        user['cancel_event'] = state.cancel_event
-        user['bot_msg'] = await send_message(cb.message, f"Starting download…\nUse /cancel <code>{state.task_id}</code> to stop.")
-        await send_message(user, f"Task ID:\n<code>{state.task_id}</code>")
-        try:
-            await start_link(link, user, options)
-            await send_message(user, lang.s.TASK_COMPLETED)
-        except asyncio.CancelledError:
-            await send_message(user, "⏹️ Task cancelled")
-        except Exception as e:
-            LOGGER.error(f"Download failed: {e}")
-            await send_message(user, f"Download failed: {str(e)}")
-        await c.delete_messages(cb.message.chat.id, user['bot_msg'].id)
-        await cleanup(user)
-        await task_manager.finish(state.task_id, status="cancelled" if state.cancel_event.is_set() else "done")
-        await antiSpam(cb.from_user.id, cb.message.chat.id, True)
+        await submit_download(user, link, options)
     except Exception:
         try:
             await conversation_state.clear(cb.from_user.id)
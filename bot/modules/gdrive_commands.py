@@ -5,6 +5,7 @@ from pyrogram.types import Message
 from ..helpers.uploader_utils.gdrive.clone import GoogleDriveClone
 from ..helpers.uploader_utils.gdrive.count import GoogleDriveCount
 from ..helpers.message import send_message
+from ..helpers import executors
 
 class CloneListener:
     def __init__(self, message):
@@ -23,7 +24,6 @@ async def clone_command(client: Client, message: Message):
     Handler for the /clone command.
     """
     from config import Config
-    import asyncio
 
     args = message.text.split(" ", 1)
     if len(args) == 1:
@@ -37,8 +37,7 @@ async def clone_command(client: Client, message: Message):
 
     cloner = GoogleDriveClone(listener)
 
-    loop = asyncio.get_event_loop()
-    result = await loop.run_in_executor(None, cloner.clone)
+    result = await executors.network.run(cloner.clone)
 
     if result and all(result):
         durl, mime_type, total_files, total_folders, obj_id = result
@@ -55,7 +54,6 @@ async def count_command(client: Client, message: Message):
     """
     Handler for the /count command.
     """
-    import asyncio
 
     args = message.text.split(" ", 1)
     if len(args) == 1:
@@ -67,8 +65,7 @@ async def count_command(client: Client, message: Message):
 
     counter = GoogleDriveCount()
 
-    loop = asyncio.get_event_loop()
-    result = await loop.run_in_executor(None, counter.count, link, user_id)
+    result = await executors.network.run(counter.count, link, user_id)
 
     if isinstance(result, str):
         # It's an error message
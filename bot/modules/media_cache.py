@@ -0,0 +1,34 @@
+from pyrogram import Client, filters
+from pyrogram.types import Message
+
+from bot.helpers.message import send_message, check_user
+from bot.helpers.media_cache import media_cache, parse_content_id
+from bot.settings import bot_set
+
+
+uncache_cmds = ["uncache"]
+if bot_set.bot_username:
+	uncache_cmds.append(f"uncache@{bot_set.bot_username}")
+
+@Client.on_message(filters.command(uncache_cmds))
+async def uncache(c, msg: Message):
+	if not await check_user(msg.from_user.id, restricted=True):
+		return
+	parts = msg.text.strip().split()
+	if len(parts) < 2:
+		return await send_message(msg, "Usage: /uncache <link> or /uncache all")
+
+	if parts[1].lower() == 'all':
+		count = media_cache.invalidate()
+		return await send_message(msg, f"🧹 Cleared {count} media cache entr{'y' if count == 1 else 'ies'}")
+
+	from bot.modules.download import get_link_provider
+	link = parts[1]
+	provider = get_link_provider(link)
+	content_id = parse_content_id('tidal' if provider == 'tidal_ng' else provider, link) if provider else None
+	if not content_id:
+		return await send_message(msg, "❓ Could not recognise an item ID in that link")
+	# Tidal items may have been cached by either Tidal backend
+	providers = ['tidal', 'tidal_ng'] if provider in ('tidal', 'tidal_ng') else [provider]
+	count = sum(media_cache.invalidate(p, content_id) for p in providers)
+	await send_message(msg, f"🧹 Removed {count} cached cop{'y' if count == 1 else 'ies'} of <code>{content_id}</code>")
@@ -3,7 +3,6 @@ from pyrogram import Client, filters
 from pyrogram.types import CallbackQuery, Message, InlineKeyboardButton, InlineKeyboardMarkup
 
 import bot.helpers.translations as lang
-import asyncio
 
 from ..settings import bot_set
 from ..helpers.buttons.settings import *
@@ -11,6 +10,8 @@ from ..helpers.database.pg_impl import set_db
 from ..helpers.message import send_message, edit_message, check_user, fetch_user_details
 from ..helpers.state import conversation_state
 from ..helpers.state import conversation_state as cs
+from ..helpers.uploader_utils.rclone.rc import rclone_rc, RcloneRCError
+from ..helpers.uploader_utils.rclone.transfer import prepare_sa_configs
 
 
 
@@ -69,6 +70,8 @@ async def handle_rclone_conf_upload(client, message: Message):
             os.remove('rclone.conf')
         os.replace(temp_path, 'rclone.conf')
         _import_waiting.discard(user_id)
+        await rclone_rc.restart()
+        await prepare_sa_configs()
         await send_message(message, "✅ rclone.conf imported successfully.")
     except Exception:
         try:
@@ -83,6 +86,7 @@ async def rclone_delete_cb(client, cb:CallbackQuery):
         try:
             if os.path.exists('rclone.conf'):
                 os.remove('rclone.conf')
+            await rclone_rc.restart()
             # Refresh panel regardless
             await rclone_panel_cb(client, cb)
         except Exception:
@@ -91,23 +95,14 @@ async def rclone_delete_cb(client, cb:CallbackQuery):
 @Client.on_callback_query(filters.regex(pattern=r"^rcloneListRemotes"))
 async def rclone_list_remotes_cb(client, cb:CallbackQuery):
     if await check_user(cb.from_user.id, restricted=True):
-        import asyncio
         import os
         if not os.path.exists('rclone.conf'):
             return await edit_message(cb.message, "rclone.conf not found.", markup=rclone_buttons())
-        # Run rclone listremotes using our config
         try:
-            proc = await asyncio.create_subprocess_shell(
-                'rclone listremotes --config ./rclone.conf | cat',
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            out, err = await proc.communicate()
-            if proc.returncode == 0:
-                remotes = out.decode().strip() or "(no remotes)"
-                await edit_message(cb.message, f"Available remotes:\n<code>{remotes}</code>", markup=rclone_buttons())
-            else:
-                await edit_message(cb.message, f"Failed to list remotes:\n<code>{err.decode().strip()}</code>", markup=rclone_buttons())
+            remotes = "\n".join(f"{r}:" for r in await rclone_rc.list_remotes()) or "(no remotes)"
+            await edit_message(cb.message, f"Available remotes:\n<code>{remotes}</code>", markup=rclone_buttons())
+        except RcloneRCError as e:
+            await edit_message(cb.message, f"Failed to list remotes:\n<code>{e}</code>", markup=rclone_buttons())
         except Exception as e:
             await edit_message(cb.message, f"Error: {e}", markup=rclone_buttons())
 
@@ -126,19 +121,14 @@ async def rclone_send_cb(client, cb:CallbackQuery):
 @Client.on_callback_query(filters.regex(pattern=r"^rcloneSelectRemote"))
 async def rclone_select_remote_cb(client, cb:CallbackQuery):
     if await check_user(cb.from_user.id, restricted=True):
-        import asyncio, os
+        import os
         if not os.path.exists('rclone.conf'):
             return await edit_message(cb.message, "rclone.conf not found.", markup=rclone_buttons())
         try:
-            proc = await asyncio.create_subprocess_shell(
-                'rclone listremotes --config ./rclone.conf | cat',
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            out, err = await proc.communicate()
-            if proc.returncode != 0:
-                return await edit_message(cb.message, f"Failed to list remotes:\n<code>{err.decode().strip()}</code>", markup=rclone_buttons())
-            remotes = [r.strip(':') for r in out.decode().splitlines() if r.strip()]
+            try:
+                remotes = await rclone_rc.list_remotes()
+            except RcloneRCError as e:
+                return await edit_message(cb.message, f"Failed to list remotes:\n<code>{e}</code>", markup=rclone_buttons())
             if not remotes:
                 return await edit_message(cb.message, "No remotes configured.", markup=rclone_buttons())
             # Build buttons for each remote
@@ -217,43 +207,11 @@ async def handle_dest_path_text(client, message: Message):
 
 # --- Browse-based destination path selection ---
 
-def _get_rclone_config_arg() -> str:
-    import os
-    from config import Config
-    try:
-        if getattr(Config, "RCLONE_CONFIG", None) and os.path.exists(Config.RCLONE_CONFIG):
-            return f'--config "{Config.RCLONE_CONFIG}"'
-    except Exception:
-        pass
-    for p in ("/workspace/rclone.conf", "rclone.conf"):
-        try:
-            if os.path.exists(p):
-                return f'--config "{p}"'
-        except Exception:
-            continue
-    return ""
-
 async def _list_remote_dirs(remote: str, path: str) -> list:
-    import asyncio
     remote = (remote or "").rstrip(":")
     norm_path = (path or "").strip("/")
-    base = f"{remote}:" if norm_path == "" else f"{remote}:{norm_path}/"
-    cfg = _get_rclone_config_arg()
-    cmd = f'rclone lsf --dirs-only {cfg} "{base}"'
-    proc = await asyncio.create_subprocess_shell(
-        cmd,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE
-    )
-    out, err = await proc.communicate()
-    if proc.returncode != 0:
-        raise RuntimeError(err.decode().strip() or 'lsf failed')
-    names = []
-    for line in out.decode().splitlines():
-        name = line.strip().rstrip("/")
-        if name:
-            names.append(name)
-    return names
+    entries = await rclone_rc.list_cached(f"{remote}:{norm_path}", dirsOnly=True, noModTime=True, noMimeType=True)
+    return [e['Name'] for e in entries if e.get('Name')]
 
 async def _render_browse(client, cb_or_msg, path: str):
     # Ensure remote exists
@@ -672,15 +630,10 @@ async def rclone_cloud_copy_start_cb(client, cb:CallbackQuery):
             return await edit_message(cb.message, "rclone.conf not found.", markup=rclone_buttons())
         # List remotes to start picking source
         try:
-            proc = await asyncio.create_subprocess_shell(
-                'rclone listremotes --config ./rclone.conf | cat',
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            out, err = await proc.communicate()
-            if proc.returncode != 0:
-                return await edit_message(cb.message, f"Failed to list remotes:\n<code>{err.decode().strip()}</code>", markup=rclone_buttons())
-            remotes = [r.strip(':') for r in out.decode().splitlines() if r.strip()]
+            try:
+                remotes = await rclone_rc.list_remotes()
+            except RcloneRCError as e:
+                return await edit_message(cb.message, f"Failed to list remotes:\n<code>{e}</code>", markup=rclone_buttons())
             if not remotes:
                 return await edit_message(cb.message, "No remotes configured.", markup=rclone_buttons())
             from ..helpers.state import conversation_state
@@ -709,34 +662,12 @@ async def rclone_cc_pick_src_remote(client, cb:CallbackQuery):
         await _rclone_cc_render_browse(client, cb, which='src', include_files=True)
 
 async def _rclone_cc_list(remote: str, path: str, include_files: bool):
-    import asyncio
-    # Directories
-    cfg = _get_rclone_config_arg()
-    base = f"{remote}:{path.strip('/')}/" if path else f"{remote}:"
-    cmd_dirs = f'rclone lsf --dirs-only {cfg} "{base}"'
-    proc = await asyncio.create_subprocess_shell(
-        cmd_dirs,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE
-    )
-    out_d, err_d = await proc.communicate()
-    if proc.returncode != 0:
-        raise RuntimeError(err_d.decode().strip() or 'lsf dirs failed')
-    dirs = [line.strip().rstrip('/') for line in out_d.decode().splitlines() if line.strip()]
-    files = []
-    if include_files:
-        cmd_files = f'rclone lsf --files-only {cfg} "{base}"'
-        p2 = await asyncio.create_subprocess_shell(
-            cmd_files,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        out_f, err_f = await p2.communicate()
-        if p2.returncode != 0:
-            # If file listing fails, keep dirs at least
-            files = []
-        else:
-            files = [line.strip() for line in out_f.decode().splitlines() if line.strip()]
+    # One listing gives both folders and files
+    base = f"{remote}:{path.strip('/')}" if path else f"{remote}:"
+    opt = {} if include_files else {'dirsOnly': True}
+    entries = await rclone_rc.list_cached(base, noModTime=True, noMimeType=True, **opt)
+    dirs = [e['Name'] for e in entries if e.get('IsDir')]
+    files = [e['Name'] for e in entries if not e.get('IsDir')]
     return dirs, files
 
 async def _rclone_cc_render_browse(client, cb_or_msg, which: str, include_files: bool):
@@ -896,15 +827,10 @@ async def rclone_cc_select_folder_cb(client, cb:CallbackQuery):
 async def _rclone_cc_pick_destination_remote(client, cb:CallbackQuery):
     # List remotes again for destination
     try:
-        proc = await asyncio.create_subprocess_shell(
-            'rclone listremotes --config ./rclone.conf | cat',
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        out, err = await proc.communicate()
-        if proc.returncode != 0:
-            return await edit_message(cb.message, f"Failed to list remotes:\n<code>{err.decode().strip()}</code>", markup=rclone_buttons())
-        remotes = [r.strip(':') for r in out.decode().splitlines() if r.strip()]
+        try:
+            remotes = await rclone_rc.list_remotes()
+        except RcloneRCError as e:
+            return await edit_message(cb.message, f"Failed to list remotes:\n<code>{e}</code>", markup=rclone_buttons())
         if not remotes:
             return await edit_message(cb.message, "No remotes configured.", markup=rclone_buttons())
         from ..helpers.state import conversation_state
@@ -925,13 +851,10 @@ async def rclone_cc_pick_dst_remote(client, cb:CallbackQuery):
         except Exception:
             idx = -1
         # Re-list remotes to map index
-        proc = await asyncio.create_subprocess_shell(
-            'rclone listremotes --config ./rclone.conf | cat',
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        out, _ = await proc.communicate()
-        remotes = [r.strip(':') for r in out.decode().splitlines() if r.strip()]
+        try:
+            remotes = await rclone_rc.list_remotes()
+        except RcloneRCError:
+            remotes = []
         if idx < 0 or idx >= len(remotes):
             return await _rclone_cc_pick_destination_remote(client, cb)
         dst_remote = remotes[idx]
@@ -989,7 +912,6 @@ async def rclone_cc_do_copy(client, cb:CallbackQuery):
         src_remote = data.get('src_remote')
         dst_remote = data.get('dst_remote')
         dst_path = data.get('dst_path', '')
-        cfg = _get_rclone_config_arg()
         # Build list of sources
         srcs = []
         types = {}
@@ -1020,19 +942,11 @@ async def rclone_cc_do_copy(client, cb:CallbackQuery):
             is_dir = (types.get(s) == 'dir')
             base_name = s.strip('/').split('/')[-1] if s else ''
             dst_specific = dst_full_base.rstrip('/') + (f"/{base_name}" if is_dir and base_name else '')
-            proc = await asyncio.create_subprocess_shell(
-                f'rclone {cmd} {cfg} "{src_remote}:{s}" "{dst_specific}"',
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            out, err = await proc.communicate()
-            if proc.returncode == 0:
+            try:
+                await rclone_rc.transfer(f"{src_remote}:{s}", dst_specific, is_dir, move=(cmd == 'move'))
                 successes += 1
-            else:
-                try:
-                    failures.append(f"{base_name or s}: {(err.decode().strip() or out.decode().strip())}")
-                except Exception:
-                    failures.append(f"{base_name or s}: failed")
+            except RcloneRCError as e:
+                failures.append(f"{base_name or s}: {e}")
         if failures:
             fail_text = "\n".join([f"• <code>{f}</code>" for f in failures[:5]])
             more = f"\n(and {len(failures)-5} more)" if len(failures) > 5 else ""
@@ -1040,23 +954,6 @@ async def rclone_cc_do_copy(client, cb:CallbackQuery):
         else:
             await edit_message(cb.message, f"✅ {cmd.capitalize()} completed for {successes} item(s).", rclone_buttons())
 
-# Reuse existing helper to get rclone config arg
-def _get_rclone_config_arg() -> str:
-    import os
-    from config import Config
-    try:
-        if getattr(Config, "RCLONE_CONFIG", None) and os.path.exists(Config.RCLONE_CONFIG):
-            return f'--config "{Config.RCLONE_CONFIG}"'
-    except Exception:
-        pass
-    for p in ("/workspace/rclone.conf", "rclone.conf"):
-        try:
-            if os.path.exists(p):
-                return f'--config "{p}"'
-        except Exception:
-            continue
-    return ""
-
 @Client.on_callback_query(filters.regex(pattern=r"^rcloneCcPage\|"))
 async def rclone_cc_page_cb(client, cb:CallbackQuery):
     if await check_user(cb.from_user.id, restricted=True):
@@ -1168,7 +1065,6 @@ async def rclone_cc_do_copy(client, cb:CallbackQuery):
         src_remote = data.get('src_remote')
         dst_remote = data.get('dst_remote')
         dst_path = data.get('dst_path', '')
-        cfg = _get_rclone_config_arg()
         # Build list of sources
         srcs = []
         types = {}
@@ -1199,19 +1095,11 @@ async def rclone_cc_do_copy(client, cb:CallbackQuery):
             is_dir = (types.get(s) == 'dir')
             base_name = s.strip('/').split('/')[-1] if s else ''
             dst_specific = dst_full_base.rstrip('/') + (f"/{base_name}" if is_dir and base_name else '')
-            proc = await asyncio.create_subprocess_shell(
-                f'rclone {cmd} {cfg} "{src_remote}:{s}" "{dst_specific}"',
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            out, err = await proc.communicate()
-            if proc.returncode == 0:
+            try:
+                await rclone_rc.transfer(f"{src_remote}:{s}", dst_specific, is_dir, move=(cmd == 'move'))
                 successes += 1
-            else:
-                try:
-                    failures.append(f"{base_name or s}: {(err.decode().strip() or out.decode().strip())}")
-                except Exception:
-                    failures.append(f"{base_name or s}: failed")
+            except RcloneRCError as e:
+                failures.append(f"{base_name or s}: {e}")
         if failures:
             fail_text = "\n".join([f"• <code>{f}</code>" for f in failures[:5]])
             more = f"\n(and {len(failures)-5} more)" if len(failures) > 5 else ""
@@ -1226,15 +1114,10 @@ async def rclone_cloud_move_start_cb(client, cb:CallbackQuery):
         if not os.path.exists('rclone.conf'):
             return await edit_message(cb.message, "rclone.conf not found.", markup=rclone_buttons())
         try:
-            proc = await asyncio.create_subprocess_shell(
-                'rclone listremotes --config ./rclone.conf | cat',
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            out, err = await proc.communicate()
-            if proc.returncode != 0:
-                return await edit_message(cb.message, f"Failed to list remotes:\n<code>{err.decode().strip()}</code>", markup=rclone_buttons())
-            remotes = [r.strip(':') for r in out.decode().splitlines() if r.strip()]
+            try:
+                remotes = await rclone_rc.list_remotes()
+            except RcloneRCError as e:
+                return await edit_message(cb.message, f"Failed to list remotes:\n<code>{e}</code>", markup=rclone_buttons())
             if not remotes:
                 return await edit_message(cb.message, "No remotes configured.", markup=rclone_buttons())
             from ..helpers.state import conversation_state
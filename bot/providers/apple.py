@@ -15,6 +15,7 @@ from bot.helpers.utils import (
 )
 from bot.helpers.uploader import track_upload, album_upload, music_video_upload, artist_upload, playlist_upload
 from bot.helpers.database.pg_impl import download_history
+from bot.helpers.tasks import task_manager
 from config import Config
 from bot.logger import LOGGER
 
@@ -235,6 +236,7 @@ async def start_apple(link: str, user: dict, options: dict = None):
         raise
     except Exception as e:
         logger.error(f"Apple Music error: {str(e)}", exc_info=True)
+        task_manager.mark_failed(user)
         try:
             await user.get('progress', None).set_stage("Done")
         except Exception:
@@ -1,6 +1,8 @@
 import os
 import json
+import time
 import base64
+import asyncio
 import requests
 import subprocess
 
@@ -46,6 +48,9 @@ class BotSettings:
         # Apple-only build: remove other providers
         self.deezer = False
         self.qobuz = False
+        self.tidal = None
+        # Provider login tasks, started in the background after boot or on first use
+        self._login_tasks = {}
         # Add this line to initialize can_enable_tidal
         self.can_enable_tidal = Config.ENABLE_TIDAL and Config.ENABLE_TIDAL.lower() == "true"
         # Runtime toggle for the legacy Tidal integration
@@ -208,6 +213,46 @@ class BotSettings:
             except Exception as e:
                 LOGGER.error(f"Apple Music downloader installation failed: {str(e)}")
 
+    def start_provider_logins(self):
+        """Start provider logins concurrently in the background (skipped when lazy)"""
+        if Config.LAZY_PROVIDER_LOGIN:
+            LOGGER.info("BOOT : Provider logins deferred until first use")
+            return
+        for provider in ('qobuz', 'deezer', 'tidal'):
+            self._get_login_task(provider)
+
+    async def ensure_provider(self, provider):
+        """Wait for a provider login, starting it now if it was not started at boot"""
+        if provider not in ('qobuz', 'deezer', 'tidal'):
+            return None
+        # shield so a cancelled download doesn't cancel the shared login
+        await asyncio.shield(self._get_login_task(provider))
+        return getattr(self, provider)
+
+    def _get_login_task(self, provider):
+        task = self._login_tasks.get(provider)
+        if task is None:
+            login = getattr(self, f'login_{provider}')
+            task = asyncio.get_running_loop().create_task(self._timed_login(provider, login))
+            self._login_tasks[provider] = task
+        return task
+
+    async def _timed_login(self, provider, login):
+        start = time.monotonic()
+        try:
+            await login()
+        except Exception as e:
+            LOGGER.error(f"{provider.upper()} : Login failed: {str(e)}")
+        LOGGER.info(f"BOOT : {provider} login finished in {time.monotonic() - start:.2f}s")
+
+    async def cancel_provider_logins(self):
+        """Cancel logins still in flight (used on shutdown)"""
+        pending = [t for t in self._login_tasks.values() if not t.done()]
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
     # Apple-only build: remove other providers' login flows
     async def login_qobuz(self):
         """Initialize Qobuz client"""
@@ -296,4 +341,6 @@ class BotSettings:
                 lang.s = item
                 break
 
+_settings_start = time.monotonic()
 bot_set = BotSettings()
+LOGGER.info(f"BOOT : Settings loaded in {time.monotonic() - _settings_start:.2f}s")
@@ -3,6 +3,7 @@ from pyrogram import Client
 from .logger import LOGGER
 from .settings import bot_set
 import subprocess
+import time
 import os
 
 # Explicitly import all modules to ensure handlers are registered
@@ -13,6 +14,7 @@ from .modules import (
     file_manager_callbacks,
     help,
     history,
+    media_cache,
     provider_settings,
     settings,
     start,
@@ -40,15 +42,19 @@ class Bot(Client):
         )
 
     async def start(self):
+        boot_start = time.monotonic()
         await super().start()
-        await bot_set.login_qobuz()
-        await bot_set.login_deezer()
-        await bot_set.login_tidal()
+        LOGGER.info(f"BOOT : Telegram client started in {time.monotonic() - boot_start:.2f}s")
+
+        # Provider logins run concurrently in the background; handlers wait on them when needed
+        bot_set.start_provider_logins()
         
         # Initialize Apple Music downloader
+        phase_start = time.monotonic()
         if not os.path.exists(Config.DOWNLOADER_PATH):
             LOGGER.error("Apple Music downloader not found! Running installer...")
             subprocess.run([Config.INSTALLER_PATH], check=True)
+        LOGGER.info(f"BOOT : Apple Music downloader check took {time.monotonic() - phase_start:.2f}s")
         
         # Queue worker: start only if Queue Mode is enabled
         try:
@@ -58,9 +64,32 @@ class Bot(Client):
         except Exception:
             pass
 
-        LOGGER.info("BOT : Started Successfully with Apple Music support")
+        # Downloads queued or running when the bot stopped
+        try:
+            await download.resume_jobs()
+        except Exception as e:
+            LOGGER.error(f"Resuming the task queue failed: {e}")
+
+        if Config.METRICS_PORT:
+            from .helpers.metrics import registry
+            await registry.start_server(Config.METRICS_HOST, Config.METRICS_PORT)
+
+        # rclone rcd; started lazily on first use if rclone.conf shows up later
+        if bot_set.rclone:
+            from .helpers.uploader_utils.rclone.rc import rclone_rc
+            from .helpers.uploader_utils.rclone.transfer import prepare_sa_configs
+            await rclone_rc.start()
+            await prepare_sa_configs()
+
+        LOGGER.info(f"BOT : Started Successfully with Apple Music support ({time.monotonic() - boot_start:.2f}s)")
 
     async def stop(self, *args):
+        await bot_set.cancel_provider_logins()
+        if Config.METRICS_PORT:
+            from .helpers.metrics import registry
+            await registry.stop_server()
+        from .helpers.uploader_utils.rclone.rc import rclone_rc
+        await rclone_rc.stop()
         await super().stop()
         for client in bot_set.clients:
             await client.session.close()
@@ -52,6 +52,8 @@ class Config:
     # GDrive Configuration
     GDRIVE_ID         = getenv("GDRIVE_ID")                                # GDrive folder ID
     IS_TEAM_DRIVE     = getenv("IS_TEAM_DRIVE", "False").lower() == "true" # True or False
+    GDRIVE_UPLOAD_WORKERS = int(getenv("GDRIVE_UPLOAD_WORKERS", 4))       # Files of a folder uploaded to GDrive at once
+    GDRIVE_CLONE_WORKERS = int(getenv("GDRIVE_CLONE_WORKERS", 8))         # Folders listed / copy batches sent at once by clone and count
     USE_SERVICE_ACCOUNTS = getenv("USE_SERVICE_ACCOUNTS", "False").lower() == "true" # True or False
     STOP_DUPLICATE    = getenv("STOP_DUPLICATE", "False").lower() == "true" # True or False
     INDEX_URL         = getenv("INDEX_URL")                                # Optional index base URL
@@ -64,6 +66,10 @@ class Config:
     RCLONE_SERVE_PORT = int(getenv("RCLONE_SERVE_PORT", 8080))             # Port for rclone serve
     RCLONE_SERVE_USER = getenv("RCLONE_SERVE_USER")                        # Username for rclone serve
     RCLONE_SERVE_PASS = getenv("RCLONE_SERVE_PASS")                        # Password for rclone serve
+    RCLONE_RC_PORT    = int(getenv("RCLONE_RC_PORT", 0))                   # Local port for the managed rclone rcd (0 = pick a free port)
+    RCLONE_TRANSFERS  = int(getenv("RCLONE_TRANSFERS", 4))                 # Parallel file transfers per album/playlist upload
+    RCLONE_LIST_CACHE_TTL = int(getenv("RCLONE_LIST_CACHE_TTL", 300))      # Seconds to keep remote browser listings (0 = disabled)
+    RCLONE_DRIVE_MAX_TPS = int(getenv("RCLONE_DRIVE_MAX_TPS", 10))         # Ceiling for the adaptive Google Drive transactions/sec (1 = fixed tps 1, 1 transfer)
 
     # Qobuz Configuration
     QOBUZ_EMAIL       = getenv("QOBUZ_EMAIL")                              # User email (string)
@@ -96,6 +102,35 @@ class Config:
 
     # Concurrent Workers
     MAX_WORKERS      = int(getenv("MAX_WORKERS", 5))                       # Number of threads (int)
+    DISK_IO_WORKERS  = int(getenv("DISK_IO_WORKERS", 0))                   # Threads for file system work (0 = 4 x CPUs, max 32)
+    CPU_WORKERS      = int(getenv("CPU_WORKERS", 0))                       # Threads for zipping and other CPU-heavy work (0 = CPUs)
+    NETWORK_WORKERS  = int(getenv("NETWORK_WORKERS", 16))                  # Threads for blocking network SDKs (Google Drive)
+
+    # Disk Space
+    DISK_ADMISSION   = getenv("DISK_ADMISSION", "True").lower() == "true"  # Reserve disk space before a download starts
+    DISK_FREE_MARGIN = int(getenv("DISK_FREE_MARGIN", 1024))               # MB always kept free in LOCAL_STORAGE
+
+    # Task Queue
+    TASK_MAX_ATTEMPTS = int(getenv("TASK_MAX_ATTEMPTS", 3))               # Restarts a download may be interrupted by before it is dropped
+
+    # Logging
+    LOG_LEVEL         = getenv("LOG_LEVEL", "DEBUG").upper()              # Level written to bot_logs.log
+    CONSOLE_LOG_LEVEL = getenv("CONSOLE_LOG_LEVEL", "INFO").upper()       # Level written to the console
+    LOG_MAX_BYTES     = int(getenv("LOG_MAX_BYTES", 10 * 1024 * 1024))    # Rotate bot_logs.log at this size (bytes)
+    LOG_BACKUP_COUNT  = int(getenv("LOG_BACKUP_COUNT", 3))                # Rotated log files to keep
+    LOG_DEBUG_BURST   = int(getenv("LOG_DEBUG_BURST", 5))                 # DEBUG lines per call site per window (0 = unlimited)
+    LOG_DEBUG_WINDOW  = float(getenv("LOG_DEBUG_WINDOW", 10))             # Rate-limit window for DEBUG lines (seconds)
+
+    # Media Cache (re-send previously uploaded content by Telegram file_id / links)
+    MEDIA_CACHE_TTL   = int(getenv("MEDIA_CACHE_TTL", 168))                # Hours to keep cache entries (0 = disabled)
+
+    # Metrics (Prometheus text format served at /metrics)
+    METRICS_HOST      = getenv("METRICS_HOST", "127.0.0.1")                # Interface the metrics endpoint binds to
+    METRICS_PORT      = int(getenv("METRICS_PORT", 0))                     # Port for the metrics endpoint (0 = disabled)
+
+    # Provider Sessions
+    LAZY_PROVIDER_LOGIN = getenv("LAZY_PROVIDER_LOGIN", "False").lower() == "true"
+                                                                            # True: skip boot logins, log in on first use
 
     # Apple Music Configuration
     DOWNLOADER_PATH   = getenv("DOWNLOADER_PATH", "/usr/src/app/downloader/am_downloader.sh")  
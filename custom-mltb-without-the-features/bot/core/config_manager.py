@@ -12,6 +12,8 @@ class Config:
     CMD_SUFFIX = ""
     DATABASE_URL = ""
     DEFAULT_UPLOAD = "rc"
+    DIRECT_CONNECTIONS = 8
+    DIRECT_LINK_CACHE_TTL = 600
     EQUAL_SPLITS = False
     EXCLUDED_EXTENSIONS = ""
     FFMPEG_CMDS = {}
@@ -23,12 +25,15 @@ class Config:
     LEECH_DUMP_CHAT = ""
     LEECH_FILENAME_PREFIX = ""
     LEECH_SPLIT_SIZE = 2097152000
+    LEECH_UPLOAD_WORKERS = 3
     MEDIA_GROUP = False
     HYBRID_LEECH = False
     NAME_SUBSTITUTE = ""
     OWNER_ID = 0
+    QUEUE_AGING = 300
     QUEUE_ALL = 0
     QUEUE_DOWNLOAD = 0
+    QUEUE_PROCESS = 0
     QUEUE_UPLOAD = 0
     RCLONE_FLAGS = ""
     RCLONE_PATH = ""
@@ -41,6 +46,7 @@ class Config:
     RSS_SIZE_LIMIT = 0
     SEARCH_API_LINK = ""
     SEARCH_LIMIT = 0
+    SEVENZ_THREADS = 0
     STATUS_LIMIT = 4
     STATUS_UPDATE_INTERVAL = 15
     STOP_DUPLICATE = False
@@ -56,6 +62,7 @@ class Config:
     USER_SESSION_STRING = ""
     USER_TRANSMISSION = False
     USE_SERVICE_ACCOUNTS = False
+    ZIP_LEVEL = 0
 
     @classmethod
     def _convert(cls, key: str, value):
@@ -1,10 +1,26 @@
 from pyrogram import Client, enums
 from asyncio import Lock
+from contextvars import ContextVar
 
 from .. import LOGGER
 from .config_manager import Config
 
 
+# {path: (client, upload task)} of the files a leech task uploaded ahead of
+# their message, set by that task around its send calls only
+preuploads = ContextVar("preuploads", default=None)
+
+
+class _Client(Client):
+    async def save_file(self, path, file_id=None, *args, **kwargs):
+        """Hand a send call the finished upload of its file instead of uploading again"""
+        if file_id is None and isinstance(path, str) and (cache := preuploads.get()):
+            if (entry := cache.get(path)) is not None and entry[0] is self:
+                del cache[path]
+                return await entry[1]
+        return await super().save_file(path, file_id, *args, **kwargs)
+
+
 class TgClient:
     _lock = Lock()
     bot = None
@@ -18,7 +34,7 @@ class TgClient:
     async def start_bot(cls):
         LOGGER.info("Creating client from BOT_TOKEN")
         cls.ID = Config.BOT_TOKEN.split(":", 1)[0]
-        cls.bot = Client(
+        cls.bot = _Client(
             cls.ID,
             Config.TELEGRAM_API,
             Config.TELEGRAM_HASH,
@@ -36,7 +52,7 @@ class TgClient:
         if Config.USER_SESSION_STRING:
             LOGGER.info("Creating client from USER_SESSION_STRING")
             try:
-                cls.user = Client(
+                cls.user = _Client(
                     "user",
                     Config.TELEGRAM_API,
                     Config.TELEGRAM_HASH,
@@ -3,6 +3,7 @@ from asyncio import create_subprocess_exec, sleep, wait_for
 from asyncio.subprocess import PIPE
 from magic import Magic
 from os import walk, path as ospath, readlink
+from psutil import cpu_percent
 from re import split as re_split, I, search as re_search, escape
 from aiofiles.os import (
     remove,
@@ -14,7 +15,8 @@ from aiofiles.os import (
     makedirs as aiomakedirs,
 )
 
-from ... import LOGGER, DOWNLOAD_DIR
+from ... import LOGGER, DOWNLOAD_DIR, cpu_no
+from ...core.config_manager import Config
 from ...core.torrent_manager import TorrentManager
 from .bot_utils import sync_to_async, cmd_exec
 from .exceptions import NotSupportedExtractionArchive
@@ -293,6 +295,70 @@ async def split_file(f_path, split_size, listener):
     return True
 
 
+# Formats that don't shrink any further, zipped in store mode whatever ZIP_LEVEL is
+COMPRESSED_EXT = {
+    ".mkv",
+    ".mp4",
+    ".m4v",
+    ".webm",
+    ".avi",
+    ".mov",
+    ".wmv",
+    ".flv",
+    ".ts",
+    ".mp3",
+    ".m4a",
+    ".aac",
+    ".opus",
+    ".ogg",
+    ".flac",
+    ".wma",
+    ".jpg",
+    ".jpeg",
+    ".png",
+    ".webp",
+    ".gif",
+    ".heic",
+    ".zip",
+    ".7z",
+    ".rar",
+    ".gz",
+    ".bz2",
+    ".xz",
+    ".zst",
+    ".apk",
+    ".epub",
+    ".pdf",
+}
+
+
+def sevenz_threads():
+    """-mmt value: SEVENZ_THREADS, or the cores the current load leaves idle"""
+    if Config.SEVENZ_THREADS:
+        return Config.SEVENZ_THREADS
+    return max(1, int(cpu_no * (100 - cpu_percent()) / 100))
+
+
+def zip_level(path):
+    """ZIP_LEVEL, or store mode when most of the bytes are already compressed media"""
+    if not Config.ZIP_LEVEL:
+        return 0
+    if ospath.isfile(path):
+        files = [path]
+    else:
+        files = [ospath.join(root, f) for root, _, names in walk(path) for f in names]
+    compressed = total = 0
+    for f_path in files:
+        try:
+            size = ospath.getsize(f_path)
+        except OSError:
+            continue
+        total += size
+        if ospath.splitext(f_path)[1].lower() in COMPRESSED_EXT:
+            compressed += size
+    return 0 if total and compressed / total >= 0.8 else Config.ZIP_LEVEL
+
+
 class SevenZ:
     def __init__(self, listener):
         self._listener = listener
@@ -359,6 +425,7 @@ class SevenZ:
             f"-o{t_path}",
             "-aot",
             "-xr!@PaxHeader",
+            f"-mmt{sevenz_threads()}",
             "-bsp1",
             "-bse1",
             "-bb3",
@@ -395,14 +462,16 @@ class SevenZ:
             split_size = (size // parts) + (size % parts)
         else:
             split_size = self._listener.split_size
+        level = await sync_to_async(zip_level, dl_path)
         cmd = [
             "7z",
             f"-v{split_size}b",
             "a",
-            "-mx=0",
+            f"-mx={level}",
             f"-p{pswd}",
             up_path,
             dl_path,
+            f"-mmt{sevenz_threads()}",
             "-bsp1",
             "-bse1",
             "-bb3",
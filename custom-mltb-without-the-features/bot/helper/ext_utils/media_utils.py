@@ -14,7 +14,7 @@ from aioshutil import rmtree
 
 from ... import LOGGER, cpu_no, DOWNLOAD_DIR
 from .bot_utils import cmd_exec, sync_to_async
-from .files_utils import get_mime_type, is_archive, is_archive_split
+from .files_utils import get_mime_type, is_archive, is_archive_split, split_file
 from .status_utils import time_to_seconds
 
 
@@ -629,16 +629,48 @@ class FFMpeg:
                 await remove(output_file)
             return False
 
+    @staticmethod
+    def _split_boundaries(duration, f_size, split_size):
+        """Cut points every split_size bytes at the average bitrate, the muxer moves each to the next keyframe"""
+        step = duration * split_size / f_size
+        boundaries = []
+        point = step
+        # A tail of a few seconds goes with the previous part
+        while point < duration - 4:
+            boundaries.append(round(point, 3))
+            point += step
+        return boundaries
+
+    async def _split_parts(self, f_path, file_):
+        base_name, extension = ospath.splitext(file_)
+        parts = []
+        while await aiopath.exists(
+            out_path := f_path.replace(
+                file_, f"{base_name}.part{len(parts) + 1:03}{extension}"
+            )
+        ):
+            parts.append(out_path)
+        return parts
+
     async def split(self, f_path, file_, parts, split_size):
-        self.clear()
+        """One probe and one segment muxer run, oversized parts get more cut points and the run is repeated"""
+        duration = (await get_media_info(f_path))[0]
+        if not duration:
+            LOGGER.warning(
+                f"Unable to get the duration, if it's size less than {self._listener.max_split_size} will be uploaded as it is. Path: {f_path}"
+            )
+            return False
+        f_size = await aiopath.getsize(f_path)
         multi_streams = True
-        self._total_time = duration = (await get_media_info(f_path))[0]
         base_name, extension = ospath.splitext(file_)
-        split_size -= 3000000
-        start_time = 0
-        i = 1
-        while i <= parts or start_time < duration - 4:
-            out_path = f_path.replace(file_, f"{base_name}.part{i:03}{extension}")
+        out_pattern = f_path.replace(
+            file_, f"{base_name.replace('%', '%%')}.part%03d{extension}"
+        )
+        target = split_size - 3000000
+        boundaries = self._split_boundaries(duration, f_size, target)
+        for _ in range(4):
+            self.clear()
+            self._total_time = duration
             cmd = [
                 "ffmpeg",
                 "-hide_banner",
@@ -646,29 +678,31 @@ class FFMpeg:
                 "error",
                 "-progress",
                 "pipe:1",
-                "-ss",
-                str(start_time),
                 "-i",
                 f_path,
-                "-fs",
-                str(split_size),
                 "-map",
                 "0",
                 "-map_chapters",
                 "-1",
-                "-async",
-                "1",
                 "-strict",
                 "-2",
                 "-c",
                 "copy",
+                "-f",
+                "segment",
+                "-segment_times",
+                ",".join(map(str, boundaries)) or str(duration),
+                "-segment_start_number",
+                "1",
+                "-reset_timestamps",
+                "1",
                 "-threads",
                 f"{max(1, cpu_no // 2)}",
-                out_path,
+                out_pattern,
             ]
             if not multi_streams:
-                del cmd[12]
-                del cmd[12]
+                del cmd[8]
+                del cmd[8]
             if self._listener.is_cancelled:
                 return False
             self._listener.subproc = await create_subprocess_exec(
@@ -682,50 +716,58 @@ class FFMpeg:
             if code == -9:
                 self._listener.is_cancelled = True
                 return False
-            elif code != 0:
+            out_paths = await self._split_parts(f_path, file_)
+            if code != 0:
                 try:
                     stderr = stderr.decode().strip()
                 except:
                     stderr = "Unable to decode the error!"
-                try:
+                for out_path in out_paths:
                     await remove(out_path)
-                except:
-                    pass
                 if multi_streams:
                     LOGGER.warning(
                         f"{stderr}. Retrying without map, -map 0 not working in all situations. Path: {f_path}"
                     )
                     multi_streams = False
                     continue
-                else:
-                    LOGGER.warning(
-                        f"{stderr}. Unable to split this video, if it's size less than {self._listener.max_split_size} will be uploaded as it is. Path: {f_path}"
-                    )
-                return False
-            out_size = await aiopath.getsize(out_path)
-            if out_size > self._listener.max_split_size:
-                split_size -= (out_size - self._listener.max_split_size) + 5000000
                 LOGGER.warning(
-                    f"Part size is {out_size}. Trying again with lower split size!. Path: {f_path}"
+                    f"{stderr}. Unable to split this video, if it's size less than {self._listener.max_split_size} will be uploaded as it is. Path: {f_path}"
                 )
-                await remove(out_path)
-                continue
-            lpd = (await get_media_info(out_path))[0]
-            if lpd == 0:
+                return False
+            if not out_paths:
                 LOGGER.error(
                     f"Something went wrong while splitting, mostly file is corrupted. Path: {f_path}"
                 )
-                break
-            elif duration == lpd:
-                LOGGER.warning(
-                    f"This file has been splitted with default stream and audio, so you will only see one part with less size from orginal one because it doesn't have all streams and audios. This happens mostly with MKV videos. Path: {f_path}"
-                )
-                break
-            elif lpd <= 3:
+                return False
+            sizes = await gather(*[aiopath.getsize(out_path) for out_path in out_paths])
+            limit = self._listener.max_split_size
+            if all(size <= limit for size in sizes):
+                return True
+            LOGGER.warning(
+                f"Part size is {max(sizes)}. Splitting again with more parts!. Path: {f_path}"
+            )
+            for out_path in out_paths:
                 await remove(out_path)
-                break
-            self._last_processed_time += lpd
-            self._last_processed_bytes += out_size
-            start_time += lpd - 3
-            i += 1
-        return True
+            edges = [0, *boundaries, duration]
+            if len(sizes) == len(edges) - 1:
+                boundaries = []
+                for index, size in enumerate(sizes):
+                    start, end = edges[index], edges[index + 1]
+                    pieces = -(-size // (limit - 5000000))
+                    boundaries.extend(
+                        round(start + (end - start) * k / pieces, 3)
+                        for k in range(1, pieces)
+                    )
+                    boundaries.append(end)
+                boundaries.pop()
+            else:
+                # Cut points that shared a keyframe merged, scale them all down instead
+                target = int(target * limit / max(sizes) * 0.95)
+                boundaries = self._split_boundaries(duration, f_size, target)
+        # Keyframes too far apart for parts under the limit, split the bytes
+        # instead of losing the file
+        LOGGER.warning(
+            f"Unable to get video parts under {self._listener.max_split_size}, splitting it as a document. Path: {f_path}"
+        )
+        self._listener.progress = False
+        return await split_file(f_path, split_size, self._listener)
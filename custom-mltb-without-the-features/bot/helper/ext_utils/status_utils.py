@@ -1,13 +1,14 @@
 from html import escape
 from psutil import virtual_memory, cpu_percent, disk_usage
 from time import time
-from asyncio import iscoroutinefunction, gather
+from asyncio import Lock, iscoroutinefunction, gather
 
 from ... import task_dict, task_dict_lock, bot_start_time, status_dict, DOWNLOAD_DIR
 from ...core.config_manager import Config
 from ..telegram_helper.button_build import ButtonMaker
 
 SIZE_UNITS = ["B", "KB", "MB", "GB", "TB", "PB"]
+SNAPSHOT_MAX_AGE = 1
 
 
 class MirrorStatus:
@@ -156,77 +157,204 @@ def get_progress_bar_string(pct):
     return f"[{p_str}]"
 
 
-async def get_readable_message(sid, is_user, page_no=1, status="All", page_step=1):
+async def _task_status(task):
+    if iscoroutinefunction(task.status):
+        return await task.status()
+    return task.status()
+
+
+def _matches_status(st, status):
+    return st == status or (
+        status == MirrorStatus.STATUS_DOWNLOAD and st not in STATUSES.values()
+    )
+
+
+class StatusSnapshot:
+    """
+    The tasks and their statuses as of one tick, shared by every status
+    message and page. Details of a task are sampled the first time one of
+    the messages shows it and reused by the others.
+    """
+
+    # gid -> (sampled values, rendered text) of the last render of each task
+    _fragments = {}
+
+    def __init__(self, tasks):
+        self.time = time()
+        self.tasks = tasks
+        self._rendered = {}
+        self._stats = None
+
+    def system_stats(self):
+        if self._stats is None:
+            self._stats = f"<b>CPU:</b> {cpu_percent()}% | <b>FREE:</b> {get_readable_file_size(disk_usage(DOWNLOAD_DIR).free)}"
+            self._stats += f"\n<b>RAM:</b> {virtual_memory().percent}% | <b>UPTIME:</b> {get_readable_time(self.time - bot_start_time)}"
+        return self._stats
+
+    def select(self, status, user_id):
+        return [
+            (task, st)
+            for task, st in self.tasks
+            if (not user_id or task.listener.user_id == user_id)
+            and (status == "All" or _matches_status(st, status))
+        ]
+
+    def fragment(self, task, tstatus):
+        key = (id(task), tstatus)
+        if (text := self._rendered.get(key)) is None:
+            text = self._rendered[key] = self._render(task, tstatus)
+        return text
+
+    @classmethod
+    def _render(cls, task, tstatus):
+        values = _sample(task, tstatus)
+        gid = values[-1]
+        cached = cls._fragments.get(gid)
+        if cached is not None and cached[0] == values:
+            return cached[1]
+        text = _format(values)
+        cls._fragments[gid] = (values, text)
+        return text
+
+    def prune(self):
+        """Forget the fragments of tasks that are gone"""
+        gids = {task.gid() for task, _ in self.tasks}
+        for gid in [gid for gid in self._fragments if gid not in gids]:
+            del self._fragments[gid]
+
+
+_snapshot = None
+_snapshot_lock = Lock()
+
+
+async def get_snapshot(fresh=False):
+    """
+    Current snapshot, taken again once it is SNAPSHOT_MAX_AGE old. task_dict_lock
+    is only held to copy the task list, statuses are read after releasing it.
+    """
+    global _snapshot
+    async with _snapshot_lock:
+        if (
+            fresh
+            or _snapshot is None
+            or time() - _snapshot.time >= SNAPSHOT_MAX_AGE
+        ):
+            async with task_dict_lock:
+                tasks = list(task_dict.values())
+            statuses = await gather(*[_task_status(tk) for tk in tasks])
+            _snapshot = StatusSnapshot(list(zip(tasks, statuses)))
+            _snapshot.prune()
+        return _snapshot
+
+
+def _sample(task, tstatus):
+    """Everything one task shows in the status message, read once"""
+    listener = task.listener
+    link = listener.message.link if listener.is_super_chat else None
+    subname = listener.subname
+    details = ()
+    if (
+        tstatus not in [MirrorStatus.STATUS_SEED, MirrorStatus.STATUS_QUEUEUP]
+        and listener.progress
+    ):
+        if subname:
+            subsize = f"/{get_readable_file_size(listener.subsize)}"
+            ac = len(listener.files_to_proceed)
+            count = f"{listener.proceed_count}/{ac or '?'}"
+        else:
+            subsize = ""
+            count = ""
+        peers = ""
+        if (
+            tstatus == MirrorStatus.STATUS_DOWNLOAD
+            and listener.is_torrent
+            or listener.is_qbit
+        ):
+            try:
+                peers = f"\n<b>Seeders:</b> {task.seeders_num()} | <b>Leechers:</b> {task.leechers_num()}"
+            except:
+                pass
+        details = (
+            "progress",
+            task.progress(),
+            f"{task.processed_bytes()}{subsize}",
+            count,
+            task.size(),
+            task.speed(),
+            task.eta(),
+            peers,
+        )
+    elif tstatus == MirrorStatus.STATUS_SEED:
+        details = (
+            "seed",
+            task.size(),
+            task.seed_speed(),
+            task.uploaded_bytes(),
+            task.ratio(),
+            task.seeding_time(),
+        )
+    else:
+        details = ("size", task.size())
+    return (tstatus, link, task.name(), subname, details, task.gid())
+
+
+def _format(values):
+    tstatus, link, name, subname, details, gid = values
+    if link:
+        msg = f"<a href='{link}'>{tstatus}</a>: </b>"
+    else:
+        msg = f"{tstatus}: </b>"
+    msg += f"<code>{escape(f'{name}')}</code>"
+    if subname:
+        msg += f"\n<i>{subname}</i>"
+    if details[0] == "progress":
+        _, progress, processed, count, size, speed, eta, peers = details
+        msg += f"\n{get_progress_bar_string(progress)} {progress}"
+        msg += f"\n<b>Processed:</b> {processed}"
+        if count:
+            msg += f"\n<b>Count:</b> {count}"
+        msg += f"\n<b>Size:</b> {size}"
+        msg += f"\n<b>Speed:</b> {speed}"
+        msg += f"\n<b>ETA:</b> {eta}"
+        msg += peers
+    elif details[0] == "seed":
+        _, size, speed, uploaded, ratio, seeding_time = details
+        msg += f"\n<b>Size: </b>{size}"
+        msg += f"\n<b>Speed: </b>{speed}"
+        msg += f"\n<b>Uploaded: </b>{uploaded}"
+        msg += f"\n<b>Ratio: </b>{ratio}"
+        msg += f" | <b>Time: </b>{seeding_time}"
+    else:
+        msg += f"\n<b>Size: </b>{details[1]}"
+    msg += f"\n<b>Gid: </b><code>{gid}</code>\n\n"
+    return msg
+
+
+async def get_readable_message(
+    sid, is_user, page_no=1, status="All", page_step=1, fresh=False
+):
     msg = ""
     button = None
 
-    tasks = await get_specific_tasks(status, sid if is_user else None)
+    snapshot = await get_snapshot(fresh)
+    tasks = snapshot.select(status, sid if is_user else None)
 
     STATUS_LIMIT = Config.STATUS_LIMIT
     tasks_no = len(tasks)
     pages = (max(tasks_no, 1) + STATUS_LIMIT - 1) // STATUS_LIMIT
     if page_no > pages:
         page_no = (page_no - 1) % pages + 1
-        status_dict[sid]["page_no"] = page_no
     elif page_no < 1:
         page_no = pages - (abs(page_no) % pages)
+    if sid in status_dict:
         status_dict[sid]["page_no"] = page_no
     start_position = (page_no - 1) * STATUS_LIMIT
 
-    for index, task in enumerate(
+    for index, (task, st) in enumerate(
         tasks[start_position : STATUS_LIMIT + start_position], start=1
     ):
-        if status != "All":
-            tstatus = status
-        elif iscoroutinefunction(task.status):
-            tstatus = await task.status()
-        else:
-            tstatus = task.status()
-        if task.listener.is_super_chat:
-            msg += f"<b>{index + start_position}.<a href='{task.listener.message.link}'>{tstatus}</a>: </b>"
-        else:
-            msg += f"<b>{index + start_position}.{tstatus}: </b>"
-        msg += f"<code>{escape(f'{task.name()}')}</code>"
-        if task.listener.subname:
-            msg += f"\n<i>{task.listener.subname}</i>"
-        if (
-            tstatus not in [MirrorStatus.STATUS_SEED, MirrorStatus.STATUS_QUEUEUP]
-            and task.listener.progress
-        ):
-            progress = task.progress()
-            msg += f"\n{get_progress_bar_string(progress)} {progress}"
-            if task.listener.subname:
-                subsize = f"/{get_readable_file_size(task.listener.subsize)}"
-                ac = len(task.listener.files_to_proceed)
-                count = f"{task.listener.proceed_count}/{ac or '?'}"
-            else:
-                subsize = ""
-                count = ""
-            msg += f"\n<b>Processed:</b> {task.processed_bytes()}{subsize}"
-            if count:
-                msg += f"\n<b>Count:</b> {count}"
-            msg += f"\n<b>Size:</b> {task.size()}"
-            msg += f"\n<b>Speed:</b> {task.speed()}"
-            msg += f"\n<b>ETA:</b> {task.eta()}"
-            if (
-                tstatus == MirrorStatus.STATUS_DOWNLOAD
-                and task.listener.is_torrent
-                or task.listener.is_qbit
-            ):
-                try:
-                    msg += f"\n<b>Seeders:</b> {task.seeders_num()} | <b>Leechers:</b> {task.leechers_num()}"
-                except:
-                    pass
-        elif tstatus == MirrorStatus.STATUS_SEED:
-            msg += f"\n<b>Size: </b>{task.size()}"
-            msg += f"\n<b>Speed: </b>{task.seed_speed()}"
-            msg += f"\n<b>Uploaded: </b>{task.uploaded_bytes()}"
-            msg += f"\n<b>Ratio: </b>{task.ratio()}"
-            msg += f" | <b>Time: </b>{task.seeding_time()}"
-        else:
-            msg += f"\n<b>Size: </b>{task.size()}"
-        msg += f"\n<b>Gid: </b><code>{task.gid()}</code>\n\n"
-
+        tstatus = status if status != "All" else st
+        msg += f"<b>{index + start_position}.{snapshot.fragment(task, tstatus)}"
     if len(msg) == 0:
         if status == "All":
             return None, None
@@ -248,6 +376,5 @@ async def get_readable_message(sid, is_user, page_no=1, status="All", page_step=
                 buttons.data_button(label, f"status {sid} st {status_value}")
     buttons.data_button("♻️", f"status {sid} ref", position="header")
     button = buttons.build_menu(8)
-    msg += f"<b>CPU:</b> {cpu_percent()}% | <b>FREE:</b> {get_readable_file_size(disk_usage(DOWNLOAD_DIR).free)}"
-    msg += f"\n<b>RAM:</b> {virtual_memory().percent}% | <b>UPTIME:</b> {get_readable_time(time() - bot_start_time)}"
+    msg += snapshot.system_stats()
     return msg, button
@@ -1,4 +1,9 @@
-from asyncio import Event
+from asyncio import Condition, Event
+from contextlib import asynccontextmanager
+from heapq import heappop, heappush
+from itertools import count
+from math import log2
+from time import monotonic
 
 from ... import (
     queued_dl,
@@ -6,10 +11,11 @@ from ... import (
     non_queued_up,
     non_queued_dl,
     queue_dict_lock,
+    task_dict,
     LOGGER,
 )
 from ...core.config_manager import Config
-from ..mirror_leech_utils.gdrive_utils.search import GoogleDriveSearch
+from ..mirror_leech_utils.gdrive_utils.search import duplicate_cache
 from .bot_utils import sync_to_async, get_telegraph_list
 from .files_utils import get_base_name
 from .links_utils import is_gdrive_id
@@ -38,10 +44,11 @@ async def stop_duplicate_check(listener):
 
     if name is not None:
         telegraph_content, contents_no = await sync_to_async(
-            GoogleDriveSearch(stop_dup=True, no_multi=listener.is_clone).drive_list,
+            duplicate_cache.check,
             name,
             listener.up_dest,
             listener.user_id,
+            listener.is_clone,
         )
         if telegraph_content:
             msg = f"File/Folder is already available in Drive.\nHere are {contents_no} list results:"
@@ -51,6 +58,90 @@ async def stop_duplicate_check(listener):
     return False, None
 
 
+# Queued mids ordered by start key, entries of mids no longer queued are skipped
+_queue_heaps = {"dl": [], "up": []}
+_queue_seq = count()
+
+_process_cond = Condition()
+_processing = 0
+
+
+def _priority_steps(listener):
+    """
+    How many QUEUE_AGING periods a task waits behind one queued at the same
+    time with no handicap: one per doubling of its size in GiB (unknown sizes
+    count as one), one per other task of the same user and one for leeches,
+    whose uploads hold a slot the longest.
+    """
+    if listener.size:
+        steps = log2(1 + listener.size / 1024**3)
+    else:
+        steps = 1
+    steps += sum(
+        1
+        for task in list(task_dict.values())
+        if task.listener.user_id == listener.user_id
+        and task.listener.mid != listener.mid
+    )
+    if listener.is_leech:
+        steps += 1
+    return steps
+
+
+def _enqueue(listener, state):
+    # Every queued task ages at the same rate, so the key stays fixed: a task
+    # that waited QUEUE_AGING seconds longer than another wins one step back
+    key = monotonic() + Config.QUEUE_AGING * _priority_steps(listener)
+    heappush(_queue_heaps[state], (key, next(_queue_seq), listener.mid))
+
+
+def _next_queued(state):
+    queue = queued_dl if state == "dl" else queued_up
+    heap = _queue_heaps[state]
+    while heap:
+        mid = heappop(heap)[2]
+        if mid in queue:
+            return mid
+    heap.clear()
+    # Queued without an entry (shouldn't happen), fall back to insertion order
+    return next(iter(queue), None)
+
+
+@asynccontextmanager
+async def process_slot(listener, heavy=True):
+    """
+    Held while a task extracts, compresses, splits or runs ffmpeg after its
+    download, at most QUEUE_PROCESS tasks at a time so the CPU bound steps
+    don't take turns with the bandwidth bound ones in the download and
+    upload slots.
+    """
+    global _processing
+    if not heavy or not Config.QUEUE_PROCESS or listener.force_run:
+        yield
+        return
+    async with _process_cond:
+        if _processing >= Config.QUEUE_PROCESS:
+            LOGGER.info(f"Waiting for a processing slot: {listener.name}")
+        await _process_cond.wait_for(
+            lambda: not Config.QUEUE_PROCESS
+            or _processing < Config.QUEUE_PROCESS
+            or listener.is_cancelled
+        )
+        _processing += 1
+    try:
+        yield
+    finally:
+        async with _process_cond:
+            _processing -= 1
+            _process_cond.notify_all()
+
+
+async def wake_process_waiters():
+    """Recheck the waiting tasks after a cancel or a QUEUE_PROCESS change"""
+    async with _process_cond:
+        _process_cond.notify_all()
+
+
 async def check_running_tasks(listener, state="dl"):
     all_limit = Config.QUEUE_ALL
     state_limit = Config.QUEUE_DOWNLOAD if state == "dl" else Config.QUEUE_UPLOAD
@@ -75,6 +166,7 @@ async def check_running_tasks(listener, state="dl"):
             ) or (state_limit and t_count >= state_limit)
             if is_over_limit:
                 event = Event()
+                _enqueue(listener, state)
                 if state == "dl":
                     queued_dl[listener.mid] = event
                 else:
@@ -111,14 +203,18 @@ async def start_from_queued():
             if all_ < all_limit:
                 f_tasks = all_limit - all_
                 if queued_up and (not up_limit or up < up_limit):
-                    for index, mid in enumerate(list(queued_up.keys()), start=1):
-                        await start_up_from_queued(mid)
+                    index = 0
+                    while queued_up:
+                        index += 1
+                        await start_up_from_queued(_next_queued("up"))
                         f_tasks -= 1
                         if f_tasks == 0 or (up_limit and index >= up_limit - up):
                             break
                 if queued_dl and (not dl_limit or dl < dl_limit) and f_tasks != 0:
-                    for index, mid in enumerate(list(queued_dl.keys()), start=1):
-                        await start_dl_from_queued(mid)
+                    index = 0
+                    while queued_dl:
+                        index += 1
+                        await start_dl_from_queued(_next_queued("dl"))
                         if (dl_limit and index >= dl_limit - dl) or index == f_tasks:
                             break
         return
@@ -127,28 +223,26 @@ async def start_from_queued():
         async with queue_dict_lock:
             up = len(non_queued_up)
             if queued_up and up < up_limit:
-                f_tasks = up_limit - up
-                for index, mid in enumerate(list(queued_up.keys()), start=1):
-                    await start_up_from_queued(mid)
-                    if index == f_tasks:
+                for _ in range(up_limit - up):
+                    if not queued_up:
                         break
+                    await start_up_from_queued(_next_queued("up"))
     else:
         async with queue_dict_lock:
             if queued_up:
-                for mid in list(queued_up.keys()):
-                    await start_up_from_queued(mid)
+                while queued_up:
+                    await start_up_from_queued(_next_queued("up"))
 
     if dl_limit := Config.QUEUE_DOWNLOAD:
         async with queue_dict_lock:
             dl = len(non_queued_dl)
             if queued_dl and dl < dl_limit:
-                f_tasks = dl_limit - dl
-                for index, mid in enumerate(list(queued_dl.keys()), start=1):
-                    await start_dl_from_queued(mid)
-                    if index == f_tasks:
+                for _ in range(dl_limit - dl):
+                    if not queued_dl:
                         break
+                    await start_dl_from_queued(_next_queued("dl"))
     else:
         async with queue_dict_lock:
             if queued_dl:
-                for mid in list(queued_dl.keys()):
-                    await start_dl_from_queued(mid)
+                while queued_dl:
+                    await start_dl_from_queued(_next_queued("dl"))
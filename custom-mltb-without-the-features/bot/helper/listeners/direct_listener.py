@@ -1,29 +1,350 @@
+from asyncio import (
+    FIRST_EXCEPTION,
+    CancelledError,
+    ensure_future,
+    gather,
+    sleep,
+    wait,
+)
+from collections import deque
+from hashlib import sha1
+from json import dump, load
+from os import O_CREAT, O_WRONLY, close, ftruncate, makedirs, open as os_open, pwrite
+from os import listdir, path as ospath, remove, rename
+from re import search as re_search
+from shutil import move
+from time import monotonic, time
+from urllib.parse import unquote, urlsplit
+
+from httpx import AsyncClient, HTTPError, Timeout
+
 from ... import LOGGER
+from ...core.config_manager import Config
+from ..ext_utils.bot_utils import sync_to_async
+
+CHUNK_SIZE = 1024 * 1024
+MIN_SEGMENT_SIZE = 8 * 1024 * 1024
+SEGMENT_RETRIES = 5
+STATE_SAVE_INTERVAL = 5
+SPEED_WINDOW = 10
+# Segmented downloads are written here, outside the task folder, so a
+# failed task can be retried (or the bot restarted) and continue them
+PARTS_DIR = "direct_parts"
+PART_MAX_AGE = 3 * 24 * 3600
+
+# Part keys being written right now, a second task for the same file gets its own
+_active_parts = set()
+
+
+def parse_headers(header):
+    """details["header"] comes as "Key: value" or a list of those"""
+    if not header:
+        return {}
+    if isinstance(header, dict):
+        return header
+    if isinstance(header, str):
+        header = [header]
+    headers = {}
+    for line in header:
+        key, sep, value = line.partition(":")
+        if sep:
+            headers[key.strip()] = value.strip()
+    return headers
+
+
+def _part_key(url, filename, size):
+    # Signed links change their query on every resolve, the path and size don't
+    parts = urlsplit(url)
+    return sha1(f"{parts.netloc}{parts.path}|{filename}|{size}".encode()).hexdigest()
+
+
+def _remove(path):
+    try:
+        remove(path)
+    except OSError:
+        pass
+
+
+def _prune_parts():
+    """Drop parts nobody came back for"""
+    try:
+        names = listdir(PARTS_DIR)
+    except OSError:
+        return
+    limit = time() - PART_MAX_AGE
+    for name in names:
+        path = f"{PARTS_DIR}/{name}"
+        try:
+            if ospath.getmtime(path) < limit:
+                remove(path)
+        except OSError:
+            pass
+
+
+class _FileState:
+    """
+    Segments of one file and the bytes each already wrote into its part in
+    PARTS_DIR, saved next to it as <key>.part.json so a retried task or a
+    restarted bot continues where it stopped.
+    """
+
+    def __init__(self, path, url, size, segments):
+        self.path = f"{path}.json"
+        self.url = url
+        self.size = size
+        self.segments = segments
+
+    @classmethod
+    def load(cls, part_path, url, size):
+        try:
+            with open(f"{part_path}.json") as f:
+                data = load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("size") != size or not ospath.exists(part_path):
+            return None
+        return cls(part_path, url, size, data["segments"])
+
+    @property
+    def done(self):
+        return sum(segment[2] for segment in self.segments)
+
+    def save(self):
+        with open(f"{self.path}.tmp", "w") as f:
+            dump({"url": self.url, "size": self.size, "segments": self.segments}, f)
+        rename(f"{self.path}.tmp", self.path)
+
+    def discard(self):
+        _remove(self.path)
 
 
 class DirectListener:
-    def __init__(self, path, listener, a2c_opt):
+    def __init__(self, path, listener, headers):
         self.listener = listener
         self._path = path
-        self._a2c_opt = a2c_opt
+        self._headers = headers
         self._proc_bytes = 0
+        self._file_bytes = 0
         self._failed = 0
-        self.download_task = None
+        self._samples = deque()
+        # Plain links come without a size, it adds up as the files are probed
+        self._count_size = not self.listener.size
         self.name = self.listener.name
 
     @property
     def processed_bytes(self):
-        return 0
+        return self._proc_bytes + self._file_bytes
 
     @property
     def speed(self):
-        return 0
+        now = monotonic()
+        self._samples.append((now, self.processed_bytes))
+        while len(self._samples) > 2 and now - self._samples[0][0] > SPEED_WINDOW:
+            self._samples.popleft()
+        start_time, start_bytes = self._samples[0]
+        if now - start_time <= 0:
+            return 0
+        return (self._samples[-1][1] - start_bytes) / (now - start_time)
 
     async def download(self, contents):
-        LOGGER.error("Direct download requires aria2c, which has been removed.")
-        await self.listener.on_download_error(
-            "Direct download functionality has been removed."
-        )
+        await sync_to_async(_prune_parts)
+        async with AsyncClient(
+            headers=self._headers,
+            follow_redirects=True,
+            verify=False,
+            timeout=Timeout(30, read=60),
+        ) as client:
+            for content in contents:
+                if self.listener.is_cancelled:
+                    break
+                folder = (
+                    f"{self._path}/{content['path']}" if content["path"] else self._path
+                )
+                filename = content["filename"]
+                try:
+                    size = await self._download_file(
+                        client, content["url"], folder, filename
+                    )
+                    self._proc_bytes += size
+                except CancelledError:
+                    break
+                except Exception as e:
+                    # Nothing of a failed file is left in the task folder
+                    self._failed += 1
+                    LOGGER.error(f"Unable to download {filename} due to: {e}")
+                finally:
+                    self._file_bytes = 0
+        if self.listener.is_cancelled:
+            return
+        if self._failed == len(contents):
+            await self.listener.on_download_error("All files are failed to download!")
+            return
+        await self.listener.on_download_complete()
+
+    async def _probe(self, client, url):
+        """(size, ranges supported, Content-Disposition filename) from a one-byte range request"""
+        async with client.stream("GET", url, headers={"Range": "bytes=0-0"}) as r:
+            r.raise_for_status()
+            filename = None
+            if match := re_search(
+                r"filename\*=(?:UTF-8'')?([^;]+)|filename=\"?([^\";]+)",
+                r.headers.get("Content-Disposition", ""),
+            ):
+                filename = ospath.basename(
+                    unquote(match.group(1) or match.group(2)).strip()
+                )
+            if r.status_code == 206 and (
+                match := re_search(r"/(\d+)$", r.headers.get("Content-Range", ""))
+            ):
+                return int(match.group(1)), True, filename
+            return int(r.headers.get("Content-Length", 0)), False, filename
+
+    async def _download_file(self, client, url, folder, filename):
+        await sync_to_async(makedirs, folder, exist_ok=True)
+        size, ranges, disposition = await self._probe(client, url)
+        # Links ending in / or carrying only a query have no name in their path
+        filename = filename or disposition or urlsplit(url).netloc
+        file_path = f"{folder}/{filename}"
+        if self._count_size:
+            self.listener.size += size
+        if not ranges or size < MIN_SEGMENT_SIZE:
+            return await self._download_single(client, url, file_path)
+
+        key = _part_key(url, filename, size)
+        if key in _active_parts:
+            key = f"{key}-{self.listener.mid}"
+        _active_parts.add(key)
+        try:
+            return await self._download_segmented(
+                client, url, file_path, f"{PARTS_DIR}/{key}.part", size
+            )
+        finally:
+            _active_parts.discard(key)
+
+    async def _download_segmented(self, client, url, file_path, part_path, size):
+        await sync_to_async(makedirs, PARTS_DIR, exist_ok=True)
+        state = await sync_to_async(_FileState.load, part_path, url, size)
+        if state is None:
+            count = max(1, min(Config.DIRECT_CONNECTIONS, size // MIN_SEGMENT_SIZE))
+            step = -(-size // count)
+            state = _FileState(
+                part_path,
+                url,
+                size,
+                [[start, min(start + step, size) - 1, 0] for start in range(0, size, step)],
+            )
+        else:
+            LOGGER.info(f"Resuming {ospath.basename(file_path)} at {state.done} bytes")
+
+        fd = os_open(part_path, O_WRONLY | O_CREAT, 0o644)
+        try:
+            await sync_to_async(ftruncate, fd, size)
+            self._file_bytes = state.done
+            pending = {
+                ensure_future(self._download_segment(client, url, fd, segment))
+                for segment in state.segments
+                if segment[0] + segment[2] <= segment[1]
+            }
+            last_save = monotonic()
+            try:
+                while pending and not self.listener.is_cancelled:
+                    done, pending = await wait(
+                        pending, timeout=1, return_when=FIRST_EXCEPTION
+                    )
+                    for task in done:
+                        task.result()
+                    if monotonic() - last_save >= STATE_SAVE_INTERVAL:
+                        await sync_to_async(state.save)
+                        last_save = monotonic()
+            finally:
+                for task in pending:
+                    task.cancel()
+                await gather(*pending, return_exceptions=True)
+                await sync_to_async(state.save)
+        finally:
+            close(fd)
+        if self.listener.is_cancelled:
+            # Cancelled by the user, nothing to come back for
+            await sync_to_async(_remove, part_path)
+            await sync_to_async(state.discard)
+            raise CancelledError
+        await sync_to_async(move, part_path, file_path)
+        await sync_to_async(state.discard)
+        return size
+
+    async def _download_segment(self, client, url, fd, segment):
+        retries = 0
+        while True:
+            start, end, done = segment
+            if start + done > end:
+                return
+            try:
+                async with client.stream(
+                    "GET", url, headers={"Range": f"bytes={start + done}-{end}"}
+                ) as r:
+                    r.raise_for_status()
+                    if r.status_code != 206:
+                        raise HTTPError("Server stopped honouring range requests")
+                    async for chunk in r.aiter_bytes(CHUNK_SIZE):
+                        if self.listener.is_cancelled:
+                            return
+                        chunk = chunk[: end - (start + segment[2]) + 1]
+                        await sync_to_async(pwrite, fd, chunk, start + segment[2])
+                        segment[2] += len(chunk)
+                        self._file_bytes += len(chunk)
+                        retries = 0
+                if start + segment[2] <= end:
+                    raise HTTPError("Connection closed before the segment ended")
+                return
+            except HTTPError as e:
+                retries += 1
+                if retries > SEGMENT_RETRIES:
+                    raise
+                LOGGER.warning(
+                    f"Segment {start}-{end} of {self.name} failed ({e}), retry {retries}"
+                )
+                await sleep(2**retries)
+
+    async def _download_single(self, client, url, file_path):
+        """
+        One connection for servers without range support and for small files,
+        started over from the first byte on every retry
+        """
+        part_path = f"{file_path}.part"
+        retries = 0
+        try:
+            while True:
+                try:
+                    await self._fetch_whole(client, url, part_path)
+                    break
+                except HTTPError as e:
+                    retries += 1
+                    if retries > SEGMENT_RETRIES:
+                        raise
+                    LOGGER.warning(
+                        f"Download of {ospath.basename(file_path)} failed ({e}), retry {retries}"
+                    )
+                    await sleep(2**retries)
+        except BaseException:
+            await sync_to_async(_remove, part_path)
+            raise
+        await sync_to_async(rename, part_path, file_path)
+        return self._file_bytes
+
+    async def _fetch_whole(self, client, url, part_path):
+        self._file_bytes = 0
+        fd = os_open(part_path, O_WRONLY | O_CREAT, 0o644)
+        try:
+            await sync_to_async(ftruncate, fd, 0)
+            async with client.stream("GET", url) as r:
+                r.raise_for_status()
+                async for chunk in r.aiter_bytes(CHUNK_SIZE):
+                    if self.listener.is_cancelled:
+                        raise CancelledError
+                    await sync_to_async(pwrite, fd, chunk, self._file_bytes)
+                    self._file_bytes += len(chunk)
+        finally:
+            close(fd)
 
     async def cancel_task(self):
         self.listener.is_cancelled = True
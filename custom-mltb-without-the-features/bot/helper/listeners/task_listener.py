@@ -32,7 +32,12 @@ from ..ext_utils.files_utils import (
 )
 from ..ext_utils.links_utils import is_gdrive_id
 from ..ext_utils.status_utils import get_readable_file_size
-from ..ext_utils.task_manager import start_from_queued, check_running_tasks
+from ..ext_utils.task_manager import (
+    start_from_queued,
+    check_running_tasks,
+    process_slot,
+    wake_process_waiters,
+)
 from ..mirror_leech_utils.gdrive_utils.upload import GoogleDriveUpload
 from ..mirror_leech_utils.rclone_utils.transfer import RcloneTransferHelper
 from ..mirror_leech_utils.status_utils.gdrive_status import GoogleDriveStatus
@@ -179,85 +184,99 @@ class TaskListener(TaskConfig):
                     non_queued_dl.remove(self.mid)
             await start_from_queued()
 
-        if self.join and not self.is_file:
-            await join_files(up_path)
-
-        if self.extract and not self.is_nzb:
-            up_path = await self.proceed_extract(up_path, gid)
-            if self.is_cancelled:
-                return
-            self.is_file = await aiopath.isfile(up_path)
-            self.name = up_path.replace(f"{up_dir}/", "").split("/", 1)[0]
-            self.size = await get_path_size(up_dir)
-            self.clear()
-            await remove_excluded_files(up_dir, self.excluded_extensions)
-
-        if self.ffmpeg_cmds:
-            up_path = await self.proceed_ffmpeg(
-                up_path,
-                gid,
-            )
-            if self.is_cancelled:
-                return
-            self.is_file = await aiopath.isfile(up_path)
-            self.name = up_path.replace(f"{up_dir}/", "").split("/", 1)[0]
-            self.size = await get_path_size(up_dir)
-            self.clear()
-
-        if self.name_sub:
-            up_path = await self.substitute(up_path)
+        heavy = (
+            self.join
+            or self.extract
+            or self.ffmpeg_cmds
+            or self.screen_shots
+            or self.convert_audio
+            or self.convert_video
+            or self.sample_video
+            or self.compress
+            or (self.is_leech and self.size > self.split_size)
+        )
+        async with process_slot(self, heavy):
             if self.is_cancelled:
                 return
-            self.is_file = await aiopath.isfile(up_path)
-            self.name = up_path.replace(f"{up_dir}/", "").split("/", 1)[0]
+            if self.join and not self.is_file:
+                await join_files(up_path)
+
+            if self.extract and not self.is_nzb:
+                up_path = await self.proceed_extract(up_path, gid)
+                if self.is_cancelled:
+                    return
+                self.is_file = await aiopath.isfile(up_path)
+                self.name = up_path.replace(f"{up_dir}/", "").split("/", 1)[0]
+                self.size = await get_path_size(up_dir)
+                self.clear()
+                await remove_excluded_files(up_dir, self.excluded_extensions)
+
+            if self.ffmpeg_cmds:
+                up_path = await self.proceed_ffmpeg(
+                    up_path,
+                    gid,
+                )
+                if self.is_cancelled:
+                    return
+                self.is_file = await aiopath.isfile(up_path)
+                self.name = up_path.replace(f"{up_dir}/", "").split("/", 1)[0]
+                self.size = await get_path_size(up_dir)
+                self.clear()
+
+            if self.name_sub:
+                up_path = await self.substitute(up_path)
+                if self.is_cancelled:
+                    return
+                self.is_file = await aiopath.isfile(up_path)
+                self.name = up_path.replace(f"{up_dir}/", "").split("/", 1)[0]
+
+            if self.screen_shots:
+                up_path = await self.generate_screenshots(up_path)
+                if self.is_cancelled:
+                    return
+                self.is_file = await aiopath.isfile(up_path)
+                self.name = up_path.replace(f"{up_dir}/", "").split("/", 1)[0]
+                self.size = await get_path_size(up_dir)
+
+            if self.convert_audio or self.convert_video:
+                up_path = await self.convert_media(
+                    up_path,
+                    gid,
+                )
+                if self.is_cancelled:
+                    return
+                self.is_file = await aiopath.isfile(up_path)
+                self.name = up_path.replace(f"{up_dir}/", "").split("/", 1)[0]
+                self.size = await get_path_size(up_dir)
+                self.clear()
+
+            if self.sample_video:
+                up_path = await self.generate_sample_video(up_path, gid)
+                if self.is_cancelled:
+                    return
+                self.is_file = await aiopath.isfile(up_path)
+                self.name = up_path.replace(f"{up_dir}/", "").split("/", 1)[0]
+                self.size = await get_path_size(up_dir)
+                self.clear()
+
+            if self.compress:
+                up_path = await self.proceed_compress(
+                    up_path,
+                    gid,
+                )
+                self.is_file = await aiopath.isfile(up_path)
+                if self.is_cancelled:
+                    return
+                self.clear()
 
-        if self.screen_shots:
-            up_path = await self.generate_screenshots(up_path)
-            if self.is_cancelled:
-                return
-            self.is_file = await aiopath.isfile(up_path)
             self.name = up_path.replace(f"{up_dir}/", "").split("/", 1)[0]
             self.size = await get_path_size(up_dir)
 
-        if self.convert_audio or self.convert_video:
-            up_path = await self.convert_media(
-                up_path,
-                gid,
-            )
-            if self.is_cancelled:
-                return
-            self.is_file = await aiopath.isfile(up_path)
-            self.name = up_path.replace(f"{up_dir}/", "").split("/", 1)[0]
-            self.size = await get_path_size(up_dir)
-            self.clear()
-
-        if self.sample_video:
-            up_path = await self.generate_sample_video(up_path, gid)
-            if self.is_cancelled:
-                return
-            self.is_file = await aiopath.isfile(up_path)
-            self.name = up_path.replace(f"{up_dir}/", "").split("/", 1)[0]
-            self.size = await get_path_size(up_dir)
-            self.clear()
-
-        if self.compress:
-            up_path = await self.proceed_compress(
-                up_path,
-                gid,
-            )
-            self.is_file = await aiopath.isfile(up_path)
-            if self.is_cancelled:
-                return
-            self.clear()
-
-        self.name = up_path.replace(f"{up_dir}/", "").split("/", 1)[0]
-        self.size = await get_path_size(up_dir)
-
-        if self.is_leech and not self.compress:
-            await self.proceed_split(up_path, gid)
-            if self.is_cancelled:
-                return
-            self.clear()
+            if self.is_leech and not self.compress:
+                await self.proceed_split(up_path, gid)
+                if self.is_cancelled:
+                    return
+                self.clear()
 
         self.subproc = None
 
@@ -431,6 +450,7 @@ class TaskListener(TaskConfig):
                 non_queued_up.remove(self.mid)
 
         await start_from_queued()
+        await wake_process_waiters()
         await sleep(3)
         await clean_download(self.dir)
         if self.up_dir:
@@ -469,6 +489,7 @@ class TaskListener(TaskConfig):
                 non_queued_up.remove(self.mid)
 
         await start_from_queued()
+        await wake_process_waiters()
         await sleep(3)
         await clean_download(self.dir)
         if self.up_dir:
@@ -6,7 +6,7 @@ from .... import (
     task_dict_lock,
 )
 from ...ext_utils.task_manager import check_running_tasks, stop_duplicate_check
-from ...listeners.direct_listener import DirectListener
+from ...listeners.direct_listener import DirectListener, parse_headers
 from ...mirror_leech_utils.status_utils.direct_status import DirectStatus
 from ...mirror_leech_utils.status_utils.queue_status import QueueStatus
 from ...telegram_helper.message_utils import send_status_message
@@ -41,10 +41,7 @@ async def add_direct_download(listener, path):
         if listener.is_cancelled:
             return
 
-    a2c_opt = {"follow-torrent": "false", "follow-metalink": "false"}
-    if header := details.get("header"):
-        a2c_opt["header"] = header
-    directListener = DirectListener(path, listener, a2c_opt)
+    directListener = DirectListener(path, listener, parse_headers(details.get("header")))
 
     async with task_dict_lock:
         task_dict[listener.mid] = DirectStatus(listener, directListener, gid)
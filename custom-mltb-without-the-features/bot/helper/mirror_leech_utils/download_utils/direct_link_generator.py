@@ -1,4 +1,6 @@
 from cloudscraper import create_scraper
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
 from hashlib import sha256
 from http.cookiejar import MozillaCookieJar
 from json import loads
@@ -7,7 +9,8 @@ from os import path as ospath
 from re import findall, match, search
 from requests import Session, post, get
 from requests.adapters import HTTPAdapter
-from time import sleep
+from threading import Lock, local
+from time import sleep, time
 from urllib.parse import parse_qs, urlparse, quote
 from urllib3.util.retry import Retry
 from uuid import uuid4
@@ -23,9 +26,92 @@ user_agent = (
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:122.0) Gecko/20100101 Firefox/122.0"
 )
 
+FOLDER_WORKERS = 8
+# Query parameters signed links carry their expiry time (unix seconds) in
+EXPIRY_PARAMS = ("expires", "expire", "expiry", "exp", "e")
+
+_cache = {}
+_resolving = {}
+_cache_lock = Lock()
+_sessions = {}
+_sessions_lock = Lock()
+
+
+def _session(host):
+    """Keep-alive session with retries, shared by every resolution against host"""
+    with _sessions_lock:
+        if (session := _sessions.get(host)) is None:
+            session = Session()
+            adapter = HTTPAdapter(
+                pool_maxsize=FOLDER_WORKERS,
+                max_retries=Retry(
+                    total=3,
+                    backoff_factor=0.3,
+                    status_forcelist=(429, 500, 502, 503, 504),
+                ),
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers["User-Agent"] = user_agent
+            _sessions[host] = session
+    return session
+
+
+def _map_concurrent(func, items):
+    """func over items on up to FOLDER_WORKERS threads, results in the order of items"""
+    if len(items) < 2:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(FOLDER_WORKERS, len(items))) as pool:
+        return list(pool.map(func, items))
+
+
+def _expiry(result, now):
+    """When a resolved result goes stale: the cache TTL or the earliest signed url expiry"""
+    expiry = now + Config.DIRECT_LINK_CACHE_TTL
+    if isinstance(result, dict):
+        urls = [content["url"] for content in result["contents"]]
+    else:
+        urls = [result[0] if isinstance(result, tuple) else result]
+    for url in urls:
+        query = parse_qs(urlparse(url).query)
+        for key in EXPIRY_PARAMS:
+            value = query.get(key, [""])[0]
+            if value.isdigit() and int(value) > 1e9:
+                # Leave a minute for the download to start
+                expiry = min(expiry, int(value) - 60)
+    return expiry
+
 
 def direct_link_generator(link):
-    """direct links generator"""
+    """
+    direct links generator, a resolved link is reused for DIRECT_LINK_CACHE_TTL
+    seconds and the same link asked for twice at once is resolved only once
+    """
+    if not Config.DIRECT_LINK_CACHE_TTL:
+        return _generate(link)
+    with _cache_lock:
+        link_lock = _resolving.setdefault(link, Lock())
+    with link_lock:
+        now = time()
+        with _cache_lock:
+            cached = _cache.get(link)
+        if cached is not None and cached[1] > now:
+            return deepcopy(cached[0])
+        try:
+            result = _generate(link)
+            with _cache_lock:
+                for key in [key for key, (_, expiry) in _cache.items() if expiry <= now]:
+                    del _cache[key]
+                if (expiry := _expiry(result, now)) > now:
+                    _cache[link] = (result, expiry)
+        finally:
+            # Only after the cache has the result, or a caller in between resolves again
+            with _cache_lock:
+                _resolving.pop(link, None)
+        return deepcopy(result)
+
+
+def _generate(link):
     domain = urlparse(link).hostname
     if not domain:
         raise DirectDownloadLinkException("ERROR: Invalid URL")
@@ -993,7 +1079,7 @@ def linkBox(url: str):
             details["total_size"] += size
         details["contents"].append(item)
 
-    def __fetch_links(session, _id=0, folderPath=""):
+    def __list(session, _id):
         params = {
             "shareToken": shareToken,
             "pageSize": 1000,
@@ -1011,50 +1097,45 @@ def linkBox(url: str):
             if "msg" in _json:
                 raise DirectDownloadLinkException(f"ERROR: {_json['msg']}")
             raise DirectDownloadLinkException("ERROR: data not found")
-        try:
-            if data["shareType"] == "singleItem":
-                return __singleItem(session, data["itemId"])
-        except:
-            pass
-        if not details["title"]:
-            details["title"] = data["dirName"]
-        contents = data["list"]
-        if not contents:
-            return None
-        for content in contents:
-            if content["type"] == "dir" and "url" not in content:
-                if not folderPath:
-                    newFolderPath = ospath.join(details["title"], content["name"])
-                else:
-                    newFolderPath = ospath.join(folderPath, content["name"])
-                if not details["title"]:
-                    details["title"] = content["name"]
-                __fetch_links(session, content["id"], newFolderPath)
-            elif "url" in content:
-                if not folderPath:
-                    folderPath = details["title"]
-                filename = content["name"]
-                if (
-                    sub_type := content.get("sub_type")
-                ) and not filename.strip().endswith(sub_type):
-                    filename += f".{sub_type}"
-                item = {
-                    "path": ospath.join(folderPath),
-                    "filename": filename,
-                    "url": content["url"],
-                }
-                if "size" in content:
-                    size = content["size"]
-                    if isinstance(size, str) and size.isdigit():
-                        size = float(size)
-                    details["total_size"] += size
-                details["contents"].append(item)
+        return data
 
-    try:
-        with Session() as session:
-            __fetch_links(session)
-    except DirectDownloadLinkException as e:
-        raise e
+    def __add_file(content, folderPath):
+        filename = content["name"]
+        if (sub_type := content.get("sub_type")) and not filename.strip().endswith(
+            sub_type
+        ):
+            filename += f".{sub_type}"
+        item = {
+            "path": ospath.join(folderPath),
+            "filename": filename,
+            "url": content["url"],
+        }
+        if "size" in content:
+            size = content["size"]
+            if isinstance(size, str) and size.isdigit():
+                size = float(size)
+            details["total_size"] += size
+        details["contents"].append(item)
+
+    session = _session("www.linkbox.to")
+    data = __list(session, 0)
+    if data.get("shareType") == "singleItem":
+        __singleItem(session, data["itemId"])
+        return details
+    details["title"] = data["dirName"]
+    level = [(data, details["title"])]
+    while level:
+        folders = []
+        for data, folderPath in level:
+            for content in data["list"] or []:
+                if content["type"] == "dir" and "url" not in content:
+                    folders.append(
+                        (content["id"], ospath.join(folderPath, content["name"]))
+                    )
+                elif "url" in content:
+                    __add_file(content, folderPath)
+        listings = _map_concurrent(lambda folder: __list(session, folder[0]), folders)
+        level = [(data, folder[1]) for data, folder in zip(listings, folders)]
     return details
 
 
@@ -1086,7 +1167,7 @@ def gofile(url):
         except Exception as e:
             raise e
 
-    def __fetch_links(session, _id, folderPath=""):
+    def __list(session, _id):
         _url = f"https://api.gofile.io/contents/{_id}?wt=4fd6sg89d7s6&cache=true"
         headers = {
             "User-Agent": user_agent,
@@ -1113,48 +1194,49 @@ def gofile(url):
             )
         if _json["status"] in "error-notPublic":
             raise DirectDownloadLinkException("ERROR: This folder is not public")
-
-        data = _json["data"]
-
-        if not details["title"]:
-            details["title"] = data["name"] if data["type"] == "folder" else _id
-
-        contents = data["children"]
-        for content in contents.values():
-            if content["type"] == "folder":
-                if not content["public"]:
-                    continue
-                if not folderPath:
-                    newFolderPath = ospath.join(details["title"], content["name"])
-                else:
-                    newFolderPath = ospath.join(folderPath, content["name"])
-                __fetch_links(session, content["id"], newFolderPath)
-            else:
-                if not folderPath:
-                    folderPath = details["title"]
-                item = {
-                    "path": ospath.join(folderPath),
-                    "filename": content["name"],
-                    "url": content["link"],
-                }
-                if "size" in content:
-                    size = content["size"]
-                    if isinstance(size, str) and size.isdigit():
-                        size = float(size)
-                    details["total_size"] += size
-                details["contents"].append(item)
+        return _json["data"]
+
+    def __fetch_links(session, _id):
+        data = __list(session, _id)
+        details["title"] = data["name"] if data["type"] == "folder" else _id
+        level = [(data, details["title"])]
+        while level:
+            folders = []
+            for data, folderPath in level:
+                for content in data["children"].values():
+                    if content["type"] == "folder":
+                        if content["public"]:
+                            folders.append(
+                                (content["id"], ospath.join(folderPath, content["name"]))
+                            )
+                        continue
+                    item = {
+                        "path": ospath.join(folderPath),
+                        "filename": content["name"],
+                        "url": content["link"],
+                    }
+                    if "size" in content:
+                        size = content["size"]
+                        if isinstance(size, str) and size.isdigit():
+                            size = float(size)
+                        details["total_size"] += size
+                    details["contents"].append(item)
+            listings = _map_concurrent(
+                lambda folder: __list(session, folder[0]), folders
+            )
+            level = [(data, folder[1]) for data, folder in zip(listings, folders)]
 
     details = {"contents": [], "title": "", "total_size": 0}
-    with Session() as session:
-        try:
-            token = __get_token(session)
-        except Exception as e:
-            raise DirectDownloadLinkException(f"ERROR: {e.__class__.__name__}")
-        details["header"] = [f"Cookie: accountToken={token}"]
-        try:
-            __fetch_links(session, _id)
-        except Exception as e:
-            raise DirectDownloadLinkException(e)
+    session = _session("api.gofile.io")
+    try:
+        token = __get_token(session)
+    except Exception as e:
+        raise DirectDownloadLinkException(f"ERROR: {e.__class__.__name__}")
+    details["header"] = [f"Cookie: accountToken={token}"]
+    try:
+        __fetch_links(session, _id)
+    except Exception as e:
+        raise DirectDownloadLinkException(e)
 
     if len(details["contents"]) == 1:
         return (details["contents"][0]["url"], details["header"])
@@ -1177,17 +1259,33 @@ def mediafireFolder(url):
         folderkey = folderkey[0]
     details = {"contents": [], "title": "", "total_size": 0, "header": ""}
 
-    session = create_scraper()
-    adapter = HTTPAdapter(
-        max_retries=Retry(total=10, read=10, connect=10, backoff_factor=0.3)
-    )
-    session.mount("http://", adapter)
-    session.mount("https://", adapter)
-    session = create_scraper(
-        browser={"browser": "firefox", "platform": "windows", "mobile": False},
-        delay=10,
-        sess=session,
-    )
+    def __new_session():
+        session = create_scraper()
+        adapter = HTTPAdapter(
+            max_retries=Retry(total=10, read=10, connect=10, backoff_factor=0.3)
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return create_scraper(
+            browser={"browser": "firefox", "platform": "windows", "mobile": False},
+            delay=10,
+            sess=session,
+        )
+
+    session = __new_session()
+    # cloudscraper isn't thread-safe, every scraping thread gets its own
+    # session starting from the cookies the folder api left
+    thread_sessions = local()
+    worker_sessions = []
+
+    def __worker_session():
+        if (worker := getattr(thread_sessions, "session", None)) is None:
+            worker = __new_session()
+            worker.cookies.update(session.cookies)
+            thread_sessions.session = worker
+            worker_sessions.append(worker)
+        return worker
+
     folder_infos = []
 
     def __get_info(folderkey):
@@ -1224,9 +1322,9 @@ def mediafireFolder(url):
     details["title"] = folder_infos[0]["name"]
 
     def __scraper(url):
-        session = create_scraper()
         parsed_url = urlparse(url)
         url = f"{parsed_url.scheme}://{parsed_url.netloc}{parsed_url.path}"
+        session = __worker_session()
 
         try:
             html = HTML(session.get(url).text)
@@ -1299,13 +1397,17 @@ def mediafireFolder(url):
             __get_content(folderKey, folderPath, "files")
         else:
             files = _folder_content["files"]
-            for file in files:
+            # One page per file to find its link, fetched side by side
+            urls = _map_concurrent(
+                lambda file: __scraper(file["links"]["normal_download"]), files
+            )
+            if not folderPath:
+                folderPath = details["title"]
+            for file, _url in zip(files, urls):
                 item = {}
-                if not (_url := __scraper(file["links"]["normal_download"])):
+                if not _url:
                     continue
                 item["filename"] = file["filename"]
-                if not folderPath:
-                    folderPath = details["title"]
                 item["path"] = ospath.join(folderPath)
                 item["url"] = _url
                 if "size" in file:
@@ -1322,6 +1424,8 @@ def mediafireFolder(url):
         raise DirectDownloadLinkException(e)
     finally:
         session.close()
+        for worker in worker_sessions:
+            worker.close()
     if len(details["contents"]) == 1:
         return (details["contents"][0]["url"], [details["header"]])
     return details
@@ -1,4 +1,6 @@
 from logging import getLogger
+from threading import Lock
+from time import time
 
 from .... import drives_names, drives_ids, index_urls, user_data
 from ....helper.ext_utils.status_utils import get_readable_file_size
@@ -93,13 +95,8 @@ class GoogleDriveSearch(GoogleDriveHelper):
             LOGGER.error(err)
             return {"files": []}
 
-    def drive_list(self, file_name, target_id="", user_id=""):
-        msg = ""
-        file_name = self.escapes(str(file_name))
-        contents_no = 0
-        telegraph_content = []
-        Title = False
-
+    def target_drives(self, target_id="", user_id=""):
+        """(drive name, id, index url) to search in, with the service authorized for them"""
         if target_id.startswith("mtp:"):
             drives = self.get_user_drive(target_id, user_id)
         elif target_id:
@@ -120,8 +117,13 @@ class GoogleDriveSearch(GoogleDriveHelper):
             self.use_sa = False
 
         self.service = self.authorize()
+        return drives
 
-        for drive_name, dir_id, index_url in drives:
+    def drive_list(self, file_name, target_id="", user_id=""):
+        file_name = self.escapes(str(file_name))
+        results = []
+
+        for drive_name, dir_id, index_url in self.target_drives(target_id, user_id):
             isRecur = (
                 False if self._is_recursive and len(dir_id) > 23 else self._is_recursive
             )
@@ -131,12 +133,26 @@ class GoogleDriveSearch(GoogleDriveHelper):
                     break
                 else:
                     continue
+            results.append((drive_name, response.get("files", []), index_url))
+            if self._no_multi:
+                break
+
+        return self.render(file_name, results)
+
+    def render(self, file_name, results):
+        """Telegraph pages and count of [(drive name, files, index url)]"""
+        msg = ""
+        contents_no = 0
+        telegraph_content = []
+        Title = False
+
+        for drive_name, files, index_url in results:
             if not Title:
                 msg += f"<h4>Search Result For {file_name}</h4>"
                 Title = True
             if drive_name:
                 msg += f"╾────────────╼<br><b>{drive_name}</b><br>╾────────────╼<br>"
-            for file in response.get("files", []):
+            for file in files:
                 mime_type = file.get("mimeType")
                 if mime_type == self.G_DRIVE_DIR_MIME_TYPE:
                     furl = self.G_DRIVE_DIR_BASE_DOWNLOAD_URL.format(file.get("id"))
@@ -166,8 +182,6 @@ class GoogleDriveSearch(GoogleDriveHelper):
                 if len(msg.encode("utf-8")) > 39000:
                     telegraph_content.append(msg)
                     msg = ""
-            if self._no_multi:
-                break
 
         if msg != "":
             telegraph_content.append(msg)
@@ -181,3 +195,237 @@ class GoogleDriveSearch(GoogleDriveHelper):
         user_dict = user_data.get(user_id, {})
         INDEX = user_dict["index_url"] if user_dict.get("index_url") else ""
         return [("User Choice", dest_id, INDEX)]
+
+
+class _Destination:
+    """
+    What stop duplicate knows about one upload destination. A folder is
+    listed once, a whole drive remembers each name looked up in it, found
+    or not. Both are kept current from changes.list and dropped after TTL.
+    """
+
+    TTL = 600
+    POLL_INTERVAL = 30
+    MAX_LIST_PAGES = 10
+    BATCH_SIZE = 20
+
+    def __init__(self, target_id, user_id):
+        self.lock = Lock()
+        # Names of the tasks waiting on this destination, changed outside lock
+        self.waiting = set()
+        self.waiting_lock = Lock()
+        self._search = GoogleDriveSearch(stop_dup=True)
+        self._drive_name, self._dir_id, self._index_url = list(
+            self._search.target_drives(target_id, user_id)
+        )[0]
+        self._is_folder = len(self._dir_id) > 23
+        self._folder = None
+        self._names = {}
+        self._token = None
+        self._refreshed = 0
+        self._polled = 0
+
+    @property
+    def _service(self):
+        return self._search.service
+
+    def _refresh(self):
+        self._token = (
+            self._service.changes()
+            .getStartPageToken(supportsAllDrives=True)
+            .execute()["startPageToken"]
+        )
+        self._names = {}
+        self._folder = self._list_folder() if self._is_folder else None
+        self._refreshed = self._polled = time()
+
+    def _list_folder(self):
+        """{id: file} of the folder, None when it is too big to keep"""
+        files = {}
+        page_token = None
+        for _ in range(self.MAX_LIST_PAGES):
+            response = (
+                self._service.files()
+                .list(
+                    supportsAllDrives=True,
+                    includeItemsFromAllDrives=True,
+                    q=f"'{self._dir_id}' in parents and trashed = false",
+                    spaces="drive",
+                    pageSize=1000,
+                    fields="nextPageToken, files(id, name, mimeType, size)",
+                    pageToken=page_token,
+                )
+                .execute()
+            )
+            for file in response.get("files", []):
+                files[file["id"]] = file
+            if not (page_token := response.get("nextPageToken")):
+                return files
+        return None
+
+    def _poll(self):
+        page_token = self._token
+        while page_token:
+            response = (
+                self._service.changes()
+                .list(
+                    pageToken=page_token,
+                    spaces="drive",
+                    supportsAllDrives=True,
+                    includeItemsFromAllDrives=True,
+                    pageSize=1000,
+                    fields="nextPageToken, newStartPageToken, changes(fileId, removed, file(id, name, mimeType, size, parents, trashed))",
+                )
+                .execute()
+            )
+            for change in response.get("changes", []):
+                self._apply(change)
+            page_token = response.get("nextPageToken")
+            if new_token := response.get("newStartPageToken"):
+                self._token = new_token
+        self._polled = time()
+
+    def _apply(self, change):
+        file_id = change["fileId"]
+        file = None if change.get("removed") else change.get("file")
+        if self._folder is not None:
+            self._folder.pop(file_id, None)
+            if (
+                file
+                and not file.get("trashed")
+                and self._dir_id in file.get("parents", [])
+            ):
+                self._folder[file_id] = file
+        if file:
+            self._names.pop(file["name"], None)
+        for name, (_, files) in list(self._names.items()):
+            if any(f["id"] == file_id for f in files):
+                del self._names[name]
+
+    def _query(self, names):
+        """One files.list for up to BATCH_SIZE names, each remembered found or not"""
+        query = " or ".join(
+            f"name = '{self._search.escapes(name)}'" for name in names
+        )
+        query = f"({query}) and trashed = false"
+        if self._is_folder:
+            # A folder too big to list, not a drive id to pass as driveId
+            response = (
+                self._service.files()
+                .list(
+                    supportsAllDrives=True,
+                    includeItemsFromAllDrives=True,
+                    q=f"'{self._dir_id}' in parents and {query}",
+                    spaces="drive",
+                    pageSize=1000,
+                    fields="files(id, name, mimeType, size, parents)",
+                    orderBy="folder, name asc",
+                )
+                .execute()
+            )
+        elif self._dir_id == "root":
+            response = (
+                self._service.files()
+                .list(
+                    q=f"{query} and 'me' in owners",
+                    pageSize=1000,
+                    spaces="drive",
+                    fields="files(id, name, mimeType, size, parents)",
+                    orderBy="folder, name asc",
+                )
+                .execute()
+            )
+        else:
+            response = (
+                self._service.files()
+                .list(
+                    supportsAllDrives=True,
+                    includeItemsFromAllDrives=True,
+                    driveId=self._dir_id,
+                    q=query,
+                    spaces="drive",
+                    pageSize=1000,
+                    fields="files(id, name, mimeType, size, teamDriveId, parents)",
+                    corpora="drive",
+                    orderBy="folder, name asc",
+                )
+                .execute()
+            )
+        expiry = time() + self.TTL
+        found = {name: [] for name in names}
+        for file in response.get("files", []):
+            if file["name"] in found:
+                found[file["name"]].append(file)
+        for name, files in found.items():
+            self._names[name] = (expiry, files)
+
+    def _lookup(self, name):
+        if self._folder is not None:
+            files = [file for file in self._folder.values() if file["name"] == name]
+            return sorted(
+                files,
+                key=lambda file: file["mimeType"] != self._search.G_DRIVE_DIR_MIME_TYPE,
+            )
+        cached = self._names.get(name)
+        if cached is None or cached[0] <= time():
+            # Names of other tasks waiting on this destination go in the same request
+            with self.waiting_lock:
+                waiting = list(self.waiting)
+            names = [name] + [
+                other
+                for other in waiting
+                if other != name
+                and (other not in self._names or self._names[other][0] <= time())
+            ]
+            for index in range(0, len(names), self.BATCH_SIZE):
+                self._query(names[index : index + self.BATCH_SIZE])
+            cached = self._names[name]
+        return cached[1]
+
+    def check(self, name):
+        now = time()
+        if self._token is None or now - self._refreshed >= self.TTL:
+            self._refresh()
+        elif now - self._polled >= self.POLL_INTERVAL:
+            self._poll()
+        files = self._lookup(name)
+        return self._search.render(
+            self._search.escapes(name),
+            [(self._drive_name, files, self._index_url)] if files else [],
+        )
+
+
+class DuplicateCache:
+    """Stop duplicate lookups answered from per destination caches"""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._destinations = {}
+
+    def check(self, name, target_id, user_id, no_multi=False):
+        key = (target_id, user_id if target_id.startswith("mtp:") else "")
+        name = name.strip()
+        try:
+            with self._lock:
+                if (destination := self._destinations.get(key)) is None:
+                    destination = self._destinations[key] = _Destination(
+                        target_id, user_id
+                    )
+            with destination.waiting_lock:
+                destination.waiting.add(name)
+            try:
+                with destination.lock:
+                    return destination.check(name)
+            finally:
+                with destination.waiting_lock:
+                    destination.waiting.discard(name)
+        except Exception as e:
+            LOGGER.error(f"Duplicate cache: {e}. Searching Drive directly")
+            with self._lock:
+                self._destinations.pop(key, None)
+            return GoogleDriveSearch(stop_dup=True, no_multi=no_multi).drive_list(
+                name, target_id, user_id
+            )
+
+
+duplicate_cache = DuplicateCache()
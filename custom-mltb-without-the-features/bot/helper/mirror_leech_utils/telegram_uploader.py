@@ -1,11 +1,12 @@
 from PIL import Image
 from aioshutil import rmtree
-from asyncio import sleep
+from asyncio import create_task, sleep
 from logging import getLogger
 from natsort import natsorted
 from os import walk, path as ospath
 from time import time
 from re import match as re_match, sub as re_sub
+from pyrogram import Client
 from pyrogram.errors import FloodWait, RPCError, FloodPremiumWait, BadRequest
 from aiofiles.os import (
     remove,
@@ -26,7 +27,7 @@ from tenacity import (
 )
 
 from ...core.config_manager import Config
-from ...core.mltb_client import TgClient
+from ...core.mltb_client import TgClient, preuploads
 from ..ext_utils.bot_utils import sync_to_async
 from ..ext_utils.files_utils import is_archive, get_base_name
 from ..telegram_helper.message_utils import delete_message
@@ -62,6 +63,10 @@ class TelegramUploader:
         self._sent_msg = None
         self._user_session = self._listener.user_transmission
         self._error = ""
+        self._preuploads = {}
+        # Uploads started ahead that no send call has taken yet
+        self._unclaimed = {}
+        self._preupload_bytes = {}
 
     async def _upload_progress(self, current, _):
         if self._listener.is_cancelled:
@@ -73,6 +78,46 @@ class TelegramUploader:
         self._last_uploaded = current
         self._processed_bytes += chunk_size
 
+    async def _preupload_progress(self, current, _, path):
+        if self._listener.is_cancelled:
+            self._listener.client.stop_transmission()
+        self._processed_bytes += current - self._preupload_bytes.get(path, 0)
+        self._preupload_bytes[path] = current
+
+    def _client_for(self, f_size):
+        if self._listener.hybrid_leech and self._listener.user_transmission:
+            user_session = f_size > 2097152000
+        else:
+            user_session = self._listener.user_transmission
+        return TgClient.user if user_session else self._listener.client
+
+    def _preupload_ahead(self, entries, index):
+        """Upload the next LEECH_UPLOAD_WORKERS files while their turn to be sent comes"""
+        for entry in entries[index : index + Config.LEECH_UPLOAD_WORKERS]:
+            up_path, f_size = entry[3], entry[5]
+            if up_path is None or up_path in self._preuploads:
+                continue
+            client = self._client_for(f_size)
+            # Past the preupload lookup, which would hand this task to itself
+            task = create_task(
+                Client.save_file(
+                    client,
+                    up_path,
+                    progress=self._preupload_progress,
+                    progress_args=(up_path,),
+                )
+            )
+            self._preuploads[up_path] = self._unclaimed[up_path] = (client, task)
+
+    def _drop_preuploads(self):
+        self._unclaimed.clear()
+        for _, task in self._preuploads.values():
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                task.exception()
+        self._preuploads.clear()
+
     async def _user_settings(self):
         self._media_group = self._listener.user_dict.get("MEDIA_GROUP") or (
             Config.MEDIA_GROUP
@@ -219,31 +264,21 @@ class TelegramUploader:
         res = await self._msg_to_reply()
         if not res:
             return
-        for dirpath, _, files in natsorted(await sync_to_async(walk, self._path)):
-            if dirpath.strip().endswith("/yt-dlp-thumb"):
-                continue
-            if dirpath.strip().endswith("_mltbss"):
-                await self._send_screenshots(dirpath, files)
-                await rmtree(dirpath, ignore_errors=True)
-                continue
-            for file_ in natsorted(files):
-                self._error = ""
-                self._up_path = f_path = ospath.join(dirpath, file_)
-                if not await aiopath.exists(self._up_path):
-                    LOGGER.error(f"{self._up_path} not exists! Continue uploading!")
+        entries = await self._collect_files()
+        try:
+            for index, (dirpath, file_, f_path, up_path, cap_mono, f_size) in enumerate(
+                entries
+            ):
+                if up_path is None:
+                    await self._send_screenshots(dirpath, file_)
+                    await rmtree(dirpath, ignore_errors=True)
                     continue
+                self._error = ""
+                self._up_path = up_path
+                self._preupload_ahead(entries, index)
                 try:
-                    f_size = await aiopath.getsize(self._up_path)
-                    self._total_files += 1
-                    if f_size == 0:
-                        LOGGER.error(
-                            f"{self._up_path} size is zero, telegram don't upload zero size files"
-                        )
-                        self._corrupted += 1
-                        continue
                     if self._listener.is_cancelled:
                         return
-                    cap_mono = await self._prepare_file(file_, dirpath)
                     if self._last_msg_in_group:
                         group_lists = [
                             x for v in self._media_dict.values() for x in v.keys()
@@ -268,7 +303,12 @@ class TelegramUploader:
                             )
                     self._last_msg_in_group = False
                     self._last_uploaded = 0
-                    await self._upload_file(cap_mono, file_, f_path)
+                    # Send calls of this upload only pick up its own preuploads
+                    token = preuploads.set(self._unclaimed)
+                    try:
+                        await self._upload_file(cap_mono, file_, f_path)
+                    finally:
+                        preuploads.reset(token)
                     if self._listener.is_cancelled:
                         return
                     if (
@@ -277,7 +317,6 @@ class TelegramUploader:
                         and not self._is_private
                     ):
                         self._msgs_dict[self._sent_msg.link] = file_
-                    await sleep(1)
                 except Exception as err:
                     if isinstance(err, RetryError):
                         LOGGER.info(
@@ -293,6 +332,8 @@ class TelegramUploader:
                     self._up_path
                 ):
                     await remove(self._up_path)
+        finally:
+            self._drop_preuploads()
         for key, value in list(self._media_dict.items()):
             for subkey, msgs in list(value.items()):
                 if len(msgs) > 1:
@@ -320,6 +361,41 @@ class TelegramUploader:
         )
         return
 
+    async def _collect_files(self):
+        """
+        Files in the order they are sent, renamed and captioned first so the
+        next ones can be uploaded while the current one is sent
+        """
+        entries = []
+        for dirpath, _, files in natsorted(await sync_to_async(walk, self._path)):
+            if dirpath.strip().endswith("/yt-dlp-thumb"):
+                continue
+            if dirpath.strip().endswith("_mltbss"):
+                entries.append((dirpath, files, None, None, None, 0))
+                continue
+            for file_ in natsorted(files):
+                self._up_path = f_path = ospath.join(dirpath, file_)
+                if not await aiopath.exists(self._up_path):
+                    LOGGER.error(f"{self._up_path} not exists! Continue uploading!")
+                    continue
+                try:
+                    f_size = await aiopath.getsize(self._up_path)
+                    self._total_files += 1
+                    if f_size == 0:
+                        LOGGER.error(
+                            f"{self._up_path} size is zero, telegram don't upload zero size files"
+                        )
+                        self._corrupted += 1
+                        continue
+                    cap_mono = await self._prepare_file(file_, dirpath)
+                except Exception as err:
+                    LOGGER.error(f"{err}. Path: {self._up_path}")
+                    self._error = str(err)
+                    self._corrupted += 1
+                    continue
+                entries.append((dirpath, file_, f_path, self._up_path, cap_mono, f_size))
+        return entries
+
     @retry(
         wait=wait_exponential(multiplier=2, min=4, max=8),
         stop=stop_after_attempt(3),
@@ -76,7 +76,7 @@ async def send_rss(text, chat_id, thread_id):
     except (FloodWait, FloodPremiumWait) as f:
         LOGGER.warning(str(f))
         await sleep(f.value * 1.2)
-        return await send_rss(text)
+        return await send_rss(text, chat_id, thread_id)
     except Exception as e:
         LOGGER.error(str(e))
         return str(e)
@@ -196,9 +196,13 @@ async def update_status_message(sid, force=False):
         status = status_dict[sid]["status"]
         is_user = status_dict[sid]["is_user"]
         page_step = status_dict[sid]["page_step"]
-        text, buttons = await get_readable_message(
-            sid, is_user, page_no, status, page_step
-        )
+    # Rendered outside the lock, the snapshot takes it only to copy the tasks
+    text, buttons = await get_readable_message(
+        sid, is_user, page_no, status, page_step, fresh=force
+    )
+    async with task_dict_lock:
+        if not status_dict.get(sid):
+            return
         if text is None:
             del status_dict[sid]
             if obj := intervals["status"].get(sid):
@@ -229,14 +233,18 @@ async def send_status_message(msg, user_id=0):
         return
     sid = user_id or msg.chat.id
     is_user = bool(user_id)
+    async with task_dict_lock:
+        if state := status_dict.get(sid):
+            page_no = state["page_no"]
+            status = state["status"]
+            page_step = state["page_step"]
+        else:
+            page_no, status, page_step = 1, "All", 1
+    text, buttons = await get_readable_message(
+        sid, is_user, page_no, status, page_step, fresh=True
+    )
     async with task_dict_lock:
         if sid in status_dict:
-            page_no = status_dict[sid]["page_no"]
-            status = status_dict[sid]["status"]
-            page_step = status_dict[sid]["page_step"]
-            text, buttons = await get_readable_message(
-                sid, is_user, page_no, status, page_step
-            )
             if text is None:
                 del status_dict[sid]
                 if obj := intervals["status"].get(sid):
@@ -254,7 +262,6 @@ async def send_status_message(msg, user_id=0):
             message.text = text
             status_dict[sid].update({"message": message, "time": time()})
         else:
-            text, buttons = await get_readable_message(sid, is_user)
             if text is None:
                 return
             message = await send_message(msg, text, buttons, block=False)
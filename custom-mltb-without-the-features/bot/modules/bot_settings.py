@@ -34,7 +34,7 @@ from ..core.mltb_client import TgClient
 from ..core.torrent_manager import TorrentManager
 from ..core.startup import update_variables
 from ..helper.ext_utils.db_handler import database
-from ..helper.ext_utils.task_manager import start_from_queued
+from ..helper.ext_utils.task_manager import start_from_queued, wake_process_waiters
 from ..helper.mirror_leech_utils.rclone_utils.serve import rclone_serve_booter
 from ..helper.telegram_helper.button_build import ButtonMaker
 from ..helper.telegram_helper.message_utils import (
@@ -193,6 +193,8 @@ async def edit_variable(_, message, pre_message, key):
         await initiate_search_tools()
     elif key in ["QUEUE_ALL", "QUEUE_DOWNLOAD", "QUEUE_UPLOAD"]:
         await start_from_queued()
+    elif key == "QUEUE_PROCESS":
+        await wake_process_waiters()
     elif key in [
         "RCLONE_SERVE_URL",
         "RCLONE_SERVE_PORT",
@@ -370,6 +372,8 @@ async def edit_bot_settings(client, query):
             await initiate_search_tools()
         elif data[2] in ["QUEUE_ALL", "QUEUE_DOWNLOAD", "QUEUE_UPLOAD"]:
             await start_from_queued()
+        elif data[2] == "QUEUE_PROCESS":
+            await wake_process_waiters()
         elif data[2] in [
             "RCLONE_SERVE_URL",
             "RCLONE_SERVE_PORT",
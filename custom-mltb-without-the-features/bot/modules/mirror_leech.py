@@ -1,6 +1,7 @@
 from aiofiles.os import path as aiopath
 from base64 import b64encode
 from re import match as re_match
+from urllib.parse import unquote, urlparse
 
 from .. import LOGGER, bot_loop, task_dict_lock, DOWNLOAD_DIR
 from ..helper.ext_utils.bot_utils import (
@@ -328,6 +329,17 @@ class Mirror(TaskListener):
             await add_rclone_download(self, f"{path}/")
         elif is_gdrive_link(self.link) or is_gdrive_id(self.link):
             await add_gd_download(self, path)
+        elif is_url(self.link):
+            # Empty for links ending in / or carrying only a query, the
+            # listener then names the file from Content-Disposition
+            filename = unquote(urlparse(self.link).path.rstrip("/").rsplit("/", 1)[-1])
+            self.link = {
+                "contents": [{"path": "", "filename": filename, "url": self.link}],
+                "title": filename or urlparse(self.link).netloc,
+                "total_size": 0,
+                "header": headers,
+            }
+            await add_direct_download(self, path)
         else:
             await send_message(self.message, "This link type is not supported!")
 
@@ -1,21 +1,20 @@
-from httpx import AsyncClient
+from httpx import AsyncClient, Limits
 from apscheduler.triggers.interval import IntervalTrigger
-from asyncio import Lock, sleep
+from asyncio import Lock, Queue, Semaphore, gather, sleep
 from datetime import datetime, timedelta
 from feedparser import parse as feed_parse
-from functools import partial
+from functools import lru_cache, partial
 from io import BytesIO
 from pyrogram.filters import create
 from pyrogram.handlers import MessageHandler
 from time import time
-from re import compile, I
+from re import compile, escape, I
 
-from .. import scheduler, rss_dict, LOGGER
+from .. import bot_loop, scheduler, rss_dict, LOGGER
 from ..core.config_manager import Config
 from ..helper.ext_utils.bot_utils import new_task, arg_parser, get_size_bytes
 from ..helper.ext_utils.status_utils import get_readable_file_size
 from ..helper.ext_utils.db_handler import database
-from ..helper.ext_utils.exceptions import RssShutdownException
 from ..helper.ext_utils.help_messages import RSS_HELP_MESSAGE
 from ..helper.telegram_helper.button_build import ButtonMaker
 from ..helper.telegram_helper.filters import CustomFilters
@@ -37,6 +36,110 @@ headers = {
     "Accept-Language": "en-US,en;q=0.5",
 }
 
+RSS_CONCURRENCY = 10
+SEND_INTERVAL = 10
+
+_client = None
+# ETag/Last-Modified of each subscription as of its last fully processed
+# poll, several subscriptions filtering one link each see every change
+_validators = {}
+_send_queue = Queue()
+_sender = None
+# (last_feed, last_title) of feeds whose matched items are still queued, the
+# stored marker only moves once they are sent so a restart doesn't lose them
+_pending = {}
+
+
+def _get_client():
+    global _client
+    if _client is None or _client.is_closed:
+        _client = AsyncClient(
+            headers=headers,
+            follow_redirects=True,
+            timeout=60,
+            verify=False,
+            limits=Limits(max_connections=RSS_CONCURRENCY),
+        )
+    return _client
+
+
+def _entry_link(entry):
+    try:
+        return entry["links"][1]["href"]
+    except IndexError:
+        return entry["link"]
+
+
+def _entry_size(entry):
+    if entry.get("size"):
+        return int(entry["size"])
+    if entry.get("summary") and (match := size_regex.search(entry["summary"])):
+        return get_size_bytes(match.group(1))
+    return 0
+
+
+@lru_cache(maxsize=256)
+def _compile_filters(inf, exf, sensitive):
+    """
+    Title matcher of a subscription: every inf group has to match one of its
+    words and no exf word may match. sensitive ignores the case, as before.
+    """
+    flags = I if sensitive else 0
+    # An empty group never matches, like all() over nothing did
+    includes = [
+        compile("|".join(map(escape, words)) or "(?!)", flags) for words in inf
+    ]
+    words = [escape(word) for group in exf for word in group]
+    exclude = compile("|".join(words), flags) if words else None
+
+    def matches(title):
+        if exclude is not None and exclude.search(title):
+            return False
+        return all(pattern.search(title) for pattern in includes)
+
+    return matches
+
+
+def _filters(data):
+    return _compile_filters(
+        tuple(map(tuple, data["inf"])),
+        tuple(map(tuple, data["exf"])),
+        bool(data.get("sensitive", False)),
+    )
+
+
+async def _advance(user, title, marker):
+    """Store marker as the newest item of the feed that has been handled"""
+    if _pending.get((user, title)) == marker:
+        del _pending[(user, title)]
+    async with rss_dict_lock:
+        if user not in rss_dict or not rss_dict[user].get(title, False):
+            return
+        rss_dict[user][title].update({"last_feed": marker[0], "last_title": marker[1]})
+    await database.rss_update(user)
+
+
+async def _send_worker():
+    while True:
+        text, chat_id, topic_id = await _send_queue.get()
+        if isinstance(text, tuple):
+            await _advance(*text)
+            continue
+        await send_rss(text, chat_id, topic_id)
+        await sleep(SEND_INTERVAL)
+
+
+def _dispatch(text, chat_id=None, topic_id=None):
+    """
+    Queue a matched item, one is sent every SEND_INTERVAL seconds. A
+    (user, title, marker) tuple advances that feed once everything queued
+    before it is out.
+    """
+    global _sender
+    if _sender is None or _sender.done():
+        _sender = bot_loop.create_task(_send_worker())
+    _send_queue.put_nowait((text, chat_id, topic_id))
+
 
 async def rss_menu(event):
     user_id = event.from_user.id
@@ -133,22 +236,11 @@ async def rss_sub(_, message, pre_event):
             cmd = None
             stv = False
         try:
-            async with AsyncClient(
-                headers=headers, follow_redirects=True, timeout=60, verify=False
-            ) as client:
-                res = await client.get(feed_link)
+            res = await _get_client().get(feed_link)
             html = res.text
             rss_d = feed_parse(html)
             last_title = rss_d.entries[0]["title"]
-            if rss_d.entries[0].get("size"):
-                size = int(rss_d.entries[0]["size"])
-            elif rss_d.entries[0].get("summary"):
-                summary = rss_d.entries[0]["summary"]
-                matches = size_regex.findall(summary)
-                sizes = [match[0] for match in matches]
-                size = get_size_bytes(sizes[0])
-            else:
-                size = 0
+            size = _entry_size(rss_d.entries[0])
             msg += "<b>Subscribed!</b>"
             msg += f"\n<b>Title: </b><code>{title}</code>\n<b>Feed Url: </b>{feed_link}"
             msg += f"\n<b>latest record for </b>{rss_d.feed.title}:"
@@ -346,10 +438,7 @@ async def rss_get(_, message, pre_event):
                 msg = await send_message(
                     message, f"Getting the last <b>{count}</b> item(s) from {title}"
                 )
-                async with AsyncClient(
-                    headers=headers, follow_redirects=True, timeout=60, verify=False
-                ) as client:
-                    res = await client.get(data["link"])
+                res = await _get_client().get(data["link"])
                 html = res.text
                 rss_d = feed_parse(html)
                 item_info = ""
@@ -658,6 +747,100 @@ Timeout: 60 sec. Argument -c for command and arguments
             await query.answer(text="Already Running!", show_alert=True)
 
 
+async def _fetch_feed(link, key):
+    """
+    (body, validators) of a feed, or None when the server answers 304 to the
+    ETag/Last-Modified of the previous poll
+    """
+    conditional = {}
+    if (validators := _validators.get(key)) and validators["link"] == link:
+        if validators["etag"]:
+            conditional["If-None-Match"] = validators["etag"]
+        if validators["modified"]:
+            conditional["If-Modified-Since"] = validators["modified"]
+    tries = 0
+    while True:
+        try:
+            res = await _get_client().get(link, headers=conditional)
+            break
+        except:
+            tries += 1
+            if tries > 3:
+                raise
+    if res.status_code == 304:
+        return None
+    validators = None
+    if res.status_code == 200:
+        validators = {
+            "etag": res.headers.get("ETag"),
+            "modified": res.headers.get("Last-Modified"),
+        }
+    return res.text, validators
+
+
+def _remember(key, link, validators):
+    if validators and any(validators.values()):
+        _validators[key] = {"link": link, **validators}
+    else:
+        _validators.pop(key, None)
+
+
+async def _check_feed(user, title, data, rss_chat_id, rss_topic_id):
+    link = data["link"]
+    if (fetched := await _fetch_feed(link, (user, title))) is None:
+        return
+    html, validators = fetched
+    rss_d = feed_parse(html)
+    last_link = _entry_link(rss_d.entries[0])
+    last_title = rss_d.entries[0]["title"]
+    # Items queued by an earlier poll are already handled
+    seen_link, seen_title = _pending.get(
+        (user, title), (data["last_feed"], data["last_title"])
+    )
+    if seen_link == last_link or seen_title == last_title:
+        _remember((user, title), link, validators)
+        return
+    matches = _filters(data)
+    queued = (user, title) in _pending
+    for entry in rss_d.entries:
+        item_title = entry["title"]
+        url = _entry_link(entry)
+        if seen_link == url or seen_title == item_title:
+            break
+        if not matches(item_title):
+            continue
+        size = _entry_size(entry)
+        if command := data["command"]:
+            if size and Config.RSS_SIZE_LIMIT and Config.RSS_SIZE_LIMIT < size:
+                continue
+            cmd = command.split(maxsplit=1)
+            cmd.insert(1, url)
+            feed_msg = " ".join(cmd)
+            if not feed_msg.startswith("/"):
+                feed_msg = f"/{feed_msg}"
+        else:
+            feed_msg = f"<b>Name: </b><code>{item_title.replace('>', '').replace('<', '')}</code>"
+            feed_msg += f"\n\n<b>Link: </b><code>{url}</code>"
+            if size:
+                feed_msg += f"\n<b>Size: </b>{get_readable_file_size(size)}"
+        feed_msg += f"\n<b>Tag: </b><code>{data['tag']}</code> <code>{user}</code>"
+        _dispatch(feed_msg, rss_chat_id, rss_topic_id)
+        queued = True
+    else:
+        LOGGER.warning(
+            f"Reached Max index no. {len(rss_d.entries)} for this feed: {title}. Maybe you need to use less RSS_DELAY to not miss some torrents"
+        )
+    marker = (last_link, last_title)
+    if queued:
+        _pending[(user, title)] = marker
+        _dispatch((user, title, marker))
+    else:
+        await _advance(user, title, marker)
+    _remember((user, title), link, validators)
+    LOGGER.info(f"Feed Name: {title}")
+    LOGGER.info(f"Last item: {last_link}")
+
+
 async def rss_monitor():
     chat = Config.RSS_CHAT
     if not chat:
@@ -667,7 +850,6 @@ async def rss_monitor():
     if len(rss_dict) == 0:
         scheduler.pause()
         return
-    all_paused = True
     rss_topic_id = rss_chat_id = None
     if isinstance(chat, int):
         rss_chat_id = chat
@@ -680,133 +862,25 @@ async def rss_monitor():
         )
     elif chat.lstrip("-").isdigit():
         rss_chat_id = int(chat)
-    for user, items in list(rss_dict.items()):
-        for title, data in items.items():
+    feeds = [
+        (user, title, data)
+        for user, items in list(rss_dict.items())
+        for title, data in list(items.items())
+        if not data["paused"]
+    ]
+    if not feeds:
+        scheduler.pause()
+        return
+    semaphore = Semaphore(RSS_CONCURRENCY)
+
+    async def check(user, title, data):
+        async with semaphore:
             try:
-                if data["paused"]:
-                    continue
-                tries = 0
-                while True:
-                    try:
-                        async with AsyncClient(
-                            headers=headers,
-                            follow_redirects=True,
-                            timeout=60,
-                            verify=False,
-                        ) as client:
-                            res = await client.get(data["link"])
-                        html = res.text
-                        break
-                    except:
-                        tries += 1
-                        if tries > 3:
-                            raise
-                        continue
-                rss_d = feed_parse(html)
-                try:
-                    last_link = rss_d.entries[0]["links"][1]["href"]
-                except IndexError:
-                    last_link = rss_d.entries[0]["link"]
-                finally:
-                    all_paused = False
-                last_title = rss_d.entries[0]["title"]
-                if data["last_feed"] == last_link or data["last_title"] == last_title:
-                    continue
-                feed_count = 0
-                while True:
-                    try:
-                        await sleep(10)
-                    except:
-                        raise RssShutdownException("Rss Monitor Stopped!")
-                    try:
-                        item_title = rss_d.entries[feed_count]["title"]
-                        try:
-                            url = rss_d.entries[feed_count]["links"][1]["href"]
-                        except IndexError:
-                            url = rss_d.entries[feed_count]["link"]
-                        if data["last_feed"] == url or data["last_title"] == item_title:
-                            break
-                        if rss_d.entries[feed_count].get("size"):
-                            size = int(rss_d.entries[feed_count]["size"])
-                        elif rss_d.entries[feed_count].get("summary"):
-                            summary = rss_d.entries[feed_count]["summary"]
-                            matches = size_regex.findall(summary)
-                            sizes = [match[0] for match in matches]
-                            size = get_size_bytes(sizes[0])
-                        else:
-                            size = 0
-                    except IndexError:
-                        LOGGER.warning(
-                            f"Reached Max index no. {feed_count} for this feed: {title}. Maybe you need to use less RSS_DELAY to not miss some torrents"
-                        )
-                        break
-                    parse = True
-                    for flist in data["inf"]:
-                        if (
-                            data.get("sensitive", False)
-                            and all(x.lower() not in item_title.lower() for x in flist)
-                        ) or (
-                            not data.get("sensitive", False)
-                            and all(x not in item_title for x in flist)
-                        ):
-                            parse = False
-                            feed_count += 1
-                            break
-                    if not parse:
-                        continue
-                    for flist in data["exf"]:
-                        if (
-                            data.get("sensitive", False)
-                            and any(x.lower() in item_title.lower() for x in flist)
-                        ) or (
-                            not data.get("sensitive", False)
-                            and any(x in item_title for x in flist)
-                        ):
-                            parse = False
-                            feed_count += 1
-                            break
-                    if not parse:
-                        continue
-                    if command := data["command"]:
-                        if (
-                            size
-                            and Config.RSS_SIZE_LIMIT
-                            and Config.RSS_SIZE_LIMIT < size
-                        ):
-                            feed_count += 1
-                            continue
-                        cmd = command.split(maxsplit=1)
-                        cmd.insert(1, url)
-                        feed_msg = " ".join(cmd)
-                        if not feed_msg.startswith("/"):
-                            feed_msg = f"/{feed_msg}"
-                    else:
-                        feed_msg = f"<b>Name: </b><code>{item_title.replace('>', '').replace('<', '')}</code>"
-                        feed_msg += f"\n\n<b>Link: </b><code>{url}</code>"
-                        if size:
-                            feed_msg += f"\n<b>Size: </b>{get_readable_file_size(size)}"
-                    feed_msg += (
-                        f"\n<b>Tag: </b><code>{data['tag']}</code> <code>{user}</code>"
-                    )
-                    await send_rss(feed_msg, rss_chat_id, rss_topic_id)
-                    feed_count += 1
-                async with rss_dict_lock:
-                    if user not in rss_dict or not rss_dict[user].get(title, False):
-                        continue
-                    rss_dict[user][title].update(
-                        {"last_feed": last_link, "last_title": last_title}
-                    )
-                await database.rss_update(user)
-                LOGGER.info(f"Feed Name: {title}")
-                LOGGER.info(f"Last item: {last_link}")
-            except RssShutdownException as ex:
-                LOGGER.info(ex)
-                break
+                await _check_feed(user, title, data, rss_chat_id, rss_topic_id)
             except Exception as e:
                 LOGGER.error(f"{e} - Feed Name: {title} - Feed Link: {data['link']}")
-                continue
-    if all_paused:
-        scheduler.pause()
+
+    await gather(*(check(*feed) for feed in feeds))
 
 
 def add_job():
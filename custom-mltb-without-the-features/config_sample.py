@@ -13,6 +13,8 @@ DATABASE_URL = ""
 STATUS_LIMIT = 4
 DEFAULT_UPLOAD = "rc"
 STATUS_UPDATE_INTERVAL = 15
+DIRECT_CONNECTIONS = 8
+DIRECT_LINK_CACHE_TTL = 600
 FILELION_API = ""
 STREAMWISH_API = ""
 EXCLUDED_EXTENSIONS = ""
@@ -21,6 +23,8 @@ USE_SERVICE_ACCOUNTS = False
 NAME_SUBSTITUTE = ""
 FFMPEG_CMDS = {}
 UPLOAD_PATHS = {}
+SEVENZ_THREADS = 0
+ZIP_LEVEL = 0
 # GDrive Tools
 GDRIVE_ID = ""
 IS_TEAM_DRIVE = False
@@ -45,11 +49,14 @@ USER_TRANSMISSION = False
 HYBRID_LEECH = False
 LEECH_FILENAME_PREFIX = ""
 LEECH_DUMP_CHAT = ""
+LEECH_UPLOAD_WORKERS = 3
 THUMBNAIL_LAYOUT = ""
 # Queueing system
 QUEUE_ALL = 0
 QUEUE_DOWNLOAD = 0
 QUEUE_UPLOAD = 0
+QUEUE_PROCESS = 0
+QUEUE_AGING = 300
 # RSS
 RSS_DELAY = 600
 RSS_CHAT = ""
@@ -1,35 +1,3 @@
-from anytree import NodeMixin
-
-
-class TorNode(NodeMixin):
-    def __init__(
-        self,
-        name,
-        is_folder=False,
-        is_file=False,
-        parent=None,
-        size=None,
-        priority=None,
-        file_id=None,
-        progress=None,
-    ):
-        super().__init__()
-        self.name = name
-        self.is_folder = is_folder
-        self.is_file = is_file
-
-        if parent is not None:
-            self.parent = parent
-        if size is not None:
-            self.fsize = size
-        if priority is not None:
-            self.priority = priority
-        if file_id is not None:
-            self.file_id = file_id
-        if progress is not None:
-            self.progress = progress
-
-
 def qb_get_folders(path):
     return path.split("/")
 
@@ -39,160 +7,84 @@ def get_folders(path, root_path):
     return fs.split("/")
 
 
-def make_tree(res, tool, root_path=""):
+def _file_entries(res, tool, root_path):
+    """(path components, id, size, selected, progress) of every file of the task"""
     if tool == "qbittorrent":
-        parent = TorNode("QBITTORRENT")
-        folder_id = 0
         for i in res:
-            folders = qb_get_folders(i.name)
-            if len(folders) > 1:
-                previous_node = parent
-                for j in range(len(folders) - 1):
-                    current_node = next(
-                        (k for k in previous_node.children if k.name == folders[j]),
-                        None,
-                    )
-                    if current_node is None:
-                        previous_node = TorNode(
-                            folders[j],
-                            is_folder=True,
-                            parent=previous_node,
-                            file_id=folder_id,
-                        )
-                        folder_id += 1
-                    else:
-                        previous_node = current_node
-                TorNode(
-                    folders[-1],
-                    is_file=True,
-                    parent=previous_node,
-                    size=i.size,
-                    priority=i.priority,
-                    file_id=i.index,
-                    progress=round(i.progress * 100, 5),
-                )
-            else:
-                TorNode(
-                    folders[-1],
-                    is_file=True,
-                    parent=parent,
-                    size=i.size,
-                    priority=i.priority,
-                    file_id=i.index,
-                    progress=round(i.progress * 100, 5),
-                )
+            yield (
+                qb_get_folders(i.name),
+                i.index,
+                i.size,
+                bool(i.priority),
+                round(i.progress * 100, 5),
+            )
     elif tool == "aria2":
-        parent = TorNode("ARIA2")
-        folder_id = 0
         for i in res:
-            folders = get_folders(i["path"], root_path)
-            priority = 1
-            if i["selected"] == "false":
-                priority = 0
-            if len(folders) > 1:
-                previous_node = parent
-                for j in range(len(folders) - 1):
-                    current_node = next(
-                        (k for k in previous_node.children if k.name == folders[j]),
-                        None,
-                    )
-                    if current_node is None:
-                        previous_node = TorNode(
-                            folders[j],
-                            is_folder=True,
-                            parent=previous_node,
-                            file_id=folder_id,
-                        )
-                        folder_id += 1
-                    else:
-                        previous_node = current_node
-                try:
-                    progress = round(
-                        (int(i["completedLength"]) / int(i["length"])) * 100, 5
-                    )
-                except:
-                    progress = 0
-                TorNode(
-                    folders[-1],
-                    is_file=True,
-                    parent=previous_node,
-                    size=int(i["length"]),
-                    priority=priority,
-                    file_id=i["index"],
-                    progress=progress,
-                )
-            else:
-                try:
-                    progress = round(
-                        (int(i["completedLength"]) / int(i["length"])) * 100, 5
-                    )
-                except:
-                    progress = 0
-                TorNode(
-                    folders[-1],
-                    is_file=True,
-                    parent=parent,
-                    size=int(i["length"]),
-                    priority=priority,
-                    file_id=i["index"],
-                    progress=progress,
+            try:
+                progress = round(
+                    (int(i["completedLength"]) / int(i["length"])) * 100, 5
                 )
+            except:
+                progress = 0
+            yield (
+                get_folders(i["path"], root_path),
+                i["index"],
+                int(i["length"]),
+                i["selected"] != "false",
+                progress,
+            )
     else:
-        parent = TorNode("SABNZBD+")
-        priority = 1
         for i in res["files"]:
-            TorNode(
-                i["filename"],
-                is_file=True,
-                parent=parent,
-                size=float(i["mb"]) * 1048576,
-                priority=priority,
-                file_id=i["nzf_id"],
-                progress=round(
+            yield (
+                [i["filename"]],
+                i["nzf_id"],
+                float(i["mb"]) * 1048576,
+                True,
+                round(
                     ((float(i["mb"]) - float(i["mbleft"])) / float(i["mb"])) * 100,
                     5,
                 ),
             )
 
-    result = create_list(parent)
-    return {"files": result, "engine": tool}
-
 
-"""
-def print_tree(parent):
-    for pre, _, node in RenderTree(parent):
-        treestr = u"%s%s" % (pre, node.name)
-        print(treestr.ljust(8), node.is_folder, node.is_file)
-"""
-
-
-def create_list(parent, contents=None):
-    if contents is None:
-        contents = []
-    for i in parent.children:
-        if i.is_folder:
-            children = []
-            create_list(i, children)
-            contents.append(
-                {
-                    "id": f"folderNode_{i.file_id}",
-                    "name": i.name,
+def _build(entries):
+    """
+    Nested file list in one pass, folders are found through a dict keyed by
+    their path instead of scanning the children of the parent
+    """
+    root = []
+    folders = {}
+    folder_id = 0
+    for parts, file_id, size, selected, progress in entries:
+        children = root
+        key = ()
+        for name in parts[:-1]:
+            key += (name,)
+            if (node := folders.get(key)) is None:
+                node = folders[key] = {
+                    "id": f"folderNode_{folder_id}",
+                    "name": name,
                     "type": "folder",
-                    "children": children,
+                    "children": [],
                 }
-            )
-        else:
-            contents.append(
-                {
-                    "id": i.file_id,
-                    "name": i.name,
-                    "size": i.fsize,
-                    "type": "file",
-                    "selected": bool(i.priority),
-                    "progress": i.progress,
-                }
-            )
-    return contents
+                folder_id += 1
+                children.append(node)
+            children = node["children"]
+        children.append(
+            {
+                "id": file_id,
+                "name": parts[-1],
+                "size": size,
+                "type": "file",
+                "selected": selected,
+                "progress": progress,
+            }
+        )
+    return root
+
+
+def make_tree(res, tool, root_path=""):
+    return {"files": _build(_file_entries(res, tool, root_path)), "engine": tool}
 
 
 def extract_file_ids(data):